@@ -0,0 +1,83 @@
+"""Memory used by the history: list of dicts vs. the columnar HistoryStore.
+
+Run from the repository root:
+
+    python benchmarks/history_memory.py [rows] [people]
+"""
+import os
+import random
+import sys
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bmi import engine
+from bmi.history import HistoryStore
+
+
+def make_entries(rows, people, seed=1):
+    rng = random.Random(seed)
+    start = int(datetime(2024, 1, 1).timestamp())
+    for i in range(rows):
+        height = round(rng.uniform(140, 200), 1)
+        weight = round(rng.uniform(40, 130), 1)
+        age = rng.randint(18, 90)
+        gender = rng.choice(engine.GENDERS)
+        bmi = engine.compute_bmi(height, weight)
+        yield {
+            'ts': start + 60 * i,
+            'name': f"Person {rng.randrange(people)}",
+            'age': age,
+            'gender': gender,
+            'activity': rng.choice(engine.ACTIVITY_LEVELS),
+            'bmi': round(bmi, 1),
+            'category': engine.get_bmi_category(bmi, age, gender),
+            'height': height,
+            'weight': weight,
+        }
+
+
+def build_dict_list(entries):
+    """The original representation: dict per entry + per-person lists"""
+    history = []
+    person_history = defaultdict(list)
+    for entry in entries:
+        entry = dict(entry)
+        entry['date'] = datetime.fromtimestamp(entry.pop('ts')).strftime("%Y-%m-%d %H:%M")
+        history.append(entry)
+        person_history[entry['name']].append(entry)
+    return history, person_history
+
+
+def build_store(entries):
+    store = HistoryStore()
+    store.extend(entries)
+    return store
+
+
+def measure(build, rows, people):
+    entries = list(make_entries(rows, people))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(entries)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    people = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    dict_bytes = measure(build_dict_list, rows, people)
+    store_bytes = measure(build_store, rows, people)
+    print(f"{rows} rows, {people} people")
+    print(f"  dict list:    {dict_bytes / 1e6:8.1f} MB ({dict_bytes / rows:6.1f} B/row)")
+    print(f"  HistoryStore: {store_bytes / 1e6:8.1f} MB ({store_bytes / rows:6.1f} B/row)")
+    print(f"  ratio:        {dict_bytes / store_bytes:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Load test for the scoring service (bmi/server.py).
+
+Opens N keep-alive connections to localhost, each sending requests back
+to back, and reports latency percentiles and throughput.  By default it
+starts `python -m bmi serve` on a free port in a separate process and
+stops it afterwards; pass --port to test a server that is already up.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py [--connections 64] [--requests 20000] [--batch N] [--port PORT]
+
+--batch N sends /score/batch requests of N records instead of /score.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+GENDERS = ("Male", "Female", "Other")
+
+
+def make_record(rng):
+    return {'height': round(rng.uniform(120, 200), 1), 'weight': round(rng.uniform(25, 140), 1),
+            'age': rng.randint(2, 90), 'gender': rng.choice(GENDERS)}
+
+
+def make_request(path, payload, port):
+    body = json.dumps(payload).encode()
+    head = (f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    return head.encode() + body
+
+
+async def read_response(reader):
+    """Status code of one response; the body is read and dropped"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length:"))
+    await reader.readexactly(length)
+    return int(lines[0].split(" ")[1])
+
+
+async def client(port, requests, count, latencies, statuses):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for i in range(count):
+            request = requests[i % len(requests)]
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load(port, connections, total, batch):
+    rng = random.Random(1)
+    if batch:
+        requests = [make_request("/score/batch", {'records': [make_record(rng) for _ in range(batch)]}, port)
+                    for _ in range(50)]
+    else:
+        requests = [make_request("/score", make_record(rng), port) for _ in range(1000)]
+    latencies, statuses = [], {}
+    per_client = [total // connections + (i < total % connections) for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, requests, count, latencies, statuses) for count in per_client))
+    return time.perf_counter() - start, latencies, statuses
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit(f"Server did not start on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=0, help="records per /score/batch request (0: use /score)")
+    parser.add_argument('--port', type=int, help="use a running server instead of starting one")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        port = free_port()
+        server = subprocess.Popen([sys.executable, '-m', 'bmi', 'serve', '--port', str(port)], cwd=ROOT,
+                                  stdout=subprocess.DEVNULL)
+        wait_for_server(port)
+    try:
+        # A short warm-up so imports and first-use table building are not measured
+        asyncio.run(load(port, min(4, args.connections), 200, args.batch))
+        elapsed, latencies, statuses = asyncio.run(load(port, args.connections, args.requests, args.batch))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    endpoint = f"/score/batch x{args.batch}" if args.batch else "/score"
+    print(f"{endpoint}: {len(latencies):,} requests over {args.connections} connections in {elapsed:.2f} s")
+    print(f"  {len(latencies) / elapsed:,.0f} requests/s" +
+          (f"  ({len(latencies) * args.batch / elapsed:,.0f} records/s)" if args.batch else ""))
+    print(f"  latency p50 {percentile(latencies, 0.50) * 1000:.2f} ms   p99 {percentile(latencies, 0.99) * 1000:.2f} ms"
+          f"   max {latencies[-1] * 1000:.2f} ms")
+    print("  status " + ", ".join(f"{status}: {count:,}" for status, count in sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
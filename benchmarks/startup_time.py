@@ -0,0 +1,66 @@
+"""Startup cost of the command line mode vs. the GUI.
+
+Each mode runs in a fresh interpreter under `python -X importtime`; the
+report shows the wall-clock time, the total import time and the slowest
+top-level imports.
+
+  cli        "BMI Project.py" compute ...  (never imports wx or matplotlib)
+  gui        import bmi_gui, up to main()  (matplotlib still unloaded)
+  gui+chart  the same plus the chart worker's matplotlib import (off the GUI thread)
+
+Run from the repository root:
+
+    python benchmarks/startup_time.py [repeats]
+"""
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPT = os.path.join(ROOT, "BMI Project.py")
+
+MODES = (
+    ('cli', [SCRIPT, 'compute', '--height', '170', '--weight', '65', '--age', '30']),
+    ('gui', ['-c', "import bmi_gui"]),
+    ('gui+chart', ['-c', "import bmi_gui; import bmi.chart; bmi.chart.load_backend()"]),
+)
+
+
+def parse_importtime(stderr):
+    """Return [(cumulative us, module)] for the top-level imports"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):
+            imports.append((int(cumulative), name.strip()))
+    return imports
+
+
+def run(args):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return elapsed, parse_importtime(result.stderr)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for mode, args in MODES:
+        runs = [run(args) for _ in range(repeats)]
+        if runs[0][0] is None:
+            print(f"{mode:10} unavailable: {runs[0][1]}")
+            continue
+        best_wall, imports = min(runs, key=lambda r: r[0])
+        total = sum(us for us, _ in imports)
+        slowest = ", ".join(f"{name} {us / 1000:.0f}" for us, name in sorted(imports, reverse=True)[:4])
+        print(f"{mode:10} wall {best_wall * 1000:7.1f} ms   imports {total / 1000:7.1f} ms   slowest (ms): {slowest}")
+
+
+if __name__ == "__main__":
+    main()
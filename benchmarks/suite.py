@@ -0,0 +1,371 @@
+"""Benchmark suite for the hot paths, with stored results for regression checks.
+
+Each benchmark is timed with timeit's auto-ranging (enough calls per
+repeat to last 0.2 s), repeated, and the best time per call is kept.
+Results go to benchmarks/results/<date>-<commit>.json; every run is
+compared with the newest earlier file (or --compare FILE) and anything
+more than --threshold times slower is flagged, with exit status 1.
+
+The GUI paths run headless: they call the same bmi functions the window
+does, minus the wx widget calls.  The chart is timed through the same
+ChartRenderer the window's worker thread uses.
+
+  compute       engine.score() per record, engine.score_batch() in bulk, and the
+                body metrics alone next to the BMI alone
+  history       HistoryStore.append() / extend_columns(), HistoryLog.append(), and
+                bulk appends into a store kept at its hot-tier budget
+  grid          update_history_grid: filter query plus one visible page of cells
+  chart         the chart worker: min/max downsampling and Agg draw
+  person_list   update_person_list: name index update and prefix lookup
+  journal       an undo plus a redo of one record edit (should not grow with the history)
+  export        export_csv() throughput
+  profiling     cost of a timed() wrapper with recording off and on
+
+Run from the repository root:
+
+    python benchmarks/suite.py [-k NAME] [--quick] [--compare FILE] [--no-save]
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from bmi import engine, metrics, profiling
+from bmi.chart import ChartRenderer
+from bmi.export import export_csv
+from bmi.history import HistoryStore
+from bmi.journal import HistoryJournal
+from bmi.storage import HistoryLog
+from bmi.tiers import HistoryTiers
+
+GRID_PAGE_ROWS = 30  # rows the grid draws at the default window size
+CHART_SIZE = (1000, 400)  # pixels
+
+BENCHMARKS = []
+
+
+def benchmark(name, sizes, quick_sizes=None, unit="call"):
+    """Register `setup(size) -> fn`; fn() is what gets timed, `unit`s per call = size"""
+    def register(setup):
+        BENCHMARKS.append((name, setup, sizes, quick_sizes or sizes, unit))
+        return setup
+    return register
+
+
+def make_columns(rows, people=None, seed=1):
+    """Synthetic history columns over the last two years, scored by the engine"""
+    rng = np.random.default_rng(seed)
+    people = people or max(1, rows // 50)
+    now = int(time.time())
+    height = np.round(rng.uniform(140, 200, rows), 1)
+    weight = np.round(rng.uniform(40, 130, rows), 1)
+    age = rng.integers(5, 90, rows)
+    gender = rng.integers(0, len(engine.GENDERS), rows)
+    scored = engine.score_batch(height, weight, age, gender)
+    categories = np.array(engine.CATEGORIES, dtype=object)
+    return {
+        'ts': np.sort(rng.integers(now - 2 * 365 * 86400, now, rows)),
+        'name': [f"Person {i}" for i in rng.integers(0, people, rows).tolist()],
+        'age': age.astype(np.int16),
+        'gender': [engine.GENDERS[i] for i in gender.tolist()],
+        'activity': [engine.ACTIVITY_LEVELS[i] for i in rng.integers(0, len(engine.ACTIVITY_LEVELS), rows).tolist()],
+        'height': height,
+        'weight': weight,
+        'bmi': np.round(scored['bmi'], 1),
+        'category': categories[scored['category_code']].tolist(),
+    }
+
+
+def make_store(rows, people=None):
+    store = HistoryStore()
+    store.extend_columns(make_columns(rows, people))
+    return store
+
+
+def sample_entry(name="Person 0"):
+    return {'ts': int(time.time()), 'name': name, 'age': 30, 'gender': "Male",
+            'activity': engine.ACTIVITY_LEVELS[0], 'bmi': 22.5, 'category': "Normal Weight",
+            'height': 170.0, 'weight': 65.0}
+
+
+@benchmark("compute.score", [1])
+def bench_score(size):
+    return lambda: engine.score(170.0, 65.0, 30, "Male")
+
+
+@benchmark("compute.score_child", [1])
+def bench_score_child(size):
+    return lambda: engine.score(140.0, 40.0, 10, "Female")
+
+
+@benchmark("compute.score_batch", [1000, 100000, 1000000], [1000, 100000], unit="record")
+def bench_score_batch(size):
+    columns = make_columns(size)
+    height, weight, age = columns['height'], columns['weight'], columns['age']
+    gender = engine.gender_codes(columns['gender'])
+    activity = engine.activity_codes(columns['activity'])
+    return lambda: engine.score_batch(height, weight, age, gender, activity)
+
+
+@benchmark("compute.bmi_only", [1000000], [100000], unit="record")
+def bench_bmi_only(size):
+    columns = make_columns(size)
+    height, weight = columns['height'], columns['weight']
+    return lambda: engine.compute_bmi(height, weight)
+
+
+@benchmark("compute.body_metrics", [1000000], [100000], unit="record")
+def bench_body_metrics(size):
+    """BMR, TDEE, body fat and BMI Prime for a cohort, on top of an existing BMI"""
+    columns = make_columns(size)
+    height, weight, age, bmi = columns['height'], columns['weight'], columns['age'], columns['bmi']
+    gender = engine.gender_codes(columns['gender'])
+    activity = engine.activity_codes(columns['activity'])
+    return lambda: metrics.derive_batch(height, weight, age, bmi, gender, activity)
+
+
+@benchmark("history.append", [100000])
+def bench_history_append(size):
+    store = make_store(size)
+    entry = sample_entry()
+    return lambda: store.append(entry)
+
+
+@benchmark("history.extend_columns", [100000], unit="record")
+def bench_history_extend(size):
+    columns = make_columns(size)
+
+    def run():
+        HistoryStore().extend_columns(columns)
+    return run
+
+
+@benchmark("history.tiered_extend", [10000], unit="record")
+def bench_history_tiered(size):
+    """extend_columns() plus enforce() on a full 250k-row hot tier: evictions amortized over the appends"""
+    store = make_store(250000)
+    tiers = HistoryTiers(store, hot_rows=250000)
+    chunks = [make_columns(size, people=5000, seed=seed) for seed in range(8)]
+    calls = iter(range(10 ** 9))
+
+    def run():
+        store.extend_columns(chunks[next(calls) % len(chunks)])
+        tiers.enforce()
+    return run
+
+
+@benchmark("history.log_append", [1])
+def bench_log_append(size):
+    directory = tempfile.mkdtemp()
+    log = HistoryLog(os.path.join(directory, "history.txt"))
+    entry = sample_entry()
+    return lambda: log.append(entry)
+
+
+def grid_page(store, view):
+    """The cells HistoryTable.GetValue/GetAttr produce for the last visible page"""
+    rows = len(store) if view is None else len(view)
+    cells = []
+    for row in range(max(0, rows - GRID_PAGE_ROWS), rows):
+        row = row if view is None else int(view[row])
+        derived = store.metrics(row)
+        cells.append((store.value(row, 'date'), store.value(row, 'name'), str(store.value(row, 'age')),
+                      store.value(row, 'gender'), store.value(row, 'activity').split('(')[0].strip(),
+                      str(store.value(row, 'bmi')), store.value(row, 'category'),
+                      engine.color_band(store.value(row, 'bmi')),
+                      f"{derived['bmi_prime']:.2f}", f"{derived['body_fat']:.1f}", f"{derived['bmr']:.0f}",
+                      f"{derived['tdee']:.0f}"))
+    return cells
+
+
+@benchmark("grid.unfiltered", [100000, 1000000], [100000], unit="call")
+def bench_grid_all(size):
+    store = make_store(size)
+    return lambda: grid_page(store, None)
+
+
+@benchmark("grid.filtered", [100000, 1000000], [100000], unit="call")
+def bench_grid_filtered(size):
+    store = make_store(size)
+    store.index.update()
+    return lambda: grid_page(store, store.index.query_preset(None, "Obesity Class I+", "Last 90 Days"))
+
+
+@benchmark("grid.person", [100000, 1000000], [100000], unit="call")
+def bench_grid_person(size):
+    store = make_store(size)
+    store.index.update()
+    return lambda: grid_page(store, store.index.query_preset("Person 7", "All Categories", "All Time"))
+
+
+@benchmark("chart.render", [10, 1000, 100000, 1000000], [10, 1000, 100000], unit="call")
+def bench_chart(size):
+    """The chart worker's job for one update_chart(): downsample and draw at the GUI's default size"""
+    store = make_store(size)
+    renderer = ChartRenderer(None)
+    timestamps, bmis = store.column('ts').copy(), store.column('bmi').copy()
+    return lambda: renderer.render(timestamps, bmis, "BMI Trend - All Persons", CHART_SIZE[0], CHART_SIZE[1])
+
+
+@benchmark("person_list.prefix", [10000, 100000], unit="call")
+def bench_person_list(size):
+    store = make_store(size * 2, people=size)
+    store.index.update()
+    return lambda: store.index.names_with_prefix("Person 1")[:1000]
+
+
+@benchmark("person_list.new_person", [10000, 100000], unit="call")
+def bench_person_list_new(size):
+    """A calculation for someone new: the index takes the name, then the list is rebuilt"""
+    store = make_store(size * 2, people=size)
+    store.index.update()
+    counter = iter(range(10 ** 9))
+
+    def run():
+        store.append(sample_entry(f"New {next(counter)}"))
+        return store.index.names_with_prefix("")[:1000]
+    return run
+
+
+@benchmark("journal.undo_redo", [10000, 1000000], [10000], unit="call")
+def bench_undo_redo(size):
+    store = make_store(size)
+    journal = HistoryJournal(store)
+    entry = store.entry(size // 2)
+    journal.edit(entry, dict(entry, weight=entry['weight'] + 1.0))
+
+    def run():
+        journal.undo()
+        journal.redo()
+    return run
+
+
+@benchmark("export.csv", [100000, 1000000], [100000], unit="row")
+def bench_export(size):
+    snapshot = make_store(size).snapshot()
+    path = os.path.join(tempfile.mkdtemp(), "export.csv")
+    return lambda: export_csv(snapshot, path)
+
+
+@benchmark("profiling.timed_off", [1])
+def bench_timed_off(size):
+    profiling.RECORDER.enabled = False
+    return profiling.timed()(lambda: None)
+
+
+@benchmark("profiling.timed_on", [1])
+def bench_timed_on(size):
+    recorder = profiling.RECORDER
+
+    def run():
+        recorder.enabled = True
+        try:
+            wrapped()
+        finally:
+            recorder.enabled = False
+    wrapped = profiling.timed()(lambda: None)
+    return run
+
+
+def measure(fn, repeat):
+    """(best, median) seconds per call"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    times = sorted(t / number for t in timer.repeat(repeat, number))
+    return times[0], times[len(times) // 2]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def latest_results(exclude=None):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime)
+    files = [path for path in files if path != exclude]
+    return files[-1] if files else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the BMI calculator's hot paths.")
+    parser.add_argument('-k', dest='select', help="only benchmarks whose name contains this")
+    parser.add_argument('--quick', action='store_true', help="skip the largest sizes")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--compare', help="results file to compare with (default: the newest one saved)")
+    parser.add_argument('--threshold', type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument('--no-save', action='store_true', help="don't write a results file")
+    args = parser.parse_args()
+
+    baseline_path = args.compare or latest_results()
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressions = []
+    print(f"{'benchmark':34}{'best':>10}{'median':>10}{'throughput':>25}{'vs baseline':>14}")
+    for name, setup, sizes, quick_sizes, unit in BENCHMARKS:
+        if args.select and args.select not in name:
+            continue
+        for size in (quick_sizes if args.quick else sizes):
+            key = f"{name}[{size}]"
+            best, median = measure(setup(size), args.repeat)
+            per_second = size / best if unit != "call" else 1 / best
+            results[key] = {'best_s': best, 'median_s': median, 'per_s': per_second,
+                            'unit': "call" if unit == "call" else unit}
+            change = ""
+            if key in baseline:
+                ratio = best / baseline[key]['best_s']
+                change = f"{ratio:.2f}x"
+                if ratio > args.threshold:
+                    change += " SLOWER"
+                    regressions.append(key)
+            print(f"{key:34}{format_time(best):>10}{format_time(median):>10}"
+                  f"{per_second:>15,.0f} {unit + '/s':<9}{change:>14}", flush=True)
+
+    if not args.no_save and results:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        commit = git_commit()
+        path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+        with open(path, 'w') as f:
+            json.dump({
+                'meta': {'commit': commit, 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                         'python': platform.python_version(), 'numpy': np.__version__,
+                         'machine': platform.machine(), 'processor': platform.processor() or platform.machine(),
+                         'quick': args.quick},
+                'results': results,
+            }, f, indent=1)
+        print(f"\nSaved {path}")
+    if baseline_path:
+        print(f"Compared with {baseline_path}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold}x: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
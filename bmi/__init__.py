@@ -0,0 +1,5 @@
+"""Headless building blocks for the BMI Health Assistant.
+
+Nothing in this package imports wx, so it can be used from scripts,
+servers and batch jobs as well as from the desktop GUI.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from bmi.cli import main
+
+sys.exit(main())
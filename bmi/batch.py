@@ -0,0 +1,207 @@
+"""Multi-process scoring of very large CSV files.
+
+    python -m bmi score screening.csv scored.csv [--workers N]
+
+The input (same columns as the CSV import, see bmi/importer.py) is
+memory-mapped and cut into byte ranges that end on line boundaries.
+Each range is scored by a worker process with the importer's own
+validation and engine.score_batch(), so categories and unit conversion
+match the input form exactly, and written to a part file next to the
+output.  The parts are then concatenated in order after a single header,
+giving the export layout (bmi/export.py) for every accepted row, and the
+per-shard statistics are added up.  The output also carries the
+bmi.metrics estimates (BMR, TDEE, body fat, BMI Prime), which
+engine.score_batch() computes in the same pass.
+
+There are a few shards per worker so that an uneven shard does not leave
+cores idle at the end.  Records must not contain line breaks inside
+quoted fields (the shard boundaries would split them); compressed input
+can't be sharded and has to be decompressed first.
+"""
+import collections
+import csv
+import io
+import math
+import mmap
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bmi.export import CSV_COLUMNS, format_metrics
+from bmi.history import format_dates
+from bmi.importer import BATCH_ROWS, CsvImportError, ImportStats, read_header, score_rows
+
+SHARDS_PER_WORKER = 4
+MIN_SHARD_BYTES = 8 * 1024 * 1024
+READ_BYTES = 16 * 1024 * 1024  # how much of its shard a worker decodes at a time
+
+
+class ShardStats(ImportStats):
+    """ImportStats plus what is needed for the summary; adds up across shards"""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = 0  # input lines in the shard, blank ones included
+        self.bmi_sum = 0.0
+        self.bmi_squares = 0.0
+        self.bmi_min = math.inf
+        self.bmi_max = -math.inf
+        self.categories = collections.Counter()
+
+    def add_batch(self, batch):
+        bmi = batch['bmi']
+        if len(bmi):
+            self.bmi_sum += float(bmi.sum())
+            self.bmi_squares += float((bmi * bmi).sum())
+            self.bmi_min = min(self.bmi_min, float(bmi.min()))
+            self.bmi_max = max(self.bmi_max, float(bmi.max()))
+        self.categories.update(batch['category'])
+
+    def merge(self, other, line_offset):
+        """Add a later shard; its line numbers are shifted by `line_offset`"""
+        self.rows += other.rows
+        self.imported += other.imported
+        self.lines += other.lines
+        for line, reason in other.errors:
+            self.reject(line + line_offset, reason)
+        self.bmi_sum += other.bmi_sum
+        self.bmi_squares += other.bmi_squares
+        self.bmi_min = min(self.bmi_min, other.bmi_min)
+        self.bmi_max = max(self.bmi_max, other.bmi_max)
+        self.categories.update(other.categories)
+
+    @property
+    def bmi_mean(self):
+        return self.bmi_sum / self.imported if self.imported else math.nan
+
+    @property
+    def bmi_std(self):
+        if self.imported < 2:
+            return 0.0
+        return math.sqrt(max(0.0, (self.bmi_squares - self.imported * self.bmi_mean ** 2) / (self.imported - 1)))
+
+
+def shard_ranges(data, start, shards):
+    """Split data[start:] into about `shards` byte ranges, each ending just after a newline"""
+    size = len(data)
+    bounds = [start]
+    for i in range(1, shards):
+        cut = start + (size - start) * i // shards
+        if cut <= bounds[-1]:
+            continue
+        newline = data.find(b"\n", cut)
+        if newline < 0:
+            break
+        if newline + 1 > bounds[-1] and newline + 1 < size:
+            bounds.append(newline + 1)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def write_batch(writer, batch):
+    """Write one scored batch in the export layout"""
+    columns = dict(batch)
+    columns['date'] = format_dates(batch['ts']).tolist()
+    columns['age'] = batch['age'].tolist()
+    for column in ('height', 'weight', 'bmi'):
+        columns[column] = list(map('{:.1f}'.format, batch[column].tolist()))
+    columns.update(format_metrics(batch))
+    writer.writerows(zip(*(columns[column] for _, column in CSV_COLUMNS)))
+
+
+def score_shard(path, start, stop, part_path, columns, metric, now):
+    """Worker: score bytes [start, stop) of `path` into `part_path`; returns its ShardStats.
+
+    Line numbers in the stats count from the start of the shard.
+    """
+    stats = ShardStats()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+            open(part_path, 'w', encoding='utf-8', newline='', buffering=1 << 20) as out:
+        writer = csv.writer(out)
+        rows, lines = [], []
+        position = start
+        while position < stop:
+            end = min(stop, position + READ_BYTES)
+            if end < stop:
+                end = data.find(b"\n", end - 1, stop) + 1 or stop
+            chunk = data[position:end].decode('utf-8')
+            for line, row in enumerate(csv.reader(io.StringIO(chunk, newline='')), stats.lines + 1):
+                if not any(value.strip() for value in row): continue
+                rows.append(row)
+                lines.append(line)
+                if len(rows) >= BATCH_ROWS:
+                    stats.add_batch(_score(writer, rows, lines, columns, metric, stats, now))
+                    rows, lines = [], []
+            stats.lines += chunk.count("\n") + (not chunk.endswith("\n"))
+            position = end
+        if rows:
+            stats.add_batch(_score(writer, rows, lines, columns, metric, stats, now))
+    return stats
+
+
+def _score(writer, rows, lines, columns, metric, stats, now):
+    batch = score_rows(rows, lines, columns, metric, stats, now)
+    write_batch(writer, batch)
+    return batch
+
+
+def score_file(path, output, workers=None, progress=None):
+    """Score `path` into `output` with a pool of worker processes; returns the merged ShardStats.
+
+    `progress(shards_done, shards)` is called as shards finish.
+    """
+    if path.endswith('.gz'):
+        raise CsvImportError("Compressed files can't be split across processes; decompress first")
+    workers = workers or os.cpu_count() or 1
+    now = int(time.time())
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise CsvImportError("The file is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end = data.find(b"\n") + 1 or len(data)
+            header = next(csv.reader([data[:header_end].decode('utf-8-sig')]))
+            columns, metric = read_header(header)
+            shards = max(1, min(workers * SHARDS_PER_WORKER, (len(data) - header_end) // MIN_SHARD_BYTES))
+            ranges = shard_ranges(data, header_end, shards)
+
+    parts = [f"{output}.part{i}" for i in range(len(ranges))]
+    total = ShardStats()
+    total.lines = 1  # the header
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [pool.submit(score_shard, path, start, stop, part, columns, metric, now)
+                       for (start, stop), part in zip(ranges, parts)]
+            results = []
+            for done, future in enumerate(futures, 1):
+                results.append(future.result())
+                if progress is not None:
+                    progress(done, len(futures))
+        with open(output, 'w', encoding='utf-8', newline='') as out:
+            csv.writer(out).writerow([name for name, _ in CSV_COLUMNS])
+        with open(output, 'ab') as out:
+            for part, stats in zip(parts, results):
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                total.merge(stats, total.lines)
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    return total
+
+
+def summary_lines(stats, elapsed):
+    """Human-readable summary of a score_file() run"""
+    lines = [stats.summary(),
+             f"{stats.rows / elapsed:,.0f} rows/s over {elapsed:.1f} s" if elapsed else ""]
+    if stats.imported:
+        lines.append(f"BMI: mean {stats.bmi_mean:.1f}, std dev {stats.bmi_std:.1f}, "
+                     f"min {stats.bmi_min:.1f}, max {stats.bmi_max:.1f}")
+        for category, count in stats.categories.most_common():
+            lines.append(f"  {category:<24}{count:>12,}  {100 * count / stats.imported:5.1f}%")
+    return [line for line in lines if line]
@@ -0,0 +1,164 @@
+"""BMI trend chart: data reduction and off-screen rendering.
+
+Nothing here depends on wx.  ChartRenderer draws the chart with
+matplotlib's Agg renderer on a worker thread and hands back raw RGBA
+pixels, which the GUI turns into a bitmap; matplotlib itself is only
+imported by that thread, the first time a chart is drawn.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from bmi import profiling
+
+DPI = 100
+_backend = None
+
+
+def downsample_minmax(x, y, buckets):
+    """Reduce a series to at most ~2 points per bucket.
+
+    Each bucket keeps its lowest and highest point (in their original
+    order), so spikes survive even when thousands of points share a pixel
+    column.  The first and last points are always kept.
+    """
+    n = len(x)
+    if buckets < 1 or n <= 2 * buckets:
+        return x, y
+    size = -(-n // buckets)  # ceil
+    whole = (n // size) * size
+    blocks = y[:whole].reshape(-1, size)
+    offsets = np.arange(0, whole, size)
+    keep = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1), [0, n - 1]]
+    if whole < n:
+        tail = y[whole:]
+        keep.append([whole + int(tail.argmin()), whole + int(tail.argmax())])
+    idx = np.unique(np.concatenate(keep))
+    return x[idx], y[idx]
+
+
+def load_backend():
+    """Import matplotlib on first use; returns (Figure, FigureCanvasAgg, epoch datenum, local tz)"""
+    global _backend
+    if _backend is None:
+        import matplotlib.dates as mdates
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        # History stores epoch seconds; the chart needs matplotlib date numbers
+        epoch_datenum = mdates.date2num(datetime(1970, 1, 1, tzinfo=timezone.utc))
+        _backend = (Figure, FigureCanvasAgg, epoch_datenum, datetime.now().astimezone().tzinfo)
+    return _backend
+
+
+class LRUCache:
+    """Small least-recently-used mapping"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+
+class ChartRenderer:
+    """Renders trend charts on a worker thread, latest request first.
+
+    submit() replaces any request the worker hasn't started yet, so a
+    burst of updates (typing in the search box, a bulk import) renders
+    only once, with the newest data.  Finished charts go to
+    deliver(key, width, height, rgba) on the worker thread, and a chart
+    that can't be drawn to failed(key, error); the GUI wraps them in
+    wx.CallAfter.  The figure belongs to the worker and is never touched
+    from another thread.
+    """
+
+    def __init__(self, deliver, failed=None):
+        self.deliver = deliver
+        self.failed = failed
+        self.condition = threading.Condition()
+        self.pending = None
+        self.closed = False
+        self.thread = None
+        self.figure = None
+
+    def submit(self, key, timestamps, bmis, title, width, height):
+        """Queue a chart; the arrays must not change afterwards (pass copies)"""
+        with self.condition:
+            self.pending = (key, timestamps, bmis, title, width, height)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="chart-renderer", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.pending = None
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed: return
+                (key, *request), self.pending = self.pending, None
+            try:
+                with profiling.span("chart render", "background"):
+                    image = self.render(*request)
+            except Exception as e:
+                # The next request draws again; the GUI keeps the chart it has
+                if self.failed is not None and not self.closed:
+                    self.failed(key, e)
+                continue
+            if not self.closed:
+                self.deliver(key, *image)
+
+    def _build_figure(self):
+        """The chart's artists, created once; render() only swaps their data"""
+        Figure, FigureCanvas, self.epoch_datenum, local_tz = load_backend()
+        self.figure = Figure(figsize=(10, 4), dpi=DPI)
+        self.canvas = FigureCanvas(self.figure)
+        self.axes = self.figure.add_subplot(111)
+        self.axes.axhspan(18.5, 25, alpha=0.1, color='green', label='Normal')
+        self.axes.axhspan(25, 30, alpha=0.1, color='yellow', label='Overweight')
+        self.axes.axhspan(30, 50, alpha=0.1, color='red', label='Obese')
+        self.axes.xaxis_date(tz=local_tz)
+        self.trend_line, = self.axes.plot([], [], 'o-', linewidth=2, markersize=6)
+        self.no_data_text = self.axes.text(0.5, 0.5, 'No data available', transform=self.axes.transAxes,
+                                           horizontalalignment='center', verticalalignment='center')
+        self.figure.autofmt_xdate()
+
+    def render(self, timestamps, bmis, title, width, height):
+        """Draw one chart; returns (width, height, RGBA bytes)"""
+        if self.figure is None:
+            self._build_figure()
+        self.figure.set_size_inches(width / DPI, height / DPI)
+        count = len(timestamps)
+        dates = timestamps / 86400.0 + self.epoch_datenum
+        # More points than pixels can't be told apart; keep each column's min/max
+        dates, bmis = downsample_minmax(dates, bmis, int(self.axes.get_window_extent().width))
+        self.trend_line.set_data(dates, bmis)
+        self.no_data_text.set_visible(count == 0)
+        self.axes.set_title(title if count else "")
+        if count:
+            self.axes.relim()
+            self.axes.autoscale_view()
+        self.canvas.draw()
+        width, height = self.canvas.get_width_height()
+        return width, height, bytes(self.canvas.buffer_rgba())
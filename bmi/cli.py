@@ -0,0 +1,193 @@
+"""Command line / batch mode.
+
+Runs the calculator without a display: nothing here imports wx or
+matplotlib (except the PDF export, which draws its pages in worker
+processes), so it starts quickly and works on headless servers.
+
+    python -m bmi compute --height 170 --weight 65 --age 30 [--gender Male] [--activity moderately]
+    python -m bmi compute --units imperial --height 67 --weight 143 --age 30
+    python -m bmi import screening.csv [more.csv ...]
+    python -m bmi export history.csv.gz      (or .csv / .pdf)
+    python -m bmi stats [--person NAME]
+    python -m bmi serve [--host HOST] [--port PORT]
+    python -m bmi score screening.csv scored.csv [--workers N]
+
+"BMI Project.py" hands any command line arguments over to main().
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from bmi import engine
+from bmi.history import HistoryStore, format_dates
+from bmi.storage import DEFAULT_HISTORY_FILE, HistoryLog
+
+# --activity takes the first word of a level ("sedentary", "lightly", ...)
+ACTIVITY_CHOICES = {level.split()[0].lower(): level for level in engine.ACTIVITY_LEVELS}
+
+
+def age(text):
+    """argparse type for --age: a whole number of years the form would accept"""
+    try:
+        years = int(text)
+    except ValueError:
+        years = None
+    if years is None or not engine.MIN_AGE <= years <= engine.MAX_AGE:
+        raise argparse.ArgumentTypeError(f"must be a whole number from {engine.MIN_AGE} to {engine.MAX_AGE}")
+    return years
+
+
+def load_history(path):
+    """Read the whole history file into a HistoryStore"""
+    store = HistoryStore()
+    for chunk in HistoryLog(path).iter_chunks(chunk_size=50000):
+        store.extend(chunk)
+    return store
+
+
+def cmd_compute(args):
+    if args.units == 'metric':
+        engine.validate_metric(args.height, args.weight)
+        height_cm, weight_kg = args.height, args.weight
+    else:
+        engine.validate_imperial(args.height, args.weight)
+        height_cm, weight_kg = engine.imperial_to_metric(args.height, args.weight)
+    result = engine.score(height_cm, weight_kg, args.age, args.gender, ACTIVITY_CHOICES.get(args.activity))
+    ideal_min, ideal_max, unit = result['ideal_min_kg'], result['ideal_max_kg'], "kg"
+    if args.units == 'imperial':
+        ideal_min, ideal_max, unit = ideal_min * engine.LBS_PER_KG, ideal_max * engine.LBS_PER_KG, "lbs"
+    print(f"BMI: {result['bmi']:.1f}")
+    print(f"Category: {result['category']}")
+    if result['percentile'] is not None:
+        print(f"BMI-for-age percentile: {result['percentile']:.0f}")
+    print(f"Ideal Weight Range: {ideal_min:.1f} - {ideal_max:.1f} {unit}")
+    print(f"BMI Prime: {result['bmi_prime']:.2f}")
+    print(f"Body Fat (estimate): {result['body_fat']:.1f}%")
+    print(f"BMR: {result['bmr']:.0f} kcal/day")
+    if result['tdee'] is not None:
+        print(f"TDEE: {result['tdee']:.0f} kcal/day")
+    return 0
+
+
+def cmd_import(args):
+    from bmi.importer import import_files
+    return import_files(args.files, args.history)
+
+
+def cmd_export(args):
+    store = load_history(args.history)
+    if not len(store):
+        print("No data to export.", file=sys.stderr)
+        return 1
+    snapshot = store.snapshot()
+    if args.output.lower().endswith('.pdf'):
+        from bmi.report import write_pdf_report
+        pages = write_pdf_report(snapshot, args.output)
+        print(f"Wrote {pages} pages to {args.output}")
+    else:
+        from bmi.export import export_csv
+        rows = export_csv(snapshot, args.output)
+        print(f"Wrote {rows:,} rows to {args.output}")
+    return 0
+
+
+def cmd_stats(args):
+    store = load_history(args.history)
+    bmi = store.column('bmi')
+    ts = store.column('ts')
+    categories = store.column('category')
+    if args.person:
+        rows = store.rows_for(args.person)
+        bmi, ts, categories = bmi[rows], ts[rows], categories[rows]
+    if not len(bmi):
+        print("No records.")
+        return 0
+    first, last = format_dates(np.array([ts.min(), ts.max()]))
+    print(f"Records: {len(bmi):,}")
+    if not args.person:
+        print(f"People: {len(store.person_names()):,}")
+    print(f"From {first} to {last}")
+    print(f"BMI: mean {bmi.mean():.1f}, min {bmi.min():.1f}, max {bmi.max():.1f}")
+    counts = np.bincount(categories, minlength=len(store.categories))
+    for code in np.argsort(-counts, kind='stable'):
+        if counts[code]:
+            print(f"  {store.categories.decode(code):<24}{counts[code]:>10,}")
+    return 0
+
+
+def cmd_score(args):
+    from bmi.batch import score_file, summary_lines
+    from bmi.importer import CsvImportError
+    start = time.perf_counter()
+    try:
+        stats = score_file(args.input, args.output, args.workers)
+    except (OSError, CsvImportError) as e:
+        print(f"{args.input}: {e}", file=sys.stderr)
+        return 1
+    for line in summary_lines(stats, time.perf_counter() - start):
+        print(line)
+    for line, reason in stats.errors:
+        print(f"  line {line}: {reason}", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args):
+    from bmi import server
+    port = server.DEFAULT_PORT if args.port is None else args.port
+    return server.run(args.host, port, args.max_batch or server.MAX_BATCH, args.max_pending or server.MAX_PENDING)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m bmi", description="BMI calculator without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    compute = commands.add_parser('compute', help="score one measurement")
+    compute.add_argument('--height', type=float, required=True, help="cm, or total inches with --units imperial")
+    compute.add_argument('--weight', type=float, required=True, help="kg, or lbs with --units imperial")
+    compute.add_argument('--age', type=age, required=True)
+    compute.add_argument('--gender', choices=engine.GENDERS, type=str.title,
+                         help="picks the growth chart for under-18s and the BMR/body fat equations")
+    compute.add_argument('--activity', choices=list(ACTIVITY_CHOICES), type=str.lower, help="needed for TDEE")
+    compute.add_argument('--units', choices=('metric', 'imperial'), default='metric')
+    compute.set_defaults(run=cmd_compute)
+
+    importer = commands.add_parser('import', help="append CSV files to the history")
+    importer.add_argument('files', nargs='+', help="CSV files (.csv or .csv.gz)")
+    importer.set_defaults(run=cmd_import)
+
+    export = commands.add_parser('export', help="write the history to CSV, CSV.GZ or PDF")
+    export.add_argument('output')
+    export.set_defaults(run=cmd_export)
+
+    stats = commands.add_parser('stats', help="summarize the history")
+    stats.add_argument('--person', help="only this person's records")
+    stats.set_defaults(run=cmd_stats)
+
+    score = commands.add_parser('score', help="score a large CSV file with several processes (history untouched)")
+    score.add_argument('input', help="CSV file with the import columns")
+    score.add_argument('output', help="scored CSV, in the export layout")
+    score.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    score.set_defaults(run=cmd_score)
+
+    # Defaults live in bmi.server, which is only imported to serve (asyncio is slow to load)
+    serve = commands.add_parser('serve', help="run the local HTTP/JSON scoring service")
+    serve.add_argument('--host', default="127.0.0.1")
+    serve.add_argument('--port', type=int, help="default 8765")
+    serve.add_argument('--max-batch', type=int, help="records per vectorized pass (default 512)")
+    serve.add_argument('--max-pending', type=int, help="records in flight before requests get 503 (default 4096)")
+    serve.set_defaults(run=cmd_serve)
+
+    for command in (importer, export, stats):
+        command.add_argument('--history', default=DEFAULT_HISTORY_FILE, help="history file (default: %(default)s)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.run(args)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
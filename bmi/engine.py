@@ -0,0 +1,240 @@
+"""BMI math shared by the GUI and the batch tools.
+
+The batch functions take NumPy arrays and score a whole dataset in one
+vectorized pass.  The scalar helpers use the very same thresholds and
+formulas, so a record scored in the GUI and the same record scored in a
+batch always give identical results.
+
+Adults are classified by WHO BMI cut-offs; under-18s by their
+BMI-for-age percentile (see bmi.growth), which depends on sex as well.
+Scores also carry the body-composition and energy estimates from
+bmi.metrics (BMR, TDEE, body fat, BMI Prime).
+"""
+import bisect
+import math
+
+import numpy as np
+
+from bmi import growth, metrics
+
+# Unit conversion
+CM_PER_INCH = 2.54
+KG_PER_LB = 0.453592
+LBS_PER_KG = 2.20462
+
+# Validation limits (same rules as the input form)
+MIN_HEIGHT_CM = 50
+MIN_WEIGHT_KG = 10
+MIN_HEIGHT_IN = 20
+MIN_WEIGHT_LBS = 20
+
+# Ideal weight is the weight range for a "Normal Weight" BMI
+IDEAL_BMI_MIN = 18.5
+IDEAL_BMI_MAX = 24.9
+
+ADULT_AGE = 18
+MIN_AGE = 1
+MAX_AGE = 120
+
+GENDERS = ("Male", "Female", "Other")
+ACTIVITY_LEVELS = (
+    "Sedentary (little or no exercise)",
+    "Lightly Active (light exercise 1-3 days/week)",
+    "Moderately Active (moderate exercise 3-5 days/week)",
+    "Very Active (hard exercise 6-7 days/week)",
+    "Extra Active (very hard exercise & physical job)",
+)
+GENDER_CODES = {label: code for code, label in enumerate(GENDERS)}
+ACTIVITY_CODES = {label: code for code, label in enumerate(ACTIVITY_LEVELS)}
+
+# Category codes index into this tuple
+CATEGORIES = (
+    "Severely Underweight",
+    "Underweight",
+    "Normal Weight",
+    "Overweight",
+    "Obesity Class I",
+    "Obesity Class II",
+    "Obesity Class III",
+    "Underweight (Child)",
+    "Healthy Weight (Child)",
+    "Overweight (Child)",
+    "Obese (Child)",
+)
+CATEGORY_CODES = {label: code for code, label in enumerate(CATEGORIES)}
+
+ADULT_THRESHOLDS = (16, 18.5, 25, 30, 35, 40)
+CHILD_THRESHOLDS = growth.CUTOFF_PERCENTILES  # BMI-for-age percentiles, not BMI values
+CHILD_OFFSET = len(ADULT_THRESHOLDS) + 1
+
+# Age bands: lower bounds of teen, adult and senior
+AGE_BAND_LIMITS = (13, ADULT_AGE, 65)
+AGE_BANDS = ("child", "teen", "adult", "senior")
+
+# Colour bands: 0 = under, 1 = normal, 2 = over, 3 = obese
+COLOR_THRESHOLDS = (18.5, 25, 30)
+
+_ADULT_THRESHOLDS = np.array(ADULT_THRESHOLDS, dtype=np.float64)
+_COLOR_THRESHOLDS = np.array(COLOR_THRESHOLDS, dtype=np.float64)
+_AGE_BAND_LIMITS = np.array(AGE_BAND_LIMITS)
+
+
+def imperial_to_metric(total_inches, weight_lbs):
+    """Convert inches/lbs to cm/kg (works on scalars and arrays)"""
+    return total_inches * CM_PER_INCH, weight_lbs * KG_PER_LB
+
+
+def validate_metric(height_cm, weight_kg):
+    """Raise ValueError for metric inputs the form would reject"""
+    if not (math.isfinite(height_cm) and math.isfinite(weight_kg)): raise ValueError("Height and weight must be numbers")
+    if height_cm < MIN_HEIGHT_CM: raise ValueError("Height must be at least 50cm")
+    if weight_kg < MIN_WEIGHT_KG: raise ValueError("Weight must be at least 10kg")
+
+
+def validate_imperial(total_inches, weight_lbs):
+    """Raise ValueError for imperial inputs the form would reject"""
+    if not (math.isfinite(total_inches) and math.isfinite(weight_lbs)): raise ValueError("Height and weight must be numbers")
+    if total_inches < MIN_HEIGHT_IN: raise ValueError("Height too low")
+    if weight_lbs < MIN_WEIGHT_LBS: raise ValueError("Weight must be at least 20lbs")
+
+
+def valid_metric(height_cm, weight_kg):
+    """Vectorized validate_metric(): True where a row would be accepted"""
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    return np.isfinite(height_cm) & np.isfinite(weight_kg) & (height_cm >= MIN_HEIGHT_CM) & (weight_kg >= MIN_WEIGHT_KG)
+
+
+def valid_imperial(total_inches, weight_lbs):
+    """Vectorized validate_imperial(): True where a row would be accepted"""
+    total_inches = np.asarray(total_inches, dtype=np.float64)
+    weight_lbs = np.asarray(weight_lbs, dtype=np.float64)
+    return np.isfinite(total_inches) & np.isfinite(weight_lbs) & (total_inches >= MIN_HEIGHT_IN) & (weight_lbs >= MIN_WEIGHT_LBS)
+
+
+def compute_bmi(height_cm, weight_kg):
+    """BMI = kg / m^2 (works on scalars and arrays)"""
+    height_m = height_cm / 100.0
+    return weight_kg / (height_m * height_m)
+
+
+def ideal_weight_range(height_cm):
+    """Return (min_kg, max_kg) for a normal BMI at this height"""
+    height_m = height_cm / 100.0
+    return IDEAL_BMI_MIN * (height_m * height_m), IDEAL_BMI_MAX * (height_m * height_m)
+
+
+def gender_codes(genders):
+    """Gender labels to int8 codes (indexes into GENDERS; unknown labels count as Other)"""
+    return np.array([GENDER_CODES.get(gender, growth.OTHER_SEX) for gender in genders], dtype=np.int8)
+
+
+def activity_codes(activities):
+    """Activity labels to int8 codes (indexes into ACTIVITY_LEVELS; -1 for unknown labels)"""
+    return np.array([ACTIVITY_CODES.get(activity, -1) for activity in activities], dtype=np.int8)
+
+
+def category_code(bmi, age, gender=None):
+    """Category code for a single record"""
+    if age >= ADULT_AGE:
+        return bisect.bisect_right(ADULT_THRESHOLDS, bmi)
+    return CHILD_OFFSET + bisect.bisect_right(growth.cutoffs(age, gender), bmi)
+
+
+def category_label(code):
+    return CATEGORIES[code]
+
+
+def get_bmi_category(bmi, age, gender=None):
+    """Category label for a single record"""
+    return CATEGORIES[category_code(bmi, age, gender)]
+
+
+def categorize(bmi, age, gender=None):
+    """Vectorized category codes (int8) for arrays of BMI and age.
+
+    `gender` holds codes from gender_codes(); None scores children
+    against the sex-neutral table.
+    """
+    bmi = np.asarray(bmi, dtype=np.float64)
+    age = np.broadcast_to(np.asarray(age), bmi.shape)
+    codes = np.searchsorted(_ADULT_THRESHOLDS, bmi, side='right').astype(np.int8)
+    child = np.flatnonzero(age.ravel() < ADULT_AGE)
+    if len(child):
+        sex = None if gender is None else np.broadcast_to(np.asarray(gender), bmi.shape).ravel()[child]
+        offsets = growth.category_offsets(bmi.ravel()[child], age.ravel()[child], sex)
+        codes.ravel()[child] = CHILD_OFFSET + offsets
+    return codes
+
+
+def color_band(bmi):
+    """Colour band for a single BMI value"""
+    return bisect.bisect_right(COLOR_THRESHOLDS, bmi)
+
+
+def color_bands(bmi):
+    """Vectorized colour bands (int8)"""
+    return np.searchsorted(_COLOR_THRESHOLDS, np.asarray(bmi, dtype=np.float64), side='right').astype(np.int8)
+
+
+def age_band(age):
+    """Index into AGE_BANDS for one age"""
+    return bisect.bisect_right(AGE_BAND_LIMITS, age)
+
+
+def age_bands(ages):
+    """Vectorized age_band() (int8)"""
+    return np.searchsorted(_AGE_BAND_LIMITS, np.asarray(ages), side='right').astype(np.int8)
+
+
+def score(height_cm, weight_kg, age, gender=None, activity=None):
+    """Score one record; returns a dict of plain Python values.
+
+    'percentile' is the BMI-for-age percentile for under-18s, else None.
+    The metrics.METRICS keys are included too; 'tdee' is None unless
+    `activity` is one of ACTIVITY_LEVELS.
+    """
+    bmi = compute_bmi(height_cm, weight_kg)
+    code = category_code(bmi, age, gender)
+    ideal_min, ideal_max = ideal_weight_range(height_cm)
+    result = {
+        'bmi': bmi,
+        'category_code': code,
+        'category': CATEGORIES[code],
+        'percentile': growth.percentile(bmi, age, gender) if age < ADULT_AGE else None,
+        'ideal_min_kg': ideal_min,
+        'ideal_max_kg': ideal_max,
+    }
+    result.update(metrics.derive(height_cm, weight_kg, age, bmi, GENDER_CODES.get(gender), ACTIVITY_CODES.get(activity)))
+    return result
+
+
+def score_batch(height_cm, weight_kg, age, gender=None, activity=None):
+    """Score many records at once.
+
+    Takes array-likes of heights (cm), weights (kg), ages (years) and
+    optionally gender codes (see gender_codes()) and activity codes (see
+    activity_codes()), and returns a dict of arrays with the same keys as
+    score(), except that 'category' is left out; map 'category_code'
+    through CATEGORIES when labels are needed.  'percentile' is NaN for
+    adults and 'tdee' NaN where the activity level is unknown.
+    """
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    bmi = compute_bmi(height_cm, weight_kg)
+    age = np.broadcast_to(np.asarray(age), bmi.shape)
+    ideal_min, ideal_max = ideal_weight_range(height_cm)
+    percentile = np.full(bmi.shape, np.nan)
+    child = age < ADULT_AGE
+    if child.any():
+        sex = None if gender is None else np.broadcast_to(np.asarray(gender), bmi.shape)[child]
+        percentile[child] = growth.percentiles(bmi[child], age[child], sex)
+    result = {
+        'bmi': bmi,
+        'category_code': categorize(bmi, age, gender),
+        'percentile': percentile,
+        'ideal_min_kg': ideal_min,
+        'ideal_max_kg': ideal_max,
+    }
+    result.update(metrics.derive_batch(height_cm, weight_kg, age, bmi, gender, activity))
+    return result
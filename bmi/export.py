@@ -0,0 +1,123 @@
+"""Streaming history exporters.
+
+Exporters read a HistoryStore.snapshot(), so they can run on a worker
+thread while the GUI keeps adding entries.  Rows are converted and
+written a chunk at a time; memory use does not grow with the history.
+"""
+import csv
+import gzip
+import os
+
+import numpy as np
+
+from bmi import engine, metrics
+from bmi.history import format_dates
+
+# (CSV header, key in snapshot_columns())
+CSV_COLUMNS = (
+    ('date', 'date'),
+    ('name', 'name'),
+    ('age', 'age'),
+    ('gender', 'gender'),
+    ('activity', 'activity'),
+    ('height_cm', 'height'),
+    ('weight_kg', 'weight'),
+    ('bmi', 'bmi'),
+    ('category', 'category'),
+    ('bmi_prime', 'bmi_prime'),
+    ('body_fat_pct', 'body_fat'),
+    ('bmr_kcal', 'bmr'),
+    ('tdee_kcal', 'tdee'),
+)
+
+_ENCODED = ('name', 'gender', 'activity', 'category')
+_ONE_DECIMAL = ('height', 'weight', 'bmi')
+# Derived estimates (bmi.metrics) -> decimals written
+_METRIC_DECIMALS = {'bmi_prime': 2, 'body_fat': 1, 'bmr': 0, 'tdee': 0}
+
+
+class ExportCancelled(Exception):
+    """Raised when the progress callback asks to stop"""
+
+
+def open_text_output(path):
+    """Open a text file for writing, gzip-compressed when the name ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+    return open(path, 'w', encoding='utf-8', newline='', buffering=1 << 20)
+
+
+def snapshot_columns(snap, start, stop):
+    """Decode one slice of a snapshot into plain Python lists, keyed by column.
+
+    The metrics.METRICS estimates come along as unrounded float arrays;
+    see format_metrics().  Height and weight go back to the one decimal
+    the history holds them to (the columns are float32).
+    """
+    out = {}
+    rounded = {}
+    for column in ('ts', 'age') + _ONE_DECIMAL + _ENCODED:
+        values = snap[column][start:stop]
+        if column == 'ts':
+            out['ts'] = values.tolist()
+            out['date'] = format_dates(values).tolist()
+        elif column in _ENCODED:
+            out[column] = np.asarray(snap['vocab'][column], dtype=object)[values].tolist()
+        elif column in _ONE_DECIMAL:
+            rounded[column] = np.round(values.astype(np.float64), 1)
+            out[column] = rounded[column].tolist()
+        else:
+            out[column] = values.tolist()
+    # Store codes -> engine codes through the (small) vocabularies
+    gender = engine.gender_codes(snap['vocab']['gender'])[snap['gender'][start:stop]]
+    activity = engine.activity_codes(snap['vocab']['activity'])[snap['activity'][start:stop]]
+    # From the BMI itself, as score_batch() computes them, not the stored one rounded for display
+    bmi = engine.compute_bmi(rounded['height'], rounded['weight'])
+    out.update(metrics.derive_batch(rounded['height'], rounded['weight'], snap['age'][start:stop], bmi, gender, activity))
+    return out
+
+
+def format_metrics(columns):
+    """CSV text for the metric columns of snapshot_columns() or score_batch(); unknown TDEE is left blank"""
+    out = {}
+    for key, decimals in _METRIC_DECIMALS.items():
+        values = columns[key]
+        missing = np.isnan(values)
+        if decimals:
+            text = list(map(f'{{:.{decimals}f}}'.format, values.tolist()))
+        else:
+            # str() of an int is about three times quicker than '{:.0f}'
+            text = list(map(str, np.rint(np.where(missing, 0, values)).astype(np.int64).tolist()))
+        for row in np.flatnonzero(missing).tolist():
+            text[row] = ""
+        out[key] = text
+    return out
+
+
+def export_csv(snap, path, progress=None, chunk_rows=50000):
+    """Write a snapshot to CSV (or .csv.gz) in chunks.
+
+    `progress(done, total)` is called after every chunk; if it returns
+    False the partial file is removed and ExportCancelled is raised.
+    Returns the number of rows written.
+    """
+    total = len(snap['ts'])
+    try:
+        with open_text_output(path) as f:
+            writer = csv.writer(f)
+            writer.writerow([header for header, _ in CSV_COLUMNS])
+            for start in range(0, total, chunk_rows):
+                stop = min(start + chunk_rows, total)
+                columns = snapshot_columns(snap, start, stop)
+                # csv's float repr is the slowest part of the export; one decimal is all we store
+                for column in _ONE_DECIMAL:
+                    columns[column] = list(map('{:.1f}'.format, columns[column]))
+                columns.update(format_metrics(columns))
+                writer.writerows(zip(*(columns[column] for _, column in CSV_COLUMNS)))
+                if progress is not None and progress(stop, total) is False:
+                    raise ExportCancelled()
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return total
@@ -0,0 +1,112 @@
+"""BMI-for-age percentiles for children and teens (CDC 2000 growth charts).
+
+The reference is the CDC's LMS table (data/bmiagerev.csv: sex, age in
+months, L, M, S for ages 2-20).  A child's BMI-for-age z-score is
+
+    z = ((BMI / M) ** L - 1) / (L * S)
+
+and the percentile is the normal CDF of z.  Categories follow the CDC:
+under the 5th percentile is underweight, 85th-95th overweight, 95th and
+above obese.
+
+Everything the scoring needs is precomputed once, on first use, into
+arrays indexed by [sex, whole month of age]: L, M, S interpolated to
+each month, and the BMI values at the 5th/85th/95th percentiles.  A
+lookup is then a plain array index, and whole cohorts are scored with a
+few NumPy operations.
+
+Sex indexes follow engine.GENDERS (0 = Male, 1 = Female, 2 = Other).
+The CDC tables are sex-specific; "Other" (and unknown) uses the mean of
+the two, which sits between the boys' and girls' cut-offs.
+"""
+import os
+
+import numpy as np
+
+LMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bmiagerev.csv")
+
+MIN_MONTHS = 24
+MAX_MONTHS = 240
+CUTOFF_PERCENTILES = (5, 85, 95)
+# Standard normal quantiles of CUTOFF_PERCENTILES
+_CUTOFF_Z = np.array([-1.6448536269514722, 1.0364333894937898, 1.6448536269514722])
+_SEX_INDEX = {"Male": 0, "Female": 1}
+OTHER_SEX = 2
+
+_tables = None
+
+
+def _normal_cdf_table():
+    """Phi(z) sampled every 0.001 on [-8, 8], for np.interp()"""
+    z = np.linspace(-8, 8, 16001)
+    # Abramowitz & Stegun 7.1.26 is accurate to 1.5e-7, plenty for whole percentiles
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return z, 0.5 * (1 + np.sign(z) * erf)
+
+
+def load_tables(path=LMS_FILE):
+    """Read the LMS file and build the per-(sex, month) arrays; cached after the first call"""
+    global _tables
+    if _tables is None:
+        data = np.loadtxt(path, delimiter=',', skiprows=1)
+        months = np.arange(MIN_MONTHS, MAX_MONTHS + 1, dtype=np.float64)
+        lms = np.empty((3, 3, len(months)))
+        for sex in (0, 1):
+            rows = data[data[:, 0] == sex + 1]
+            for column in range(3):
+                lms[sex, column] = np.interp(months, rows[:, 1], rows[:, 2 + column])
+        lms[OTHER_SEX] = (lms[0] + lms[1]) / 2
+        L, M, S = lms[:, 0], lms[:, 1], lms[:, 2]
+        # BMI at each cut-off percentile: M * (1 + L*S*z) ** (1/L), shape (sex, month, cut-off)
+        cutoffs = M[..., None] * (1 + (L * S)[..., None] * _CUTOFF_Z) ** (1 / L[..., None])
+        _tables = {'L': L, 'M': M, 'S': S, 'cutoffs': cutoffs, 'cdf': _normal_cdf_table()}
+    return _tables
+
+
+def age_in_months(age_years):
+    """Whole months used for the lookup; ages are recorded in whole years, so mid-year is assumed"""
+    return np.asarray(age_years, dtype=np.int64) * 12 + 6
+
+
+def sex_index(gender):
+    """Table row for a gender label (Male, Female, anything else)"""
+    return _SEX_INDEX.get(gender, OTHER_SEX)
+
+
+def _lookup(age_years, sex):
+    """Clamp into the table's range and return (sex, month) indexes"""
+    month = np.clip(age_in_months(age_years), MIN_MONTHS, MAX_MONTHS) - MIN_MONTHS
+    sex = np.full(month.shape, OTHER_SEX, dtype=np.int64) if sex is None else np.asarray(sex, dtype=np.int64)
+    return sex, month
+
+
+def cutoffs(age_years, gender=None):
+    """BMI values at the 5th/85th/95th percentile for one child, as a tuple"""
+    sex, month = _lookup(age_years, sex_index(gender))
+    return tuple(load_tables()['cutoffs'][sex, month].tolist())
+
+
+def category_offsets(bmi, age_years, sex=None):
+    """Vectorized: how many cut-offs each BMI reaches (0-3), like bisect_right"""
+    bmi = np.asarray(bmi, dtype=np.float64)
+    sex, month = _lookup(age_years, sex)
+    limits = load_tables()['cutoffs'][sex, month]
+    return (bmi[..., None] >= limits).sum(axis=-1)
+
+
+def percentiles(bmi, age_years, sex=None):
+    """Vectorized BMI-for-age percentiles (0-100)"""
+    bmi = np.asarray(bmi, dtype=np.float64)
+    tables = load_tables()
+    sex, month = _lookup(age_years, sex)
+    L, M, S = tables['L'][sex, month], tables['M'][sex, month], tables['S'][sex, month]
+    z = ((bmi / M) ** L - 1) / (L * S)
+    return 100 * np.interp(z, *tables['cdf'])
+
+
+def percentile(bmi, age_years, gender=None):
+    """Percentile for one child"""
+    return float(percentiles(bmi, age_years, sex_index(gender)))
@@ -0,0 +1,353 @@
+"""Compact, columnar in-memory history.
+
+Instead of one 9-key dict per calculation, every field lives in a typed
+NumPy column.  Repeated strings (name, gender, activity, category) are
+dictionary-encoded into small integer codes, and each person has an
+array of row offsets so their series can be gathered without scanning
+the whole history.  `store.index` (bmi.index) answers name, date-range
+and category queries; `store.rollups` (bmi.rollups) keeps the cohort
+statistics.
+"""
+from array import array
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from bmi import engine, metrics
+from bmi.index import HistoryIndex
+from bmi.rollups import HistoryRollups
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+# name -> dtype of the fixed-width columns
+COLUMNS = {
+    'ts': np.int64,        # epoch seconds
+    'age': np.int16,
+    'height': np.float32,  # cm
+    'weight': np.float32,  # kg
+    'bmi': np.float32,
+    'name': np.int32,      # codes into HistoryStore.names
+    'gender': np.int8,     # codes into HistoryStore.genders
+    'activity': np.int8,   # codes into HistoryStore.activities
+    'category': np.int8,   # codes into HistoryStore.categories (== engine codes)
+}
+
+# Keys of the entry dicts the store accepts and hands back
+ENTRY_FIELDS = ('ts', 'date', 'name', 'age', 'gender', 'activity', 'height', 'weight', 'bmi', 'category')
+
+
+def entry_key(entry):
+    """What makes two entries the same record, at the precision the store keeps"""
+    return (int(entry['ts']), entry['name'], int(entry['age']), entry['gender'], entry['activity'],
+            round(float(entry['height']), 1), round(float(entry['weight']), 1), round(float(entry['bmi']), 1),
+            entry['category'])
+
+
+class Dictionary:
+    """Two-way mapping between strings and small integer codes"""
+    __slots__ = ('values', 'codes')
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.encode(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+
+class HistoryStore:
+    """Columnar history with a per-person row index.
+
+    Rows are only ever appended, tombstoned (delete()) or moved out a
+    whole person at a time (evict()).  A tombstoned row keeps its offset
+    but drops out of queries, snapshots and the rollups.
+    """
+    __slots__ = ('size', 'version', 'columns', 'deleted', 'deleted_count', 'names', 'genders', 'activities',
+                 'categories', 'person_rows', 'index', 'rollups')
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.version = 0  # changes with every modification, for caches of derived data
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.deleted = np.zeros(capacity, dtype=bool)
+        self.deleted_count = 0
+        self.names = Dictionary()
+        self.genders = Dictionary()
+        self.activities = Dictionary()
+        self.categories = Dictionary(engine.CATEGORIES)
+        self.person_rows = []  # name code -> array of row offsets
+        self.index = HistoryIndex(self)
+        self.rollups = HistoryRollups(self)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, needed):
+        capacity = len(self.columns['ts'])
+        if needed <= capacity: return
+        capacity = max(needed, 2 * capacity)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+        grown = np.zeros(capacity, dtype=bool)
+        grown[:self.size] = self.deleted[:self.size]
+        self.deleted = grown
+
+    def _encode_name(self, name):
+        code = self.names.encode(name)
+        if code == len(self.person_rows):
+            self.person_rows.append(array('q'))
+        return code
+
+    def append(self, entry):
+        """Add one entry dict (see entry()) and return its row number"""
+        row = self.size
+        self._reserve(row + 1)
+        c = self.columns
+        name = self._encode_name(entry['name'])
+        c['ts'][row] = entry['ts']
+        c['age'][row] = entry['age']
+        c['height'][row] = entry['height']
+        c['weight'][row] = entry['weight']
+        c['bmi'][row] = entry['bmi']
+        c['name'][row] = name
+        c['gender'][row] = self.genders.encode(entry['gender'])
+        c['activity'][row] = self.activities.encode(entry['activity'])
+        c['category'][row] = self.categories.encode(entry['category'])
+        self.deleted[row] = False
+        self.person_rows[name].append(row)
+        self.size += 1
+        self.version += 1
+        return row
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def extend_columns(self, columns):
+        """Bulk-append rows given as columns (arrays or lists keyed like an entry)"""
+        count = len(columns['ts'])
+        if not count: return
+        start = self.size
+        stop = start + count
+        self._reserve(stop)
+        c = self.columns
+        for field in ('ts', 'age', 'height', 'weight', 'bmi'):
+            c[field][start:stop] = columns[field]
+        c['gender'][start:stop] = [self.genders.encode(value) for value in columns['gender']]
+        c['activity'][start:stop] = [self.activities.encode(value) for value in columns['activity']]
+        c['category'][start:stop] = [self.categories.encode(value) for value in columns['category']]
+        names = [self._encode_name(value) for value in columns['name']]
+        c['name'][start:stop] = names
+        self.deleted[start:stop] = False
+        person_rows = self.person_rows
+        for row, name in enumerate(names, start):
+            person_rows[name].append(row)
+        self.size = stop
+        self.version += 1
+
+    def evict(self, name_codes):
+        """Remove every row of these people; returns the rows as columns of codes.
+
+        For bmi.tiers.  The rollups fold the rows in first and go on
+        counting them; restore() puts them back without counting them twice.
+        Row offsets change, so the index starts over.
+        """
+        self.rollups.update()
+        gone = np.isin(self.column('name'), np.asarray(name_codes, dtype=np.int32))
+        deleted = self.deleted[:self.size]
+        # Tombstones are dropped for good on the way out
+        removed = {name: self.column(name)[gone & ~deleted] for name in COLUMNS}
+        keep = ~gone
+        count = int(np.count_nonzero(keep))
+        for column in self.columns.values():
+            column[:count] = column[:self.size][keep]
+        self.deleted[:count] = deleted[keep]
+        self.deleted_count = int(np.count_nonzero(self.deleted[:count]))
+        self.size = count
+        self._rebuild_person_rows()
+        self.version += 1
+        self.index.reset()
+        self.rollups.size = count
+        return removed
+
+    def restore(self, columns):
+        """Append rows returned by evict(), codes and all"""
+        count = len(columns['ts'])
+        if not count: return
+        self.rollups.update()
+        start = self.size
+        stop = start + count
+        self._reserve(stop)
+        for name in COLUMNS:
+            self.columns[name][start:stop] = columns[name]
+        self.deleted[start:stop] = False
+        person_rows = self.person_rows
+        for row, name in enumerate(columns['name'].tolist(), start):
+            person_rows[name].append(row)
+        self.size = stop
+        self.version += 1
+        self.rollups.size = stop
+
+    def _rebuild_person_rows(self):
+        names = self.column('name')
+        order = np.argsort(names, kind='stable')
+        bounds = np.searchsorted(names[order], np.arange(len(self.names) + 1)).tolist()
+        # Slicing one array('q') is far cheaper than building one per person from a list
+        rows = array('q', order.astype(np.int64).tobytes())
+        self.person_rows = [rows[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    def delete(self, row):
+        """Tombstone one row; returns False if it already was"""
+        if self.deleted[row]: return False
+        rollups = self.rollups
+        rollups.update()
+        code = int(self.columns['name'][row])
+        before = rollups.person_transitions(code)
+        rollups.retract(row)
+        self.deleted[row] = True
+        self.deleted_count += 1
+        self.version += 1
+        rollups.restate(code, before)
+        return True
+
+    def insert(self, entry):
+        """append() for a record that may belong mid-series (an edit, an undone delete).
+
+        The rollups count the person's category changes in time order
+        instead of arrival order, so taking it out again restores them exactly.
+        """
+        rollups = self.rollups
+        rollups.update()
+        code = self.names.codes.get(entry['name'])
+        before = None if code is None else rollups.person_transitions(code)
+        transitions = rollups.transitions.copy()
+        row = self.append(entry)
+        rollups.update()
+        rollups.transitions = transitions
+        rollups.restate(int(self.columns['name'][row]), before)
+        return row
+
+    def find(self, entry, skip=()):
+        """Row of a live record equal to `entry` (see entry_key), or None; rows in `skip` don't count"""
+        ts = int(entry['ts'])
+        key = entry_key(entry)
+        for row in self.index.query(name=entry['name'], since=ts, until=ts + 1).tolist():
+            if row not in skip and entry_key(self.entry(row)) == key:
+                return row
+        return None
+
+    def clear(self):
+        self.size = 0
+        self.deleted_count = 0
+        self.version += 1
+        self.names = Dictionary()
+        self.person_rows = []
+        self.index.reset()
+        self.rollups.reset()
+
+    def column(self, name):
+        """View of a whole column (no copy)"""
+        return self.columns[name][:self.size]
+
+    def rows_for(self, name):
+        """Row offsets for one person, oldest first"""
+        code = self.names.codes.get(name)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return np.array(self.person_rows[code], dtype=np.int64)
+
+    def person_names(self):
+        return list(self.names.values)
+
+    def value(self, row, field):
+        """Decoded Python value of one cell"""
+        c = self.columns
+        if field == 'date':
+            return format_minute(int(c['ts'][row]) // 60)
+        elif field == 'name': return self.names.decode(c['name'][row])
+        elif field == 'gender': return self.genders.decode(c['gender'][row])
+        elif field == 'activity': return self.activities.decode(c['activity'][row])
+        elif field == 'category': return self.categories.decode(c['category'][row])
+        elif field in ('ts', 'age'): return int(c[field][row])
+        else: return round(float(c[field][row]), 1)
+
+    def metrics(self, row):
+        """bmi.metrics estimates (BMR, TDEE, body fat, BMI Prime) for one row"""
+        height, weight = self.value(row, 'height'), self.value(row, 'weight')
+        # From the BMI itself, like engine.score() and the export, not the stored one rounded for display
+        return metrics.derive(height, weight, self.value(row, 'age'), engine.compute_bmi(height, weight),
+                              engine.GENDER_CODES.get(self.value(row, 'gender')),
+                              engine.ACTIVITY_CODES.get(self.value(row, 'activity')))
+
+    def entry(self, row):
+        """Row as a dict with the same keys append() accepts (plus 'date')"""
+        return {field: self.value(row, field) for field in ENTRY_FIELDS}
+
+    def iter_entries(self, rows=None):
+        for row in (range(self.size) if rows is None else rows):
+            yield self.entry(row)
+
+    def snapshot(self):
+        """Copy of the live rows' columns and vocabularies, safe to read from another thread"""
+        if self.deleted_count:
+            live = ~self.deleted[:self.size]
+            snap = {name: self.column(name)[live] for name in COLUMNS}
+        else:
+            snap = {name: self.column(name).copy() for name in COLUMNS}
+        snap['vocab'] = {
+            'name': tuple(self.names.values),
+            'gender': tuple(self.genders.values),
+            'activity': tuple(self.activities.values),
+            'category': tuple(self.categories.values),
+        }
+        return snap
+
+
+@lru_cache(maxsize=4096)
+def format_minute(minute):
+    """DATE_FORMAT for one epoch minute; cached, as the grid redraws the same rows again and again"""
+    return datetime.fromtimestamp(minute * 60).strftime(DATE_FORMAT)
+
+
+def parse_dates(strings):
+    """Vectorized inverse of format_dates(); unparseable strings raise ValueError"""
+    local = np.array([value.strip().replace(' ', 'T', 1) for value in strings], dtype='datetime64[m]')
+    if np.isnat(local).any():
+        raise ValueError("empty date")
+    local = local.astype('datetime64[s]').astype(np.int64)
+    if not len(local):
+        return local
+    # Wall-clock to UTC offsets only change on hour boundaries
+    hours, inverse = np.unique(local // 3600, return_inverse=True)
+    epoch = datetime(1970, 1, 1)
+    offsets = np.array([int((epoch + timedelta(hours=int(h))).timestamp()) - int(h) * 3600 for h in hours],
+                       dtype=np.int64)
+    return local + offsets[inverse]
+
+
+def format_dates(ts):
+    """Vectorized local-time DATE_FORMAT strings for an array of epoch seconds"""
+    ts = np.asarray(ts, dtype=np.int64)
+    if not len(ts):
+        return np.empty(0, dtype='<U16')
+    # UTC offsets only change on hour boundaries, so look them up once per hour
+    hours, inverse = np.unique(ts // 3600, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(h) * 3600).astimezone().utcoffset().total_seconds()
+                        for h in hours], dtype=np.int64)
+    local = (ts + offsets[inverse]).astype('datetime64[s]')
+    return np.char.replace(np.datetime_as_string(local, unit='m'), 'T', ' ')
@@ -0,0 +1,282 @@
+"""Bulk CSV import.
+
+Rows are read in chunks, validated with the same rules as the input form,
+scored with the vectorized engine and handed back as column batches that
+go straight into HistoryStore.extend_columns() and
+HistoryLog.append_columns().
+
+Headers are matched case-insensitively.  Required: name, age, gender,
+activity, and either height_cm + weight_kg (plain height/weight also
+work) or height_in + weight_lbs.  With an extra height_ft column,
+height_in holds the remaining inches, as on the form.  An optional date
+column ("YYYY-MM-DD HH:MM") is kept; without it (or where it is blank)
+rows get the import time.  Columns such as bmi and category are recomputed, not
+trusted.
+
+Command line (appends to the history file the GUI loads):
+
+    python -m bmi.importer screening.csv [more.csv ...] [--history FILE]
+"""
+import argparse
+import csv
+import gzip
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from bmi import engine
+from bmi.history import parse_dates
+from bmi.storage import DEFAULT_HISTORY_FILE, HistoryLog
+
+BATCH_ROWS = 50000
+MAX_ERRORS = 100
+
+HEADER_ALIASES = {
+    'height': 'height_cm',
+    'weight': 'weight_kg',
+    'sex': 'gender',
+    'activity_level': 'activity',
+}
+GENDER_KEYS = {'m': "Male", 'f': "Female", 'o': "Other"}
+# First word of an activity level ("Sedentary", "Lightly", ...) identifies it
+ACTIVITY_KEYS = {level.split()[0].lower(): level for level in engine.ACTIVITY_LEVELS}
+_CATEGORY_LABELS = np.array(engine.CATEGORIES, dtype=object)
+
+
+class CsvImportError(ValueError):
+    """The file can't be imported at all (e.g. required columns missing)"""
+
+
+class ImportCancelled(Exception):
+    """Raised when the progress callback asks to stop"""
+
+
+class ImportStats:
+    """Row counts plus the first MAX_ERRORS rejected rows as (line, reason)"""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.errors = []
+
+    @property
+    def rejected(self):
+        return self.rows - self.imported
+
+    def reject(self, line, reason):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, reason))
+
+    def summary(self):
+        return f"Imported {self.imported:,} of {self.rows:,} rows ({self.rejected:,} rejected)"
+
+
+def _to_float(values):
+    """Parse strings to float64; anything unparseable becomes NaN"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        out = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except ValueError:
+                out[i] = np.nan
+        return out
+
+
+def _to_timestamps(values, now):
+    """Parse date strings (blank means `now`); returns (epoch seconds, ok mask)"""
+    # Blanks are common and valid; keep them off the slow row-by-row path
+    present = [i for i, value in enumerate(values) if value]
+    ts = np.full(len(values), now, dtype=np.int64)
+    try:
+        ts[present] = parse_dates([values[i] for i in present])
+        return ts, np.ones(len(values), dtype=bool)
+    except ValueError:
+        ts = np.zeros(len(values), dtype=np.int64)
+        ok = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                ts[i] = parse_dates([value])[0] if value else now
+                ok[i] = True
+            except ValueError:
+                pass
+        return ts, ok
+
+
+def read_header(header):
+    """Map normalized column names to indexes and pick the unit system"""
+    columns = {}
+    for index, name in enumerate(header):
+        name = name.strip().lower().replace(' ', '_')
+        columns.setdefault(HEADER_ALIASES.get(name, name), index)
+    missing = [name for name in ('name', 'age', 'gender', 'activity') if name not in columns]
+    if 'height_cm' in columns and 'weight_kg' in columns:
+        metric = True
+    elif 'height_in' in columns and 'weight_lbs' in columns:
+        metric = False
+    else:
+        metric = None
+        missing.append("height_cm/weight_kg or height_in/weight_lbs")
+    if missing:
+        raise CsvImportError("Missing column(s): " + ", ".join(missing))
+    return columns, metric
+
+
+def score_rows(rows, lines, columns, metric, stats, now):
+    """Validate and score one chunk of raw CSV rows; returns column batch"""
+    count = len(rows)
+
+    def text(name):
+        index = columns.get(name)
+        if index is None:
+            return [""] * count
+        return [row[index].strip() if index < len(row) else "" for row in rows]
+
+    names = text('name')
+    ages = _to_float(text('age'))
+    genders = [GENDER_KEYS.get(value[:1].lower()) for value in text('gender')]
+    activities = [ACTIVITY_KEYS.get(value.split(' ', 1)[0].lower()) if value else None for value in text('activity')]
+
+    if metric:
+        height_cm = _to_float(text('height_cm'))
+        weight_kg = _to_float(text('weight_kg'))
+        measures_ok = engine.valid_metric(height_cm, weight_kg)
+    else:
+        total_inches = _to_float(text('height_in'))
+        if 'height_ft' in columns:
+            total_inches = _to_float(text('height_ft')) * 12 + np.nan_to_num(total_inches)
+        weight_lbs = _to_float(text('weight_lbs'))
+        measures_ok = engine.valid_imperial(total_inches, weight_lbs)
+        height_cm, weight_kg = engine.imperial_to_metric(total_inches, weight_lbs)
+
+    if 'date' in columns:
+        ts, dates_ok = _to_timestamps(text('date'), now)
+    else:
+        ts, dates_ok = np.full(count, now, dtype=np.int64), np.ones(count, dtype=bool)
+
+    checks = (
+        (np.array([bool(name) for name in names], dtype=bool), "missing name"),
+        (np.isfinite(ages) & (ages == np.floor(ages)) & (ages >= engine.MIN_AGE) & (ages <= engine.MAX_AGE), "invalid age"),
+        (np.array([value is not None for value in genders], dtype=bool), "unknown gender"),
+        (np.array([value is not None for value in activities], dtype=bool), "unknown activity level"),
+        (measures_ok, "height/weight out of range"),
+        (dates_ok, "invalid date"),
+    )
+    valid = np.logical_and.reduce([mask for mask, _ in checks])
+    for row in np.flatnonzero(~valid):
+        stats.reject(lines[row], next(reason for mask, reason in checks if not mask[row]))
+
+    keep = np.flatnonzero(valid)
+    ages = ages[keep]
+    kept_activities = [activities[i] for i in keep]
+    scored = engine.score_batch(height_cm[keep], weight_kg[keep], ages, engine.gender_codes([genders[i] for i in keep]),
+                                engine.activity_codes(kept_activities))
+    stats.rows += count
+    stats.imported += len(keep)
+    return {
+        'ts': ts[keep],
+        'name': [names[i] for i in keep],
+        'age': ages.astype(np.int16),
+        'gender': [genders[i] for i in keep],
+        'activity': kept_activities,
+        'height': np.round(height_cm[keep], 1),
+        'weight': np.round(weight_kg[keep], 1),
+        'bmi': np.round(scored['bmi'], 1),
+        'category': _CATEGORY_LABELS[scored['category_code']].tolist(),
+        # bmi.metrics estimates, for the batch scorer's output; the history derives its own
+        'bmr': scored['bmr'],
+        'tdee': scored['tdee'],
+        'body_fat': scored['body_fat'],
+        'bmi_prime': scored['bmi_prime'],
+    }
+
+
+def iter_batches(path, stats, batch_rows=BATCH_ROWS, progress=None):
+    """Stream a CSV (or .csv.gz) file as scored column batches.
+
+    `progress(bytes_read, total_bytes)` is called after each batch; if it
+    returns False, ImportCancelled is raised.  Text that isn't UTF-8 and
+    broken CSV (e.g. an unclosed quote) raise CsvImportError, after the
+    batches before it.
+    """
+    total = os.path.getsize(path)
+    now = int(time.time())
+    with open(path, 'rb') as raw:
+        stream = gzip.GzipFile(fileobj=raw) if path.endswith('.gz') else raw
+        reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        end = 0  # line the last row read ended on
+        try:
+            header = next(reader, None)
+            if header is None:
+                raise CsvImportError("The file is empty")
+            columns, metric = read_header(header)
+            end = reader.line_num
+            rows, lines = [], []
+            for row in reader:
+                end = reader.line_num
+                if not any(value.strip() for value in row): continue
+                rows.append(row)
+                lines.append(reader.line_num)
+                if len(rows) >= batch_rows:
+                    yield score_rows(rows, lines, columns, metric, stats, now)
+                    rows, lines = [], []
+                    if progress is not None and progress(raw.tell(), total) is False:
+                        raise ImportCancelled()
+        except UnicodeDecodeError as e:
+            # Decoded a block at a time, so which line is unknown
+            raise CsvImportError("Not UTF-8 text (save it as CSV UTF-8)") from e
+        except csv.Error as e:
+            # e.g. an unclosed quote that ran on until the field size limit
+            raise CsvImportError(f"Line {end + 1}: {e}") from e
+        if rows:
+            yield score_rows(rows, lines, columns, metric, stats, now)
+        if progress is not None:
+            progress(total, total)
+
+
+def import_csv(path, log, stats=None, batch_rows=BATCH_ROWS, progress=None):
+    """Import a whole file straight into a HistoryLog; returns the stats"""
+    stats = stats or ImportStats()
+    for batch in iter_batches(path, stats, batch_rows, progress):
+        log.append_columns(batch)
+    return stats
+
+
+def import_files(paths, history=DEFAULT_HISTORY_FILE):
+    """Import several files into the history log, reporting each one; returns an exit status"""
+    log = HistoryLog(history, sync_every=BATCH_ROWS)
+    status = 0
+    try:
+        for path in paths:
+            stats = ImportStats()
+            try:
+                import_csv(path, log, stats)
+            except (OSError, CsvImportError) as e:
+                # Batches before a damaged part are already in the history
+                saved = f" ({stats.imported:,} rows imported before it)" if stats.imported else ""
+                print(f"{path}: {e}{saved}", file=sys.stderr)
+                status = 1
+                continue
+            print(f"{path}: {stats.summary()}")
+            for line, reason in stats.errors:
+                print(f"  line {line}: {reason}", file=sys.stderr)
+    finally:
+        log.close()
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bmi.importer", description="Import BMI records from CSV files.")
+    parser.add_argument('files', nargs='+', help="CSV files (.csv or .csv.gz)")
+    parser.add_argument('--history', default=DEFAULT_HISTORY_FILE, help="history file to append to")
+    args = parser.parse_args(argv)
+    return import_files(args.files, args.history)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Query indexes over a HistoryStore.
+
+HistoryIndex keeps three structures next to the columns:
+
+* a case-insensitive sorted name list, for the person selector and
+  prefix search,
+* time order, globally and per person, so a date range is two binary
+  searches,
+* one packed bitmap per category, so a set of categories is a few ORs
+  over n/8 bytes.
+
+It follows the store lazily: every query first indexes the rows that
+were appended since the last one, so adding a row costs nothing until
+someone asks.  Answers are row offsets, oldest first, without the
+store's tombstoned rows (which stay indexed; they are filtered out of
+each answer).
+"""
+import bisect
+import time
+
+import numpy as np
+
+from bmi import engine
+
+# Filter presets: label -> category codes (adult and child codes combined)
+CATEGORY_FILTERS = {
+    "All Categories": None,
+    "Underweight": (0, 1, 7),
+    "Normal Weight": (2, 8),
+    "Overweight": (3, 9),
+    "Obesity Class I+": (4, 5, 6, 10),
+    "Obesity Class II+": (5, 6),
+    "Obesity Class III": (6,),
+}
+
+# Period presets: label -> days back from now
+PERIOD_FILTERS = {
+    "All Time": None,
+    "Last 7 Days": 7,
+    "Last 30 Days": 30,
+    "Last 90 Days": 90,
+    "Last Year": 365,
+}
+
+
+class Bitmap:
+    """Growable packed set of row offsets"""
+    __slots__ = ('bits',)
+
+    def __init__(self):
+        self.bits = np.zeros(128, dtype=np.uint8)
+
+    def set_range(self, start, mask):
+        """Set rows start + i for every True mask[i]; rows must be new (>= any set so far)"""
+        lead = start % 8
+        packed = np.packbits(np.concatenate((np.zeros(lead, dtype=bool), mask)))
+        first = start // 8
+        stop = first + len(packed)
+        if stop > len(self.bits):
+            grown = np.zeros(max(stop, 2 * len(self.bits)), dtype=np.uint8)
+            grown[:len(self.bits)] = self.bits
+            self.bits = grown
+        self.bits[first:stop] |= packed
+
+
+def _test_bits(bits, rows):
+    """Boolean mask: which of `rows` are set"""
+    inside = rows < 8 * len(bits)
+    mask = np.zeros(len(rows), dtype=bool)
+    rows = rows[inside]
+    mask[inside] = (bits[rows >> 3] >> (7 - (rows & 7))) & 1
+    return mask
+
+
+class HistoryIndex:
+    """Name, time and category indexes for one HistoryStore"""
+
+    def __init__(self, store):
+        self.store = store
+        self.names_version = 0  # changes whenever the name list does
+        self.reset()
+
+    def reset(self):
+        self.size = 0  # rows indexed so far
+        self.name_count = 0
+        self.name_keys = []  # lower-cased, sorted
+        self.sorted_names = []  # same order as name_keys
+        self.names_version += 1
+        self.last_ts = np.empty(0, dtype=np.int64)  # name code -> newest ts seen
+        self.unsorted_people = set()  # name codes whose rows are not in time order
+        self.person_order = {}  # name code -> (row count, rows in time order)
+        self.time_sorted = True
+        self.time_order = None  # (row count, rows in time order, their ts) when not time_sorted
+        self.bitmaps = [Bitmap() for _ in engine.CATEGORIES]
+
+    def update(self):
+        """Index rows appended to the store since the last call"""
+        store = self.store
+        start, stop = self.size, len(store)
+        if stop < start:
+            self.reset()
+            start = 0
+        if start == stop: return
+
+        names = store.names.values
+        if len(names) - self.name_count > 64:
+            self.sorted_names = sorted(names, key=str.lower)
+            self.name_keys = [name.lower() for name in self.sorted_names]
+        else:
+            for name in names[self.name_count:]:
+                key = name.lower()
+                position = bisect.bisect_right(self.name_keys, key)
+                self.name_keys.insert(position, key)
+                self.sorted_names.insert(position, name)
+        if len(names) != self.name_count:
+            self.last_ts = np.concatenate((self.last_ts, np.full(len(names) - self.name_count, np.iinfo(np.int64).min)))
+            self.name_count = len(names)
+            self.names_version += 1
+
+        ts = store.column('ts')
+        new_ts = ts[start:stop]
+        if self.time_sorted and (np.any(np.diff(new_ts) < 0) or (start and new_ts[0] < ts[start - 1])):
+            self.time_sorted = False
+        # Group the new rows by person to spot anyone whose rows went back in time
+        codes = store.column('name')[start:stop]
+        order = np.argsort(codes, kind='stable')
+        codes, times = codes[order], new_ts[order]
+        same = codes[1:] == codes[:-1]
+        self.unsorted_people.update(codes[1:][same & (times[1:] < times[:-1])].tolist())
+        starts = np.flatnonzero(np.concatenate(([True], ~same)))
+        people = codes[starts]
+        self.unsorted_people.update(people[times[starts] < self.last_ts[people]].tolist())
+        self.last_ts[people] = np.maximum(self.last_ts[people], np.maximum.reduceat(times, starts))
+
+        categories = store.column('category')[start:stop]
+        for code in np.unique(categories).tolist():
+            self.bitmaps[code].set_range(start, categories == code)
+        self.size = stop
+
+    def names(self):
+        """Every name, sorted case-insensitively"""
+        self.update()
+        return list(self.sorted_names)
+
+    def names_with_prefix(self, prefix):
+        """Names starting with `prefix` (case-insensitive), sorted"""
+        self.update()
+        prefix = prefix.lower()
+        first = bisect.bisect_left(self.name_keys, prefix)
+        last = bisect.bisect_left(self.name_keys, prefix + "\U0010ffff")
+        return self.sorted_names[first:last]
+
+    def _person_rows(self, code):
+        """One person's rows in time order"""
+        rows = self.store.person_rows[code]
+        if code not in self.unsorted_people:
+            return np.array(rows, dtype=np.int64)
+        cached = self.person_order.get(code)
+        if cached is None or cached[0] != len(rows):
+            rows = np.array(rows, dtype=np.int64)
+            cached = self.person_order[code] = (len(rows), rows[np.argsort(self.store.column('ts')[rows], kind='stable')])
+        return cached[1]
+
+    def _time_order(self):
+        """(rows in time order, their timestamps) for the whole store"""
+        ts = self.store.column('ts')
+        if self.time_sorted:
+            return None, ts
+        if self.time_order is None or self.time_order[0] != self.size:
+            order = np.argsort(ts, kind='stable')
+            self.time_order = (self.size, order, ts[order])
+        return self.time_order[1:]
+
+    def _category_bits(self, categories, first, last):
+        """Union of the category bitmaps over bytes [first, last)"""
+        bits = np.zeros(last - first, dtype=np.uint8)
+        for code in categories:
+            chunk = self.bitmaps[code].bits[first:last]
+            bits[:len(chunk)] |= chunk
+        return bits
+
+    def query(self, name=None, categories=None, since=None, until=None):
+        """Row offsets matching every filter given, oldest first.
+
+        `name` is an exact person name, `categories` engine category
+        codes, `since`/`until` epoch seconds (since inclusive, until
+        exclusive).  None means no filter.
+        """
+        self.update()
+        if name is not None:
+            code = self.store.names.codes.get(name)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            rows = self._person_rows(code)
+            times = self.store.column('ts')[rows]
+        else:
+            rows, times = self._time_order()
+        lo = 0 if since is None else int(np.searchsorted(times, since, side='left'))
+        hi = len(times) if until is None else int(np.searchsorted(times, until, side='left'))
+
+        if rows is None:
+            # Whole store, already in time order: rows are just offsets
+            if categories is None:
+                rows = np.arange(lo, hi, dtype=np.int64)
+            else:
+                first = lo // 8
+                bits = self._category_bits(categories, first, (hi + 7) // 8)
+                rows = np.flatnonzero(np.unpackbits(bits).view(bool)) + first * 8
+                rows = rows[(rows >= lo) & (rows < hi)]
+        else:
+            rows = rows[lo:hi]
+            if categories is not None:
+                rows = rows[_test_bits(self._category_bits(categories, 0, (self.size + 7) // 8), rows)]
+        if self.store.deleted_count:
+            rows = rows[~self.store.deleted[rows]]
+        return rows
+
+    def query_preset(self, name=None, category_filter="All Categories", period_filter="All Time", now=None):
+        """query() for the CATEGORY_FILTERS / PERIOD_FILTERS labels"""
+        days = PERIOD_FILTERS[period_filter]
+        since = None
+        if days is not None:
+            since = int(now if now is not None else time.time()) - days * 86400
+        return self.query(name, CATEGORY_FILTERS[category_filter], since)
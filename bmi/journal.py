@@ -0,0 +1,134 @@
+"""Undo and redo for history edits.
+
+Every change to recorded history is a list of steps, (added, entry):
+deleting rows withdraws their records, and editing one withdraws the
+old record and adds the corrected one.  Undo applies the inverse steps
+in reverse order; redo applies the steps again.
+
+Steps name records by value, not by row, so they stay valid when rows
+move (the hot/cold tiers compact the store) and can be written to the
+history file as they are (HistoryLog.append_changes).  Finding a record
+is a binary search in its person's time index (HistoryStore.find), and
+the store, index and rollups are updated for just the rows involved, so
+an undo costs the same however long the history is.
+
+With a sync.Replicator, every change is published to the other
+stations too, and withdraw() applies the ones they publish.
+"""
+from bmi.history import entry_key
+
+UNDO_LIMIT = 100  # changes that can be undone
+
+
+class HistoryJournal:
+    """Applies changes to a HistoryStore and keeps them for undo/redo.
+
+    `log` (a HistoryLog) and `replicator` (a sync.Replicator) get every
+    step as it is applied.  With `tiers` (a HistoryTiers), the people
+    involved are paged in first.
+    """
+
+    def __init__(self, store, log=None, tiers=None, limit=UNDO_LIMIT, replicator=None):
+        self.store = store
+        self.log = log
+        self.tiers = tiers
+        self.replicator = replicator
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def delete(self, entries):
+        """Delete these records (entry dicts, e.g. from HistoryStore.entry()) as one change"""
+        self._do([(False, entry) for entry in entries])
+
+    def edit(self, entry, corrected):
+        """Replace a record with a corrected one"""
+        self._do([(False, entry), (True, corrected)])
+
+    def undo(self):
+        """Revert the latest change; returns its steps.  LookupError if a record it needs is gone."""
+        steps = self.undo_stack[-1]
+        self._apply([(not added, entry) for added, entry in reversed(steps)])
+        self.redo_stack.append(self.undo_stack.pop())
+        return steps
+
+    def redo(self):
+        steps = self.redo_stack[-1]
+        self._apply(steps)
+        self.undo_stack.append(self.redo_stack.pop())
+        return steps
+
+    def withdraw(self, entries):
+        """Records deleted on another station; returns how many were removed here.
+
+        This is their change, so it is neither saved to `log` nor undoable.
+        Records that haven't arrived yet are left in log.pending_removals,
+        to be cancelled when they do (HistoryLog.cancel_removed).
+        """
+        self._page_in(entries)
+        removed = 0
+        for entry in entries:
+            row = self.store.find(entry)
+            if row is not None:
+                self.store.delete(row)
+                removed += 1
+            elif self.log is not None:
+                self.log.pending_removals[entry_key(entry)] += 1
+        return removed
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def _do(self, steps):
+        """Apply a new change; LookupError if a record to withdraw isn't there (nothing changes)"""
+        if not steps: return
+        self._apply(steps)
+        self.undo_stack.append(steps)
+        del self.undo_stack[:-self.limit]
+        self.redo_stack.clear()
+
+    def _apply(self, steps):
+        store = self.store
+        self._page_in([entry for _, entry in steps])
+        # Find every record to withdraw before changing anything, so a missing one changes nothing
+        rows = []
+        for added, entry in steps:
+            if added: continue
+            row = store.find(entry, skip=rows)
+            if row is None:
+                raise LookupError(f"The record for {entry['name']} at {entry.get('date', entry['ts'])} "
+                                  "is no longer in the history")
+            rows.append(row)
+        # Saved first: if that fails (OSError) the history stays as it was too
+        if self.log is not None:
+            self.log.append_changes(steps)
+        if self.replicator is not None:
+            self.replicator.publish_changes(steps)
+        withdrawn = iter(rows)
+        for added, entry in steps:
+            if added:
+                store.insert(entry)
+            else:
+                store.delete(next(withdrawn))
+
+    def _page_in(self, entries):
+        if self.tiers is not None:
+            for name in {entry['name'] for entry in entries}:
+                self.tiers.page_in(name)
+
+
+def describe(steps):
+    """A change in a few words, for menus and the status bar"""
+    added = [entry for was_added, entry in steps if was_added]
+    if added:
+        return f"Edit of {added[0]['name']}'s record"
+    return "Delete of 1 record" if len(steps) == 1 else f"Delete of {len(steps)} records"
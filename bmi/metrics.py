@@ -0,0 +1,97 @@
+"""Body-composition and energy estimates derived from a scored record.
+
+* BMR, basal metabolic rate (kcal/day), Mifflin-St Jeor:
+  10 * kg + 6.25 * cm - 5 * age, + 5 for men or - 161 for women.
+* TDEE, total daily energy expenditure: BMR times the usual factor for
+  the form's activity level.
+* Body fat %, Deurenberg et al. (1991) from BMI, age and sex, with the
+  separate children's equation under 18.
+* BMI Prime: BMI over the upper limit of normal (25), so 1.0 is the
+  limit and 1.2 is 20% over it.
+
+"Other" gender takes the midpoint of the male and female terms.  These
+are population equations: good for a cohort, only an estimate for any
+one person.
+
+The coefficient tables are indexed by engine's gender and activity
+codes (engine imports this module, not the other way round).  derive()
+works on plain floats for one record; derive_batch() turns the tables
+into a few gathers and in-place multiply-adds over whole arrays.
+"""
+import numpy as np
+
+CHILD_AGE = 18  # engine.ADULT_AGE
+BMI_PRIME_LIMIT = 25.0
+
+# Indexed by gender code: Male, Female, Other
+BMR_SEX_TERMS = (5.0, -161.0, -78.0)
+BODY_FAT_SEX = (1.0, 0.0, 0.5)  # Deurenberg's sex variable: 1 for men, 0 for women
+OTHER_SEX = 2
+
+# Indexed by activity code (engine.ACTIVITY_LEVELS order)
+ACTIVITY_FACTORS = (1.2, 1.375, 1.55, 1.725, 1.9)
+
+# Deurenberg coefficients (BMI, age, sex, constant): adults, then children
+BODY_FAT_ADULT = (1.20, 0.23, -10.8, -5.4)
+BODY_FAT_CHILD = (1.51, -0.70, -3.6, 1.4)
+
+METRICS = ('bmr', 'tdee', 'body_fat', 'bmi_prime')
+
+_BMR_SEX_TERMS = np.array(BMR_SEX_TERMS)
+# Activity code -1 (unknown) lands on the trailing NaN
+_ACTIVITY_FACTORS = np.array(ACTIVITY_FACTORS + (np.nan,))
+# Body fat's sex and constant terms folded into one number per sex: adults, then children
+_BODY_FAT_SEX_TERMS = np.array([[per_sex * sex + constant for sex in BODY_FAT_SEX]
+                                for _, _, per_sex, constant in (BODY_FAT_ADULT, BODY_FAT_CHILD)])
+
+
+def derive(height_cm, weight_kg, age, bmi, gender=None, activity=None):
+    """Metrics for one record, as a dict keyed by METRICS.
+
+    `gender` and `activity` are codes; gender None counts as Other, and
+    'tdee' is None when the activity level is unknown (None or -1).
+    """
+    sex = OTHER_SEX if gender is None else gender
+    bmr = 10.0 * weight_kg + 6.25 * height_cm - 5.0 * age + BMR_SEX_TERMS[sex]
+    per_bmi, per_year, per_sex, constant = BODY_FAT_CHILD if age < CHILD_AGE else BODY_FAT_ADULT
+    return {
+        'bmr': bmr,
+        'tdee': None if activity is None or activity < 0 else bmr * ACTIVITY_FACTORS[activity],
+        'body_fat': max(0.0, per_bmi * bmi + per_year * age + per_sex * BODY_FAT_SEX[sex] + constant),
+        'bmi_prime': bmi / BMI_PRIME_LIMIT,
+    }
+
+
+def derive_batch(height_cm, weight_kg, age, bmi, gender=None, activity=None):
+    """Vectorized derive(): float64 arrays, with NaN TDEE where the activity level is unknown"""
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    age = np.asarray(age, dtype=np.float64)
+    bmi = np.asarray(bmi, dtype=np.float64)
+    # Codes as intp once: take() with them is several times faster than with int8 indexes
+    sex = OTHER_SEX if gender is None else np.asarray(gender, dtype=np.intp)
+    # Terms are added in place, so each metric is built in a single array
+    bmr = 10.0 * weight_kg
+    bmr += 6.25 * np.asarray(height_cm, dtype=np.float64)
+    bmr -= 5.0 * age
+    bmr += _BMR_SEX_TERMS.take(sex)
+    if activity is None:
+        tdee = np.full(bmr.shape, np.nan)
+    else:
+        tdee = _ACTIVITY_FACTORS.take(np.asarray(activity, dtype=np.intp))
+        tdee *= bmr
+    # Adult equation for everyone, then the children's for the (usually few) under-18s
+    per_bmi, per_year, _, _ = BODY_FAT_ADULT
+    body_fat = per_bmi * bmi
+    body_fat += per_year * age
+    body_fat += _BODY_FAT_SEX_TERMS[0].take(sex)
+    child = np.flatnonzero(age < CHILD_AGE)
+    if len(child):
+        per_bmi, per_year, _, _ = BODY_FAT_CHILD
+        child_sex = sex if gender is None else sex[child]
+        body_fat[child] = per_bmi * bmi[child] + per_year * age[child] + _BODY_FAT_SEX_TERMS[1].take(child_sex)
+    return {
+        'bmr': bmr,
+        'tdee': tdee,
+        'body_fat': np.maximum(body_fat, 0.0, out=body_fat),
+        'bmi_prime': bmi / BMI_PRIME_LIMIT,
+    }
@@ -0,0 +1,192 @@
+"""Opt-in timing spans and event-loop stall detection.
+
+Recording is off until something turns RECORDER.enabled on (the
+Diagnostics window, or BMI_PROFILE=1 in the environment).  While it is
+off, a function wrapped with timed() costs one attribute check on top
+of the call itself, so the hot paths can stay instrumented permanently.
+
+Spans land in a bounded ring buffer as (name, category, start, duration,
+thread), in perf_counter nanoseconds.  summary() aggregates them per
+name; chrome_trace() writes the Trace Event Format that chrome://tracing
+and Perfetto load.
+
+StallWatchdog measures how responsive the GUI's event loop is: a
+background thread posts a no-op to the GUI thread every `interval` and
+times how long it takes to run.  Anything over `threshold` is recorded
+as a "stall" span covering the time the loop was busy.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+ENV_VAR = "BMI_PROFILE"
+MAX_SPANS = 20000
+WATCHDOG_INTERVAL = 0.1  # seconds between probes
+STALL_THRESHOLD = 0.05  # probe latency reported as a stall
+LATENCY_SAMPLES = 600  # probes kept for the latency percentiles (a minute at the default interval)
+
+
+def enabled_from_environment():
+    return os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Recorder:
+    """Ring buffer of timing spans"""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.enabled = False
+        # deque.append is atomic, so worker threads can record without a lock
+        self.spans = deque(maxlen=max_spans)
+
+    def add(self, name, start_ns, duration_ns, category="span"):
+        self.spans.append((name, category, start_ns, duration_ns, threading.get_ident()))
+
+    def clear(self):
+        self.spans.clear()
+
+    def summary(self):
+        """[(name, category, count, mean, p50, p95, max)] with times in ms, slowest total first"""
+        durations = {}
+        for name, category, _, duration, _ in list(self.spans):
+            durations.setdefault((name, category), []).append(duration / 1e6)
+        rows = []
+        for (name, category), values in durations.items():
+            values.sort()
+            rows.append((name, category, len(values), sum(values) / len(values),
+                         _percentile(values, 0.50), _percentile(values, 0.95), values[-1]))
+        return sorted(rows, key=lambda row: -row[2] * row[3])
+
+    def chrome_trace(self):
+        """The spans as a Trace Event Format dict ("X" complete events, microseconds)"""
+        pid = os.getpid()
+        threads = {}
+        events = []
+        for name, category, start, duration, thread in list(self.spans):
+            tid = threads.setdefault(thread, len(threads) + 1)
+            events.append({'name': name, 'cat': category, 'ph': "X", 'ts': start / 1000,
+                           'dur': duration / 1000, 'pid': pid, 'tid': tid})
+        main = threading.main_thread().ident
+        for thread, tid in threads.items():
+            label = "GUI thread" if thread == main else f"worker {tid}"
+            events.append({'name': "thread_name", 'ph': "M", 'pid': pid, 'tid': tid, 'args': {'name': label}})
+        return {'traceEvents': events, 'displayTimeUnit': "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+RECORDER = Recorder()
+
+
+def timed(name=None, category="span"):
+    """Decorator: record a span per call while RECORDER is enabled"""
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                RECORDER.add(label, start, time.perf_counter_ns() - start, category)
+        return wrapper
+    return decorate
+
+
+class span:
+    """Context manager form of timed(), for blocks that aren't a whole function"""
+    __slots__ = ('name', 'category', 'start')
+
+    def __init__(self, name, category="span"):
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns() if RECORDER.enabled else None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            RECORDER.add(self.name, self.start, time.perf_counter_ns() - self.start, self.category)
+
+
+class StallWatchdog:
+    """Times how long the GUI thread takes to run a posted callback.
+
+    `post(callback)` must queue the callback on the GUI thread
+    (wx.CallAfter).  The probing thread waits for each answer before
+    sending the next, so one long stall counts once.
+    """
+
+    def __init__(self, post, recorder=RECORDER, interval=WATCHDOG_INTERVAL, threshold=STALL_THRESHOLD):
+        self.post = post
+        self.recorder = recorder
+        self.interval = interval
+        self.threshold = threshold
+        self.thread = None
+        self.stopping = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.probes = 0
+        self.stalls = 0
+        self.stalled_ns = 0
+        self.longest_ns = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # ms
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running and not self.stopping.is_set(): return
+        # A fresh event per thread, so a thread still finishing its last probe stays stopped
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(self.stopping,), name="stall-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread = None
+
+    def _run(self, stopping):
+        answered = threading.Event()
+        while not stopping.wait(self.interval):
+            answered.clear()
+            sent = time.perf_counter_ns()
+            try:
+                self.post(answered.set)
+            except Exception:
+                break  # The GUI is gone
+            while not answered.wait(self.interval):
+                if stopping.is_set(): return
+            self.record(sent, time.perf_counter_ns() - sent)
+
+    def record(self, sent_ns, latency_ns):
+        self.probes += 1
+        self.latencies.append(latency_ns / 1e6)
+        self.longest_ns = max(self.longest_ns, latency_ns)
+        if latency_ns >= self.threshold * 1e9:
+            self.stalls += 1
+            self.stalled_ns += latency_ns
+            self.recorder.add("event loop stall", sent_ns, latency_ns, "stall")
+
+    def summary(self):
+        """Plain-text one-liner for the Diagnostics window"""
+        if not self.probes:
+            return "Event loop: no measurements yet"
+        latencies = sorted(self.latencies)
+        return (f"Event loop: latency p50 {_percentile(latencies, 0.5):.1f} ms, p99 {_percentile(latencies, 0.99):.1f} ms; "
+                f"{self.stalls} stall(s) over {self.threshold * 1000:.0f} ms, "
+                f"{self.stalled_ns / 1e6:.0f} ms in total, longest {self.longest_ns / 1e6:.0f} ms")
@@ -0,0 +1,245 @@
+"""Multi-page PDF history report.
+
+The report has three parts:
+
+* a summary table with one row per person,
+* category distributions (all records, and each person's latest record),
+* a page of BMI trend charts for every few people.
+
+Every page is drawn off-screen with matplotlib's Agg backend in a process
+pool and comes back as a compressed image.  PdfStream writes each page to
+disk as soon as it is ready (in order), so only a handful of pages are
+ever held in memory, however many people the report covers.
+"""
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from bmi.export import ExportCancelled
+from bmi.history import format_dates
+
+PAGE_SIZE = (8.27, 11.69)  # A4 portrait, inches
+PAGE_DPI = 150
+TABLE_ROWS_PER_PAGE = 40
+PEOPLE_PER_PAGE = 6
+TREND_LAYOUT = (3, 2)
+BAND_COLORS = (('green', 18.5, 25), ('yellow', 25, 30), ('red', 30, 50))
+TABLE_HEADER = ("Name", "Records", "First", "Last", "BMI", "Change", "Latest Category")
+TABLE_WIDTHS = (0.22, 0.08, 0.12, 0.12, 0.07, 0.08, 0.31)
+
+
+class PdfStream:
+    """Minimal PDF writer for full-page images.
+
+    Each page's objects are written immediately; only their file offsets
+    are remembered until close() writes the page tree and xref table.
+    """
+
+    def __init__(self, path, page_size=PAGE_SIZE):
+        self.file = open(path, 'wb')
+        self.width = page_size[0] * 72
+        self.height = page_size[1] * 72
+        self.offsets = {}
+        self.pages = []
+        self.next_id = 3  # 1 = catalog, 2 = page tree
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _object(self, body, stream=None):
+        obj_id = self.next_id
+        self.next_id += 1
+        self._write_object(obj_id, body, stream)
+        return obj_id
+
+    def _write_object(self, obj_id, body, stream=None):
+        self.offsets[obj_id] = self.file.tell()
+        if stream is None:
+            self.file.write(b"%d 0 obj\n%s\nendobj\n" % (obj_id, body))
+        else:
+            self.file.write(b"%d 0 obj\n%s\nstream\n" % (obj_id, body))
+            self.file.write(stream)
+            self.file.write(b"\nendstream\nendobj\n")
+
+    def add_image_page(self, width, height, compressed_rgb):
+        """Add a page filled by a Flate-compressed 8-bit RGB image"""
+        image = self._object(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                             b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>"
+                             % (width, height, len(compressed_rgb)), compressed_rgb)
+        content = b"q %.2f 0 0 %.2f 0 0 cm /Im0 Do Q" % (self.width, self.height)
+        contents = self._object(b"<< /Length %d >>" % len(content), content)
+        self.pages.append(self._object(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+                                       b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                                       % (self.width, self.height, image, contents)))
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % page for page in self.pages)
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._write_object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        xref = self.file.tell()
+        self.file.write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id)
+        for obj_id in range(1, self.next_id):
+            self.file.write(b"%010d 00000 n \n" % self.offsets[obj_id])
+        self.file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_id, xref))
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+def group_by_person(snap):
+    """Return [(name, row offsets)] sorted by name, rows oldest first"""
+    codes = snap['name']
+    # By person, then time: rows are in file order, and imports, edits and tiers don't keep that sorted
+    order = np.lexsort((snap['ts'], codes))
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    groups = np.split(order, bounds) if len(order) else []
+    names = snap['vocab']['name']
+    return sorted(((names[codes[rows[0]]], rows) for rows in groups), key=lambda item: item[0].lower())
+
+
+def summary_rows(snap, groups):
+    """One table row per person: records, first/last date, BMI change, latest category"""
+    ts, bmi, category = snap['ts'], snap['bmi'], snap['category']
+    categories = snap['vocab']['category']
+    rows = []
+    for name, idx in groups:
+        first, last = idx[0], idx[-1]
+        first_date, last_date = format_dates(ts[[first, last]])
+        rows.append((
+            name, str(len(idx)), first_date[:10], last_date[:10],
+            f"{bmi[last]:.1f}", f"{bmi[last] - bmi[first]:+.1f}", categories[category[last]],
+        ))
+    return rows
+
+
+def category_color(label):
+    if "Underweight" in label: return 'lightskyblue'
+    if "Normal" in label or "Healthy" in label: return 'lightgreen'
+    if "Overweight" in label: return 'orange'
+    return 'tomato'
+
+
+def page_tasks(snap, generated):
+    """Yield one picklable drawing task per page, in page order"""
+    groups = group_by_person(snap)
+    rows = summary_rows(snap, groups)
+    for start in range(0, max(len(rows), 1), TABLE_ROWS_PER_PAGE):
+        title = f"BMI History Report - {generated}" if start == 0 else "Summary (continued)"
+        yield ('table', title, rows[start:start + TABLE_ROWS_PER_PAGE])
+
+    categories = snap['vocab']['category']
+    all_counts = np.bincount(snap['category'], minlength=len(categories))
+    latest = np.array([snap['category'][idx[-1]] for _, idx in groups], dtype=np.int64)
+    latest_counts = np.bincount(latest, minlength=len(categories))
+    shown = np.flatnonzero(all_counts)
+    yield ('distribution', "Category Distribution",
+           ([categories[code] for code in shown], all_counts[shown], latest_counts[shown]))
+
+    ts, bmi = snap['ts'], snap['bmi']
+    for start in range(0, len(groups), PEOPLE_PER_PAGE):
+        people = [(name, ts[idx], bmi[idx]) for name, idx in groups[start:start + PEOPLE_PER_PAGE]]
+        yield ('trends', "BMI Trends", people)
+
+
+def page_count(snap):
+    people = len(np.unique(snap['name']))
+    return max(1, -(-people // TABLE_ROWS_PER_PAGE)) + 1 + -(-people // PEOPLE_PER_PAGE)
+
+
+def _draw_table(fig, rows):
+    ax = fig.add_axes([0.05, 0.05, 0.9, 0.88])
+    ax.axis('off')
+    table = ax.table(cellText=rows or [("No data",) + ("",) * (len(TABLE_HEADER) - 1)],
+                     colLabels=TABLE_HEADER, colWidths=TABLE_WIDTHS, loc='upper center', cellLoc='left')
+    table.auto_set_font_size(False)
+    table.set_fontsize(7)
+    table.scale(1, 1.2)
+
+
+def _draw_distribution(fig, data):
+    labels, all_counts, latest_counts = data
+    for position, (counts, title) in enumerate(((all_counts, "All records"), (latest_counts, "Latest record per person"))):
+        ax = fig.add_subplot(2, 1, position + 1)
+        bars = ax.barh(labels, counts, color=[category_color(label) for label in labels])
+        ax.bar_label(bars, padding=3, fontsize=8)
+        ax.set_title(title)
+        ax.invert_yaxis()
+    fig.subplots_adjust(left=0.3, hspace=0.3)
+
+
+def _draw_trends(fig, people):
+    rows, cols = TREND_LAYOUT
+    for position, (name, timestamps, bmis) in enumerate(people):
+        ax = fig.add_subplot(rows, cols, position + 1)
+        for color, low, high in BAND_COLORS:
+            ax.axhspan(low, high, alpha=0.1, color=color)
+        ax.plot(timestamps.astype('datetime64[s]'), bmis, 'o-', linewidth=1.5, markersize=3)
+        ax.set_title(name, fontsize=9)
+        ax.tick_params(labelsize=7)
+        for label in ax.get_xticklabels():
+            label.set_rotation(30)
+            label.set_horizontalalignment('right')
+    fig.tight_layout(rect=(0, 0, 1, 0.96))
+
+
+def render_page(task):
+    """Draw one page with Agg; runs in a worker process.
+
+    Returns (width, height, zlib-compressed RGB bytes).
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    kind, title, data = task
+    fig = Figure(figsize=PAGE_SIZE, dpi=PAGE_DPI)
+    canvas = FigureCanvasAgg(fig)
+    fig.suptitle(title, fontsize=14, fontweight='bold')
+    if kind == 'table': _draw_table(fig, data)
+    elif kind == 'distribution': _draw_distribution(fig, data)
+    else: _draw_trends(fig, data)
+    canvas.draw()
+    rgba = np.asarray(canvas.buffer_rgba())
+    height, width = rgba.shape[:2]
+    return width, height, zlib.compress(np.ascontiguousarray(rgba[:, :, :3]).tobytes(), 6)
+
+
+def write_pdf_report(snap, path, progress=None, workers=None):
+    """Write the report for a HistoryStore snapshot to `path`.
+
+    `progress(done, total)` counts pages; returning False cancels, removes
+    the partial file and raises ExportCancelled.  Returns the page count.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = page_count(snap)
+    done = 0
+    pdf = PdfStream(path)
+    # spawn: the GUI process has threads, which fork does not mix well with
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def write(future):
+        nonlocal done
+        pdf.add_image_page(*future.result())
+        done += 1
+        if progress is not None and progress(done, total) is False:
+            raise ExportCancelled()
+
+    try:
+        pending = []
+        for task in page_tasks(snap, datetime.now().strftime("%Y-%m-%d %H:%M")):
+            pending.append(pool.submit(render_page, task))
+            # Keep a bounded window of pages in flight; write them in order
+            if len(pending) >= 2 * workers:
+                write(pending.pop(0))
+        for future in pending:
+            write(future)
+        pdf.close()
+    except BaseException:
+        pdf.abort()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return done
@@ -0,0 +1,321 @@
+"""Incrementally maintained cohort statistics.
+
+HistoryRollups follows a HistoryStore the same way HistoryIndex does:
+whenever it is read, it first folds in the rows appended since the last
+read, so the dashboard never rescans the history.  It keeps
+
+* counts per category,
+* for all records and per gender, activity level and age band: count,
+  mean and variance (Welford / Chan merges) and a quantile sketch for
+  the median,
+* each person's latest category, and a from -> to matrix counting the
+  category changes between consecutive records of the same person.
+
+A record older than the person's latest one (e.g. from an import) is
+counted everywhere except in the transitions.
+
+Records can also be taken back out (HistoryStore.delete): count, mean
+and variance run Welford's update backwards, the medians come from the
+sketch of what was added minus a sketch of what was removed, and the
+person's transitions are recounted from their remaining records.
+"""
+import math
+
+import numpy as np
+
+from bmi import engine
+
+SKETCH_COMPRESSION = 100
+SKETCH_BUFFER = 1000
+
+
+class QuantileSketch:
+    """Streaming quantiles in the style of a merging t-digest.
+
+    Values collect in a buffer; when it fills, buffer and centroids are
+    sorted together and regrouped so that no centroid spans more than
+    one unit of the k1 scale k(q) = compression * (asin(2q - 1) / pi + 0.5).
+    Centroids are small near the tails and large in the middle, giving
+    at most `compression` of them however many values were added.
+    """
+    __slots__ = ('compression', 'means', 'weights', 'buffer', 'minimum', 'maximum')
+
+    def __init__(self, compression=SKETCH_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer = []
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def __len__(self):
+        return int(self.weights.sum()) + len(self.buffer)
+
+    def add(self, value):
+        self.buffer.append(value)
+        if len(self.buffer) >= SKETCH_BUFFER:
+            self._compress()
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(self.buffer) + len(values) < SKETCH_BUFFER:
+            self.buffer.extend(values.tolist())
+        else:
+            self._compress(values)
+
+    def _compress(self, values=None):
+        incoming = np.array(self.buffer, dtype=np.float64)
+        if values is not None:
+            incoming = np.concatenate((incoming, values))
+        if not len(incoming): return
+        self.buffer = []
+        self.minimum = min(self.minimum, incoming.min())
+        self.maximum = max(self.maximum, incoming.max())
+        means = np.concatenate((self.means, incoming))
+        weights = np.concatenate((self.weights, np.ones(len(incoming))))
+        order = np.argsort(means)
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Quantile at the left edge of each centroid decides its cluster on the k1 scale
+        q = (np.cumsum(weights) - weights) / total
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate(([True], k[1:] != k[:-1])))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def _curve(self):
+        """(ranks, values): the piecewise-linear cumulative distribution the estimates interpolate"""
+        self._compress()
+        centres = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate(([0], centres, [self.weights.sum()]))
+        values = np.concatenate(([self.minimum], self.means, [self.maximum]))
+        return positions, values
+
+    def quantile(self, q):
+        """Estimated q-quantile (0 <= q <= 1); NaN when empty"""
+        positions, values = self._curve()
+        if len(positions) == 2:
+            return math.nan
+        return float(np.interp(q * positions[-1], positions, values))
+
+
+def net_quantile(added, removed, q):
+    """q-quantile of what is in `added` but not in `removed` (both QuantileSketch)"""
+    added_ranks, added_values = added._curve()
+    removed_ranks, removed_values = removed._curve()
+    if len(added_ranks) == 2:
+        return math.nan
+    values = np.union1d(added_values, removed_values[1:-1])
+    ranks = np.interp(values, added_values, added_ranks) - np.interp(values, removed_values, removed_ranks,
+                                                                      left=0.0, right=removed_ranks[-1])
+    # Both are estimates: keep the difference a proper (non-decreasing) distribution
+    np.maximum.accumulate(np.maximum(ranks, 0.0), out=ranks)
+    if ranks[-1] <= 0:
+        return math.nan
+    return float(np.interp(q * ranks[-1], ranks, values))
+
+
+class Rollup:
+    """Count, mean, variance and median of a stream of BMI values"""
+    __slots__ = ('count', 'mean', 'm2', 'sketch', 'removed')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sketch = QuantileSketch()
+        self.removed = None  # QuantileSketch of values taken back out, once there are any
+
+    def add(self, value):
+        """Welford update for a single value"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.sketch.add(value)
+
+    def add_many(self, values):
+        """Merge a batch (Chan et al.'s pairwise form of Welford's update)"""
+        values = np.asarray(values, dtype=np.float64)
+        count = len(values)
+        if not count: return
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.sketch.add_many(values)
+
+    def remove(self, value):
+        """Welford's update run backwards, for a value added earlier"""
+        self.count -= 1
+        if self.count:
+            delta = value - self.mean
+            self.mean -= delta / self.count
+            self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+        else:
+            self.mean = self.m2 = 0.0
+        if self.removed is None:
+            self.removed = QuantileSketch()
+        self.removed.add(value)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def median(self):
+        if self.removed is None:
+            return self.sketch.quantile(0.5)
+        return net_quantile(self.sketch, self.removed, 0.5) if self.count else math.nan
+
+
+class HistoryRollups:
+    """Dashboard statistics for one HistoryStore"""
+
+    def __init__(self, store):
+        self.store = store
+        self.reset()
+
+    def reset(self):
+        self.size = 0  # rows folded in so far
+        self.overall = Rollup()
+        self.category_counts = np.zeros(len(engine.CATEGORIES), dtype=np.int64)
+        # dimension -> code -> Rollup; gender/activity use the store's codes, age bands engine.AGE_BANDS
+        self.groups = {'gender': {}, 'activity': {}, 'age_band': {}}
+        self.last_ts = np.empty(0, dtype=np.int64)  # name code -> ts of latest record
+        self.last_category = np.empty(0, dtype=np.int8)  # name code -> category of latest record
+        self.transitions = np.zeros((len(engine.CATEGORIES), len(engine.CATEGORIES)), dtype=np.int64)
+
+    def update(self):
+        """Fold in the rows appended to the store since the last call"""
+        store = self.store
+        start, stop = self.size, len(store)
+        if stop < start:
+            self.reset()
+            start = 0
+        if start == stop: return
+        bmi = store.column('bmi')[start:stop].astype(np.float64)
+        categories = store.column('category')[start:stop]
+        dimensions = (
+            ('gender', store.column('gender')[start:stop]),
+            ('activity', store.column('activity')[start:stop]),
+            ('age_band', engine.age_bands(store.column('age')[start:stop])),
+        )
+        if stop - start == 1:
+            # The common case in the GUI: one new calculation, O(1) in pure Python
+            value = float(bmi[0])
+            self.overall.add(value)
+            self.category_counts[categories[0]] += 1
+            for dimension, codes in dimensions:
+                self._rollup(dimension, int(codes[0])).add(value)
+        else:
+            self.overall.add_many(bmi)
+            self.category_counts += np.bincount(categories, minlength=len(self.category_counts))
+            for dimension, codes in dimensions:
+                for code in np.unique(codes).tolist():
+                    self._rollup(dimension, code).add_many(bmi[codes == code])
+        self._update_transitions(store.column('name')[start:stop], store.column('ts')[start:stop], categories)
+        self.size = stop
+
+    def retract(self, row):
+        """Take one counted row back out of the counts and rollups (not the transitions: see restate())"""
+        store = self.store
+        c = store.columns
+        value = float(c['bmi'][row])
+        self.overall.remove(value)
+        self.category_counts[c['category'][row]] -= 1
+        for dimension, code in (('gender', int(c['gender'][row])), ('activity', int(c['activity'][row])),
+                                ('age_band', engine.age_band(int(c['age'][row])))):
+            self._rollup(dimension, code).remove(value)
+
+    def person_transitions(self, code):
+        """(from -> to counts, latest ts, latest category) over one person's live records in time order"""
+        store = self.store
+        rows = store.index.query(name=store.names.decode(code))
+        counts = np.zeros_like(self.transitions)
+        if not len(rows):
+            return counts, np.iinfo(np.int64).min, -1
+        categories = store.column('category')[rows].astype(np.int64)
+        changed = categories[1:] != categories[:-1]
+        np.add.at(counts, (categories[:-1][changed], categories[1:][changed]), 1)
+        return counts, int(store.column('ts')[rows[-1]]), int(categories[-1])
+
+    def restate(self, code, before):
+        """After a person gained or lost a record: swap person_transitions() from before for a recount"""
+        counts, last_ts, last_category = self.person_transitions(code)
+        if before is not None:
+            counts -= before[0]
+        self.transitions += counts
+        np.maximum(self.transitions, 0, out=self.transitions)
+        self.last_ts[code] = last_ts
+        self.last_category[code] = last_category
+
+    def _rollup(self, dimension, code):
+        group = self.groups[dimension]
+        if code not in group:
+            group[code] = Rollup()
+        return group[code]
+
+    def _update_transitions(self, names, timestamps, categories):
+        people = len(self.store.names)
+        if people > len(self.last_ts):
+            grow = people - len(self.last_ts)
+            self.last_ts = np.concatenate((self.last_ts, np.full(grow, np.iinfo(np.int64).min)))
+            self.last_category = np.concatenate((self.last_category, np.full(grow, -1, dtype=np.int8)))
+        # Person by person, in time order
+        order = np.lexsort((timestamps, names))
+        names, timestamps, categories = names[order], timestamps[order], categories[order].astype(np.int64)
+        first = np.concatenate(([True], names[1:] != names[:-1]))
+        previous = np.empty(len(names), dtype=np.int64)
+        previous[1:] = categories[:-1]
+        previous[first] = self.last_category[names[first]]
+        # A person's first record in this batch continues from their stored latest one, unless it is older
+        counted = ~first | (timestamps >= self.last_ts[names])
+        changed = counted & (previous >= 0) & (previous != categories)
+        np.add.at(self.transitions, (previous[changed], categories[changed]), 1)
+        last = np.concatenate((names[1:] != names[:-1], [True]))
+        newer = timestamps[last] >= self.last_ts[names[last]]
+        people = names[last][newer]
+        self.last_ts[people] = timestamps[last][newer]
+        self.last_category[people] = categories[last][newer]
+
+    def group_rows(self, dimension):
+        """[(label, Rollup)] for one dimension, labels in a stable display order"""
+        self.update()
+        store = self.store
+        if dimension == 'age_band':
+            labels = engine.AGE_BANDS
+        elif dimension == 'gender':
+            labels = store.genders.values
+        else:
+            labels = store.activities.values
+        rows = [(labels[code], rollup) for code, rollup in self.groups[dimension].items() if rollup.count]
+        if dimension == 'age_band':
+            return sorted(rows, key=lambda row: engine.AGE_BANDS.index(row[0]))
+        return sorted(rows, key=lambda row: row[0])
+
+    def category_rows(self):
+        """[(category label, count)] for categories that occur"""
+        self.update()
+        return [(engine.CATEGORIES[code], int(count)) for code, count in enumerate(self.category_counts) if count]
+
+    def transition_rows(self):
+        """[(from label, to label, count)], most frequent first"""
+        self.update()
+        rows = [(engine.CATEGORIES[a], engine.CATEGORIES[b], int(self.transitions[a, b]))
+                for a, b in zip(*np.nonzero(self.transitions))]
+        return sorted(rows, key=lambda row: -row[2])
+
+    def current_category_rows(self):
+        """[(category label, people)] by each person's latest record"""
+        self.update()
+        latest = self.last_category[self.last_category >= 0]
+        counts = np.bincount(latest, minlength=len(engine.CATEGORIES))
+        return [(engine.CATEGORIES[code], int(count)) for code, count in enumerate(counts) if count]
@@ -0,0 +1,382 @@
+"""Local HTTP/JSON scoring service.
+
+Gives kiosks and intake systems what the Calculate button does
+(validation, unit conversion, category, ideal weight range and tips)
+without the GUI.  Built on asyncio streams only, so it needs nothing
+beyond NumPy.
+
+    python -m bmi serve [--host 127.0.0.1] [--port 8765]
+
+Endpoints (JSON in and out):
+
+    POST /score         one record        -> one result
+    POST /score/batch   {"records": [...]} -> {"results": [...]}
+    GET  /health        -> {"status": "ok", ...}
+
+A record has height and weight (cm/kg, or total inches/lbs with
+"units": "imperial"), age, and optionally gender and activity (the form's
+labels).  A result has bmi, category, percentile (under-18s, else null),
+ideal_min/ideal_max/ideal_unit, bmr, tdee (null without an activity),
+body_fat, bmi_prime and tips; an invalid record gets {"error": "..."}
+instead (status 400 from /score).
+
+Connections are HTTP/1.1 keep-alive.  Single-record requests that
+arrive together are scored as one engine.score_batch() call: the
+batcher takes everything queued once the event loop has read the
+requests that were ready, so a lone request waits for nothing and a busy
+server runs one vectorized pass per loop turn.  Work in flight is
+bounded: beyond max_pending records, /score and /score/batch answer 503
+with Retry-After instead of queueing without limit, and each response
+is drained before the next request on that connection is read, so slow
+clients are held back by TCP.
+"""
+import asyncio
+import json
+import math
+import time
+
+import numpy as np
+
+from bmi import engine
+from bmi.tips import personalized_tips
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BATCH = 512  # records per vectorized pass
+MAX_PENDING = 4096  # records queued or being scored before requests are refused
+MAX_BATCH_RECORDS = 10000  # records in one /score/batch request
+MAX_BODY = 4 * 1024 * 1024
+MAX_HEADER = 16 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Overloaded(Exception):
+    """More records in flight than the server accepts"""
+
+
+def number(value):
+    """A JSON number as a finite float, else None (strings, booleans, NaN and Infinity are refused)"""
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except OverflowError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_record(record):
+    """Validate one JSON record like the input form does.
+
+    Returns (height_cm, weight_kg, age, gender, activity, imperial);
+    raises ValueError with the form's message.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Record must be a JSON object")
+    units = record.get('units', 'metric')
+    if units not in ('metric', 'imperial'):
+        raise ValueError("units must be 'metric' or 'imperial'")
+    try:
+        height, weight, age = record['height'], record['weight'], record['age']
+    except KeyError as e:
+        raise ValueError(f"Missing field: {e.args[0]}")
+    height, weight = number(height), number(weight)
+    if height is None or weight is None:
+        raise ValueError("height and weight must be numbers")
+    if not isinstance(age, int) or isinstance(age, bool) or not engine.MIN_AGE <= age <= engine.MAX_AGE:
+        raise ValueError(f"age must be a whole number from {engine.MIN_AGE} to {engine.MAX_AGE}")
+    imperial = units == 'imperial'
+    if imperial:
+        engine.validate_imperial(height, weight)
+        height, weight = engine.imperial_to_metric(height, weight)
+    else:
+        engine.validate_metric(height, weight)
+    gender = record.get('gender')
+    if gender is not None and gender not in engine.GENDERS:
+        raise ValueError(f"gender must be one of {', '.join(engine.GENDERS)}")
+    activity = record.get('activity')
+    if activity is not None and activity not in engine.ACTIVITY_LEVELS:
+        raise ValueError("activity must be one of the form's activity levels")
+    return height, weight, age, gender, activity, imperial
+
+
+def score_records(records):
+    """Score parsed records in one vectorized pass; returns result dicts"""
+    height, weight, age, gender, activity, imperial = zip(*records)
+    scores = engine.score_batch(height, weight, np.array(age), engine.gender_codes(gender), engine.activity_codes(activity))
+    bmi = np.round(scores['bmi'], 1).tolist()
+    percentile = np.round(scores['percentile'], 1).tolist()
+    bmr = np.round(scores['bmr']).tolist()
+    tdee = np.round(scores['tdee']).tolist()
+    body_fat = np.round(scores['body_fat'], 1).tolist()
+    bmi_prime = np.round(scores['bmi_prime'], 2).tolist()
+    ideal_min, ideal_max = scores['ideal_min_kg'], scores['ideal_max_kg']
+    imperial = np.array(imperial)
+    factor = np.where(imperial, engine.LBS_PER_KG, 1.0)
+    ideal_min = np.round(ideal_min * factor, 1).tolist()
+    ideal_max = np.round(ideal_max * factor, 1).tolist()
+    results = []
+    for i, code in enumerate(scores['category_code'].tolist()):
+        category = engine.CATEGORIES[code]
+        results.append({
+            'bmi': bmi[i],
+            'category': category,
+            'percentile': None if age[i] >= engine.ADULT_AGE else percentile[i],
+            'ideal_min': ideal_min[i],
+            'ideal_max': ideal_max[i],
+            'ideal_unit': "lbs" if imperial[i] else "kg",
+            'bmr': bmr[i],
+            'tdee': None if activity[i] is None else tdee[i],
+            'body_fat': body_fat[i],
+            'bmi_prime': bmi_prime[i],
+            'tips': personalized_tips(category, age[i], gender[i], activity[i]),
+        })
+    return results
+
+
+class Batcher:
+    """Coalesces single-record requests into score_records() calls"""
+
+    def __init__(self, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.in_flight = 0  # records admitted and not yet answered, batch requests included
+        self.queue = []  # (parsed record, future)
+        self.wakeup = asyncio.Event()
+        self.batches = 0
+        self.scored = 0
+
+    def admit(self, count):
+        """Reserve room for `count` records or raise Overloaded"""
+        if self.in_flight + count > self.max_pending:
+            raise Overloaded()
+        self.in_flight += count
+
+    def release(self, count):
+        self.in_flight -= count
+
+    async def score(self, record):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((record, future))
+        self.wakeup.set()
+        return await future
+
+    def score_now(self, records):
+        """Score a batch request directly; it is already vectorized"""
+        self.batches += 1
+        self.scored += len(records)
+        return score_records(records)
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            # One loop turn lets every connection with a request already read queue it
+            await asyncio.sleep(0)
+            batch, self.queue = self.queue[:self.max_batch], self.queue[self.max_batch:]
+            if not self.queue:
+                self.wakeup.clear()
+            if not batch:
+                continue
+            try:
+                results = self.score_now([record for record, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done(): future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done(): future.set_result(result)
+
+
+async def read_request(reader):
+    """(method, path, version, headers, body), or None when the client closed the connection"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HttpError(400, "Incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Request headers too large")
+    lines = head.decode('latin-1').split("\r\n")
+    try:
+        method, path, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HttpError(400, "Chunked request bodies are not supported; send Content-Length")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HttpError(400, "Bad Content-Length")
+    if length < 0:
+        raise HttpError(400, "Bad Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, f"Body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], version, headers, body
+
+
+def write_response(writer, status, payload, keep_alive, extra_headers=()):
+    try:
+        body = json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+    except ValueError:
+        # NaN or Infinity isn't JSON; validation should never let one through
+        status, keep_alive = 500, False
+        body = json.dumps({'error': "Result could not be encoded"}).encode()
+    head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+            f"Content-Length: {len(body)}", "Connection: " + ("keep-alive" if keep_alive else "close")]
+    head.extend(extra_headers)
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+
+class ScoringServer:
+    """The HTTP front end; one Batcher shared by every connection"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.batcher = None
+        self.server = None
+        self.started = None
+        self.requests = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Start listening; self.port holds the real port afterwards (useful with port 0)"""
+        self.batcher = Batcher(self.max_batch, self.max_pending)
+        self.batch_task = asyncio.create_task(self.batcher.run())
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEADER)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started = time.monotonic()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batch_task.cancel()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    write_response(writer, e.status, {'error': str(e)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == "HTTP/1.1" else connection == 'keep-alive'
+                status, payload, extra = await self.dispatch(method, path, body)
+                write_response(writer, status, payload, keep_alive, extra)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        """(status, JSON payload, extra headers) for one request"""
+        self.requests += 1
+        if path == "/health":
+            if method != "GET":
+                return 405, {'error': "Use GET"}, ("Allow: GET",)
+            return 200, self.health(), ()
+        if path not in ("/score", "/score/batch"):
+            return 404, {'error': f"No endpoint {path}"}, ()
+        if method != "POST":
+            return 405, {'error': "Use POST"}, ("Allow: POST",)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, {'error': "Body is not valid JSON"}, ()
+        try:
+            if path == "/score":
+                return await self.score_one(data)
+            return self.score_many(data)
+        except Overloaded:
+            self.rejected += 1
+            return 503, {'error': "Server busy, retry shortly"}, ("Retry-After: 1",)
+
+    async def score_one(self, data):
+        try:
+            record = parse_record(data)
+        except ValueError as e:
+            return 400, {'error': str(e)}, ()
+        self.batcher.admit(1)
+        try:
+            return 200, await self.batcher.score(record), ()
+        finally:
+            self.batcher.release(1)
+
+    def score_many(self, data):
+        records = data.get('records') if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            return 400, {'error': "Send {\"records\": [...]}"}, ()
+        if len(records) > MAX_BATCH_RECORDS:
+            return 413, {'error': f"At most {MAX_BATCH_RECORDS} records per batch"}, ()
+        results = [None] * len(records)
+        valid, parsed = [], []
+        for i, record in enumerate(records):
+            try:
+                parsed.append(parse_record(record))
+                valid.append(i)
+            except ValueError as e:
+                results[i] = {'error': str(e)}
+        if parsed:
+            self.batcher.admit(len(parsed))
+            try:
+                for i, result in zip(valid, self.batcher.score_now(parsed)):
+                    results[i] = result
+            finally:
+                self.batcher.release(len(parsed))
+        return 200, {'results': results}, ()
+
+    def health(self):
+        batcher = self.batcher
+        return {
+            'status': "ok",
+            'uptime_s': round(time.monotonic() - self.started, 1),
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'in_flight': batcher.in_flight,
+            'records_scored': batcher.scored,
+            'batches': batcher.batches,
+        }
+
+
+def run(host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=MAX_BATCH, max_pending=MAX_PENDING):
+    """Serve until interrupted"""
+    server = ScoringServer(host, port, max_batch, max_pending)
+
+    async def main():
+        await server.start()
+        print(f"Scoring service on http://{server.host}:{server.port} (Ctrl+C to stop)", flush=True)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    return 0
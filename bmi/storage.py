@@ -0,0 +1,357 @@
+"""Crash-safe, append-only history file.
+
+Every calculation is written through to the log as one tab-separated
+line.  Writes are flushed to the OS immediately, while the (slow) fsync
+is batched: it runs after `sync_every` records or `sync_interval`
+seconds, whichever comes first.  A crash can therefore lose at most the
+last few unsynced records, and a record torn half-way through a write
+is skipped on the next load rather than corrupting the file.
+
+Format v2 stores the time as integer epoch seconds.  v1 files stored a
+local "YYYY-MM-DD HH:MM" string, which cost a strptime per record on
+every load and lost the seconds (so records made in the same minute
+could not be ordered).  v1 records are still read, and upgrade()
+rewrites a v1 file as v2 once; the GUI does this after loading.
+
+Deleting or editing a record doesn't rewrite the file either: the
+record is withdrawn by appending it again behind a "-" field, and an
+edit appends the corrected record as usual.  Loading cancels each
+withdrawal against one earlier identical record (history.entry_key);
+withdrawals left over are kept in `pending_removals`, for records that
+arrive from other stations.  Older versions skip the "-" lines as
+damaged records.
+"""
+import itertools
+import mmap
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from bmi.history import DATE_FORMAT, entry_key, parse_dates
+
+DEFAULT_HISTORY_FILE = "bmi_history.txt"
+REMOVED_MARK = "-"
+
+FIELDS = ('ts', 'name', 'age', 'gender', 'activity', 'height', 'weight', 'bmi', 'category')
+HEADER = "# bmi_history v2\t" + "\t".join(FIELDS) + "\n"
+UPGRADE_CHUNK = 50000
+
+_INT_FIELDS = ('age',)
+_FLOAT_FIELDS = ('height', 'weight', 'bmi')
+_TEXT_FIELDS = ('name', 'gender', 'activity', 'category')
+
+
+def _clean(value):
+    """Tabs and newlines would break the record framing"""
+    return str(value).replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def format_record(entry):
+    return "\t".join(_clean(entry[field]) for field in FIELDS) + "\n"
+
+
+def format_removal(entry):
+    """The line that withdraws a record written earlier"""
+    return REMOVED_MARK + "\t" + format_record(entry)
+
+
+def format_columns(columns):
+    """format_record() for rows given as columns (see HistoryStore.extend_columns)"""
+    values = []
+    for field in FIELDS:
+        if field in _TEXT_FIELDS:
+            values.append([_clean(value) for value in columns[field]])
+        else:
+            values.append([str(value) for value in np.asarray(columns[field]).tolist()])
+    return ["\t".join(row) + "\n" for row in zip(*values)]
+
+
+def parse_record(line):
+    """Parse one log line; returns None for headers and damaged records"""
+    if not line.endswith("\n") or line.startswith("#"):
+        return None
+    values = line[:-1].split("\t")
+    if len(values) != len(FIELDS):
+        return None
+    entry = dict(zip(FIELDS, values))
+    try:
+        stamp = entry['ts']
+        # v1 records hold a formatted local time instead of epoch seconds
+        entry['ts'] = int(stamp) if stamp.isdigit() else int(datetime.strptime(stamp, DATE_FORMAT).timestamp())
+        for field in _INT_FIELDS:
+            entry[field] = int(entry[field])
+        for field in _FLOAT_FIELDS:
+            entry[field] = float(entry[field])
+    except ValueError:
+        return None
+    return entry
+
+
+def _upgrade_lines(lines):
+    """Current-format lines for a block of old ones, dates parsed in one vectorized call"""
+    # Withdrawals were only ever written in the current format
+    removals = [line for line in lines if line.startswith(REMOVED_MARK + "\t") and line.endswith("\n")]
+    rows = [line[:-1].split("\t") for line in lines
+            if line.endswith("\n") and not line.startswith("#") and line.count("\t") == len(FIELDS) - 1]
+    stamps = [row[0] for row in rows]
+    try:
+        ts = parse_dates([stamp for stamp in stamps if not stamp.isdigit()]).tolist()
+    except ValueError:
+        # A damaged date somewhere in the block: fall back to checking each record
+        return [format_record(entry) for entry in map(parse_record, lines) if entry is not None] + removals
+    ts.reverse()
+    out = []
+    for row in rows:
+        row[0] = row[0] if row[0].isdigit() else str(ts.pop())
+        out.append("\t".join(row) + "\n")
+    return out + removals
+
+
+def _lines_before(f, stop):
+    """The lines of a binary file up to byte offset `stop`; a line running past it is cut short"""
+    for line in f:
+        if len(line) >= stop:
+            yield line[:stop]
+            return
+        stop -= len(line)
+        yield line
+
+
+def _upgrade_copy(lines, dst):
+    """Write binary lines to `dst` in the current format, a block at a time; returns the lines written"""
+    lines = iter(lines)
+    count = 0
+    while True:
+        block = [line.decode('utf-8', errors='replace') for line in itertools.islice(lines, UPGRADE_CHUNK)]
+        if not block:
+            return count
+        records = _upgrade_lines(block)
+        dst.writelines(records)
+        count += len(records)
+
+
+class HistoryLog:
+    """Append-only history file with batched fsync"""
+
+    def __init__(self, path=DEFAULT_HISTORY_FILE, sync_every=32, sync_interval=2.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+        self.pending_removals = Counter()  # entry_key -> withdrawals that matched no record in the file
+        self._clears = 0  # clear() calls, so upgrade() can tell the file was emptied under it
+
+    def _open(self):
+        if self._file is not None: return
+        self._file = open(self.path, 'a+', encoding='utf-8', newline='')
+        if self._file.tell() == 0:
+            self._file.write(HEADER)
+        else:
+            # Terminate a record torn by a crash so the next one starts clean
+            self._file.seek(self._file.tell() - 1)
+            last = self._file.read(1)
+            if last != "\n":
+                self._file.write("\n")
+        self._file.flush()
+
+    def append(self, entry):
+        """Write one entry through to the file"""
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        """Write several entries with a single write and (at most) one fsync"""
+        lines = [format_record(entry) for entry in entries]
+        self._write("".join(lines), len(lines))
+
+    def append_columns(self, columns):
+        """Write rows given as columns (see HistoryStore.extend_columns)"""
+        lines = format_columns(columns)
+        self._write("".join(lines), len(lines))
+
+    def append_changes(self, steps):
+        """Write a list of (added, entry) steps: records added, and records withdrawn (see bmi.journal)"""
+        lines = [format_record(entry) if added else format_removal(entry) for added, entry in steps]
+        self._write("".join(lines), len(lines))
+
+    def cancel_removed(self, entries):
+        """The entries not withdrawn by a pending removal (each removal cancels one entry)"""
+        if not self.pending_removals:
+            return entries
+        kept = []
+        for entry in entries:
+            key = entry_key(entry)
+            if self.pending_removals[key]:
+                self.pending_removals[key] -= 1
+            else:
+                kept.append(entry)
+        self.pending_removals = +self.pending_removals
+        return kept
+
+    def _write(self, data, count):
+        if not count: return
+        with self._lock:
+            self._open()
+            self._file.write(data)
+            self._file.flush()
+            self._unsynced += count
+            if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.sync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _sync_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Force pending records to disk"""
+        with self._lock:
+            self._sync_locked()
+
+    def clear(self):
+        """Drop every record"""
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.path, 'w', encoding='utf-8', newline='') as f:
+                f.write(HEADER)
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending_removals.clear()
+            self._clears += 1
+
+    def close(self):
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def needs_upgrade(self):
+        """True if the file is in an older format (see upgrade())"""
+        try:
+            with open(self.path, 'r', encoding='utf-8', newline='') as f:
+                first = f.readline()
+        except FileNotFoundError:
+            return False
+        return bool(first) and first != HEADER
+
+    def upgrade(self):
+        """Rewrite the file in the current format; returns the number of lines kept.
+
+        Records are copied unchanged apart from the time; torn lines are
+        dropped.  The new file replaces the old one atomically, so a crash
+        leaves one or the other.  Appends go on while the file is copied:
+        the lock is only held to copy what they added since the copy
+        started (as iter_chunks(stop=...) reads up to a size() snapshot)
+        and to swap the files.
+        """
+        temp = self.path + ".upgrade"
+        with self._lock:
+            stop = self._size_locked()
+            clears = self._clears
+        with open(temp, 'w', encoding='utf-8', newline='') as dst:
+            dst.write(HEADER)
+            with open(self.path, 'rb') as src:
+                count = _upgrade_copy(_lines_before(src, stop), dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+            with self._lock:
+                if self._clears != clears:
+                    # clear() ran meanwhile and left an empty file in the current format
+                    count = None
+                else:
+                    self._sync_locked()
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    with open(self.path, 'rb') as src:
+                        src.seek(stop)
+                        count += _upgrade_copy(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                    dst.close()
+                    os.replace(temp, self.path)
+        if count is None:
+            os.remove(temp)
+            return 0
+        return count
+
+    def size(self):
+        """Bytes written so far (0 before the file exists); see iter_chunks()"""
+        with self._lock:
+            return self._size_locked()
+
+    def _size_locked(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def iter_chunks(self, chunk_size=10000, stop=None):
+        """Yield lists of history entries, oldest first.
+
+        Reads the file lazily so a caller can start showing the most
+        important data before a multi-million-record log is fully parsed.
+        Withdrawn records are left out.  With `stop` (from size()), only
+        the records written before then are read, so ones appended while
+        loading aren't loaded a second time.
+        """
+        if not os.path.exists(self.path): return
+        removals = self._removals(stop)
+        chunk = []
+        with open(self.path, 'rb') as f:
+            for line in f if stop is None else _lines_before(f, stop):
+                entry = parse_record(line.decode('utf-8', errors='replace'))
+                if entry is None: continue
+                if removals:
+                    key = entry_key(entry)
+                    if removals[key]:
+                        removals[key] -= 1
+                        continue
+                chunk.append(entry)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+        self.pending_removals = +removals
+
+    def _removals(self, stop=None):
+        """entry_key -> number of withdrawal lines in the file (before byte `stop`)"""
+        removals = Counter()
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if stop is not None:
+                size = min(size, stop)
+            if not size:
+                return removals
+            # A C-speed search, so a file without withdrawals costs next to nothing extra
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                mark = b"\n" + REMOVED_MARK.encode() + b"\t"
+                start = data.find(mark, 0, size)
+                while start >= 0:
+                    end = data.find(b"\n", start + len(mark), size)
+                    if end < 0: break  # Torn
+                    entry = parse_record(data[start + len(mark):end + 1].decode('utf-8', errors='replace'))
+                    if entry is not None:
+                        removals[entry_key(entry)] += 1
+                    start = data.find(mark, end, size)
+        return removals
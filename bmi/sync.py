@@ -0,0 +1,229 @@
+"""History replication between stations through a shared folder.
+
+Every station appends the records it creates to its own file in a
+shared directory (a network share, or any folder the stations can all
+reach), <station>.log, and reads the other stations' files from where
+it left off.  Each station numbers its own records 1, 2, 3... and is
+the only writer of its file, so stations never wait on each other and
+merging is just the union of append-only logs: there is nothing to
+resolve, and a record read twice is ignored because everything up to a
+station's last applied number is skipped.
+
+Deleting or editing a record is published the way the history file
+records it (bmi.storage): the withdrawn record behind a "-" field, then
+the corrected one, if any.  pull() returns (added, entry) steps, as
+bmi.journal names changes, and the Replicator hands additions to
+deliver() and withdrawals to withdraw(), in the order they were made.
+
+Remote records are not copied into the local history file; the shared
+logs are where they live.  After a restart a station reads them again
+from the start of each log, as it does its own history file.  Clearing
+the history on one station removes nothing from the shared logs.
+
+The folder comes from BMI_SYNC_DIR; the station name defaults to the
+host name and BMI_STATION overrides it.  Two stations must not use the
+same name.
+"""
+import os
+import socket
+import itertools
+import threading
+
+from bmi.storage import FIELDS, REMOVED_MARK, format_columns, format_record, format_removal, parse_record
+
+DIR_VAR = "BMI_SYNC_DIR"
+STATION_VAR = "BMI_STATION"
+LOG_SUFFIX = ".log"
+HEADER = "# bmi_sync v1\tseq\t" + "\t".join(FIELDS) + "\n"
+POLL_INTERVAL = 2.0  # seconds between reads of the other stations' logs
+PULL_CHUNK = 10000  # records handed over at a time
+TAIL_BYTES = 65536  # enough of our own log to find its last sequence number
+
+
+def directory_from_environment():
+    return os.environ.get(DIR_VAR) or None
+
+
+def default_station():
+    name = os.environ.get(STATION_VAR) or socket.gethostname() or "station"
+    # The name becomes a file name
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+class ReplicationLog:
+    """This station's log in the shared folder, plus read positions in everyone else's"""
+
+    def __init__(self, directory, station=None):
+        self.directory = directory
+        self.station = station or default_station()
+        self.path = os.path.join(directory, self.station + LOG_SUFFIX)
+        self.seq = None  # last number written; read from the file before the first write
+        self.cursors = {}  # station -> [byte offset, last sequence number applied]
+
+    def _last_seq(self):
+        """Sequence number of the last complete record in our log (0 if there is none)"""
+        try:
+            with open(self.path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - TAIL_BYTES))
+                lines = f.read().split(b"\n")
+        except FileNotFoundError:
+            return 0
+        # The piece after the last newline is empty or torn; the first may be cut off by the seek
+        for line in reversed(lines[1 if size > TAIL_BYTES else 0:-1]):
+            seq = line.split(b"\t", 1)[0]
+            if seq.isdigit():
+                return int(seq)
+        return 0
+
+    def write(self, lines):
+        """Append records already formatted by format_record(), numbering them"""
+        if not lines: return
+        if self.seq is None:
+            self.seq = self._last_seq()
+        first = self.seq + 1
+        data = "".join(f"{seq}\t{line}" for seq, line in enumerate(lines, first))
+        try:
+            with open(self.path, 'a+', encoding='utf-8', newline='') as f:
+                if f.tell() == 0:
+                    f.write(HEADER)
+                else:
+                    # Terminate a record torn by a crash so the next one starts clean
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != "\n":
+                        f.write("\n")
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            self.seq = None  # Re-read the file before numbering again
+            raise
+        self.seq = first + len(lines) - 1
+
+    def stations(self):
+        """Names of the other stations with a log in the folder"""
+        return sorted(name[:-len(LOG_SUFFIX)] for name in os.listdir(self.directory)
+                      if name.endswith(LOG_SUFFIX) and name[:-len(LOG_SUFFIX)] != self.station)
+
+    def pull(self, limit=PULL_CHUNK):
+        """Up to `limit` (added, entry) steps from other stations that haven't been returned yet"""
+        steps = []
+        for station in self.stations():
+            steps.extend(self._read(station, limit - len(steps)))
+            if len(steps) >= limit: break
+        return steps
+
+    def _read(self, station, limit):
+        cursor = self.cursors.setdefault(station, [0, 0])
+        steps = []
+        with open(os.path.join(self.directory, station + LOG_SUFFIX), 'rb') as f:
+            if os.fstat(f.fileno()).st_size < cursor[0]:
+                cursor[0] = 0  # Replaced by a shorter copy: read it again, the numbers skip what we have
+            f.seek(cursor[0])
+            while len(steps) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"): break  # The end, or a record still being written
+                cursor[0] += len(line)
+                seq, _, record = line.decode('utf-8', errors='replace').partition("\t")
+                if not seq.isdigit() or int(seq) <= cursor[1]: continue
+                added = not record.startswith(REMOVED_MARK + "\t")
+                entry = parse_record(record if added else record[len(REMOVED_MARK) + 1:])
+                if entry is None: continue
+                cursor[1] = int(seq)
+                steps.append((added, entry))
+        return steps
+
+
+class Replicator:
+    """Runs a ReplicationLog on a background thread.
+
+    publish() and publish_columns() queue this station's new records,
+    and publish_changes() its deletes and edits; they return at once.
+    The thread writes them to the shared folder, then reads the other
+    stations' changes and hands new records to deliver(entries) and
+    withdrawn ones to withdraw(entries), on the thread; the GUI wraps
+    them in wx.CallAfter.
+    While the folder can't be reached (or anything else goes wrong)
+    records stay queued and are tried again every round, and
+    failed(error) is called once per outage; `error` is the current one.
+    """
+
+    def __init__(self, log, deliver, failed=None, interval=POLL_INTERVAL, withdraw=None):
+        self.log = log
+        self.deliver = deliver
+        self.failed = failed
+        self.withdraw = withdraw
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.outbox = []  # formatted records waiting to be written
+        self.closed = False
+        self.error = None  # the current outage, if any
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="history-sync", daemon=True)
+        self.thread.start()
+
+    def publish(self, entries):
+        self._queue([format_record(entry) for entry in entries])
+
+    def publish_columns(self, columns):
+        self._queue(format_columns(columns))
+
+    def publish_changes(self, steps):
+        """Queue (added, entry) steps, as HistoryLog.append_changes() writes them"""
+        self._queue([format_record(entry) if added else format_removal(entry) for added, entry in steps])
+
+    def _queue(self, lines):
+        with self.condition:
+            self.outbox.extend(lines)
+            self.condition.notify()
+
+    def close(self, timeout=1.0):
+        """Stop after one last attempt to write the queue (waits at most `timeout`)"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                lines, self.outbox = self.outbox, []
+                closed = self.closed
+            try:
+                self.log.write(lines)
+            except Exception as e:
+                # Not written: they go first in the next attempt
+                with self.condition:
+                    self.outbox[:0] = lines
+                self._outage(e)
+            else:
+                # Written, so a failure from here on must not queue them again
+                try:
+                    while not closed:
+                        steps = self.log.pull()
+                        if not steps: break
+                        self._hand_over(steps)
+                    self.error = None
+                except Exception as e:
+                    self._outage(e)
+            if closed: return
+            with self.condition:
+                if not self.closed and (not self.outbox or self.error is not None):
+                    self.condition.wait(self.interval)
+
+    def _hand_over(self, steps):
+        # Runs of additions and of withdrawals, in order, so an undone delete stays undone
+        for added, run in itertools.groupby(steps, key=lambda step: step[0]):
+            entries = [entry for _, entry in run]
+            if added:
+                self.deliver(entries)
+            elif self.withdraw is not None:
+                self.withdraw(entries)
+
+    def _outage(self, error):
+        if self.error is None and self.failed is not None:
+            self.failed(error)
+        self.error = error
@@ -0,0 +1,190 @@
+"""Hot and cold history tiers, so memory stays bounded in long sessions.
+
+The HistoryStore is the hot tier and holds at most `hot_rows` rows.
+When it grows past that, the people used least recently (a calculation,
+a selection, or just the order the history was loaded in) have all
+their rows moved to a cold segment, until the store is back down to
+LOW_WATER of the budget.  A segment is a compressed .npz file of the
+store's columns, codes and all, written on a background thread.
+Selecting a person pages their cold rows back in.
+
+Segments only last for the session, in a temporary directory: the
+history file is still the durable copy and is read again at start-up.
+The store's dictionaries never shrink, so the codes in a segment stay
+valid, and the person list still offers everyone.  Cohort statistics
+(store.rollups) keep counting every row, hot or cold; views built from
+the store itself (the grid and chart for all persons) show the hot
+window, which is everyone recently active.
+"""
+import os
+import shutil
+import tempfile
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from bmi.history import COLUMNS
+
+HOT_ROWS = 250000  # about 10 MB of columns and indexes
+LOW_WATER = 0.75  # evict down to this share of the budget, so it doesn't happen on every append
+
+
+class Segment:
+    """One compressed file of evicted rows"""
+    __slots__ = ('path', 'pending', 'columns')
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None  # the write's future
+        self.columns = None  # the rows themselves, if they couldn't be written
+
+    def write(self, columns):
+        try:
+            np.savez_compressed(self.path, **columns)
+        except OSError:
+            self.columns = columns  # Disk full or gone: keep them in memory rather than lose them
+
+    def load(self):
+        """The segment's columns (waits for the write if it hasn't finished)"""
+        self.pending.result()
+        if self.columns is not None:
+            return self.columns
+        with np.load(self.path) as data:
+            return {name: data[name] for name in COLUMNS}
+
+
+class HistoryTiers:
+    """Keeps a HistoryStore under `hot_rows` rows by spilling people to disk"""
+
+    def __init__(self, store, hot_rows=HOT_ROWS):
+        self.store = store
+        self.hot_rows = hot_rows
+        self.directory = None  # created by the first eviction
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-spill")
+        self.reset()
+
+    def reset(self):
+        self.recent = OrderedDict()  # name code -> None, least recently used first
+        self.seen = 0  # store rows already counted in `recent`
+        self.segments = []
+        # name code -> indexes into segments of the ones holding their cold rows.  A person paged
+        # back in is dropped from here; their rows stay in those files but are never read again.
+        self.cold = {}
+        self.cold_rows = 0
+        self.pinned = None  # the selected person, never evicted
+
+    def __len__(self):
+        return len(self.store) - self.store.deleted_count + self.cold_rows
+
+    def _follow(self):
+        """Count the people in rows appended since the last call as just used"""
+        names = self.store.column('name')[self.seen:]
+        if len(names):
+            # Each person once, at their last appearance
+            last = len(names) - 1 - np.unique(names[::-1], return_index=True)[1]
+            recent = self.recent
+            for code in names[np.sort(last)].tolist():
+                recent[code] = None
+                recent.move_to_end(code)
+        self.seen = len(self.store)
+
+    def select(self, name):
+        """Pin the selected person (None for all) and page their cold rows in; returns how many came back"""
+        self.pinned = None if name is None else self.store.names.codes.get(name)
+        return 0 if self.pinned is None else self.page_in(name)
+
+    def page_in(self, name):
+        """Bring a person's cold rows back into the store; returns how many came back"""
+        store = self.store
+        self._follow()
+        code = store.names.codes.get(name)
+        if code is None: return 0
+        self.recent[code] = None
+        self.recent.move_to_end(code)
+        parts = []
+        for number in self.cold.get(code, ()):
+            columns = self.segments[number].load()  # OSError leaves them cold, to try again
+            mine = columns['name'] == code
+            parts.append({field: column[mine] for field, column in columns.items()})
+        if not parts: return 0
+        del self.cold[code]
+        restored = {field: np.concatenate([part[field] for part in parts]) for field in COLUMNS}
+        store.restore(restored)
+        self.cold_rows -= len(restored['ts'])
+        self.seen = len(store)
+        return len(restored['ts'])
+
+    def enforce(self):
+        """Evict while the store is over budget; returns how many rows went cold"""
+        store = self.store
+        self._follow()
+        if len(store) <= self.hot_rows: return 0
+        target = len(store) - int(self.hot_rows * LOW_WATER)
+        victims, rows = [], 0
+        for code in self.recent:
+            if rows >= target: break
+            if code == self.pinned: continue
+            count = len(store.person_rows[code])
+            if count:
+                victims.append(code)
+                rows += count
+        if not victims: return 0
+        columns = store.evict(victims)
+        self._spill(columns, victims)
+        for code in victims:
+            del self.recent[code]
+        self.seen = len(store)
+        return rows
+
+    def _spill(self, columns, codes):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="bmi-history-")
+        number = len(self.segments)
+        path = os.path.join(self.directory, f"segment-{number:05d}.npz")
+        segment = Segment(path)
+        segment.pending = self.writer.submit(segment.write, columns)
+        self.segments.append(segment)
+        for code in codes:
+            self.cold.setdefault(code, array('i')).append(number)
+        self.cold_rows += len(columns['ts'])
+
+    def cold_parts(self):
+        """What merge_cold() needs to read the cold rows: (segment, name codes still cold in it)"""
+        live = {}
+        for code, numbers in self.cold.items():
+            for number in numbers:
+                live.setdefault(number, []).append(code)
+        return [(self.segments[number], np.array(codes, dtype=np.int32)) for number, codes in sorted(live.items())]
+
+    def clear(self):
+        """Forget every cold row (after the store itself has been cleared)"""
+        self._remove_directory()
+        self.reset()
+
+    def close(self):
+        self.writer.shutdown(wait=True)
+        self._remove_directory()
+
+    def _remove_directory(self):
+        if self.directory is not None:
+            for segment in self.segments:
+                segment.pending.cancel()
+                segment.columns = None
+            directory, self.directory = self.directory, None
+            # A write still running finishes into a directory that is then gone
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def merge_cold(snapshot, parts):
+    """A store snapshot with the cold rows from cold_parts() added in front; safe on any thread"""
+    pieces = []
+    for segment, live in parts:
+        columns = segment.load()
+        keep = np.isin(columns['name'], live)
+        pieces.append({field: column[keep] for field, column in columns.items()})
+    if pieces:
+        for field in COLUMNS:
+            snapshot[field] = np.concatenate([piece[field] for piece in pieces] + [snapshot[field]])
+    return snapshot
@@ -0,0 +1,89 @@
+"""Personalised health tips.
+
+Every combination of (category, age band, gender, activity level) is
+assembled once at import into TIP_TABLE, so showing tips after a
+calculation is a single dictionary lookup.  Gender and activity may be
+None when they are not known.
+"""
+from bmi import engine
+
+# Category code -> tip group
+CATEGORY_GROUPS = {
+    0: "underweight", 1: "underweight", 7: "underweight",
+    2: "healthy", 8: "healthy",
+    3: "overweight", 9: "overweight",
+    4: "obese", 5: "obese", 6: "obese", 10: "obese",
+}
+SEE_A_DOCTOR = (0, 5, 6)
+
+GROUP_TIPS = {
+    "underweight": "📈 **Weight Gain Tips:**\n• Eat 5-6 small meals\n• Add healthy fats & protein\n• Strength train",
+    "healthy": "✅ **Maintenance:**\n• Maintain balanced diet\n• Regular exercise\n• Hydration",
+    "overweight": "📉 **Weight Loss Tips:**\n• Caloric deficit\n• Increase veggies & fiber\n• Cardio & weights",
+    "obese": "📉 **Weight Loss Tips:**\n• Aim for 0.5-1 kg (1-2 lbs) a week\n• Swap sugary drinks for water\n• "
+             "Fill half the plate with vegetables\n• Build up to 150+ minutes of activity a week",
+}
+
+# (group, band) -> extra advice; children and teens should grow into a healthy weight, not diet
+BAND_TIPS = {
+    ("underweight", "child"): "👶 **For Children:**\n• Offer regular meals and snacks\n• Talk to a paediatrician about growth",
+    ("underweight", "teen"): "🧑 **For Teens:**\n• Don't skip breakfast\n• Check with a doctor if weight keeps dropping",
+    ("underweight", "senior"): "🧓 **For Seniors:**\n• Protein at every meal keeps muscle\n• Unplanned weight loss is worth a check-up",
+    ("overweight", "child"): "👶 **For Children:**\n• Family meals, no dieting\n• At least 60 minutes of play a day\n• "
+                             "Limit screen time",
+    ("overweight", "teen"): "🧑 **For Teens:**\n• 60 minutes of activity a day\n• Cut sugary drinks\n• Get 8-10 hours of sleep",
+    ("overweight", "senior"): "🧓 **For Seniors:**\n• Favour gentle cardio (walking, swimming)\n• Add balance training",
+    ("obese", "child"): "👶 **For Children:**\n• Work with a paediatrician on a family plan\n• Focus on habits, not the scale",
+    ("obese", "teen"): "🧑 **For Teens:**\n• Ask a doctor about a supervised plan\n• Find an activity you enjoy",
+    ("obese", "senior"): "🧓 **For Seniors:**\n• Check with your doctor before new exercise\n• Protect joints with low-impact activity",
+    ("healthy", "child"): "👶 **For Children:**\n• Keep up active play every day",
+    ("healthy", "senior"): "🧓 **For Seniors:**\n• Strength and balance work twice a week",
+}
+
+GENDER_TIPS = {
+    "Female": "♀ **Also:**\n• Get enough iron and calcium\n• Weight-bearing exercise protects bones",
+    "Male": "♂ **Also:**\n• Watch waist size (aim under 94 cm / 37 in)\n• Keep alcohol within guidelines",
+}
+
+# Keyed by the first word of engine.ACTIVITY_LEVELS
+ACTIVITY_TIPS = {
+    "Sedentary": "🚶 **Activity:**\n• Start with a 10-minute walk after meals\n• Stand up every 30 minutes",
+    "Lightly": "🚶 **Activity:**\n• Add one more active day a week\n• Try brisk walking or cycling",
+    "Moderately": "🏃 **Activity:**\n• Mix in two strength sessions a week",
+    "Very": "🏋 **Activity:**\n• Schedule rest days\n• Refuel with protein and carbohydrates",
+    "Extra": "🏋 **Activity:**\n• Eat enough to match your training\n• Sleep and recovery matter as much as effort",
+}
+
+DOCTOR_TIP = "🩺 **Important:**\n• Please talk to a doctor about your weight"
+GENERAL_TIPS = "💡 **General:**\n• Drink water\n• Sleep 7-9 hours\n• Manage stress"
+
+
+def _build(code, band, gender, activity):
+    group = CATEGORY_GROUPS[code]
+    sections = [GROUP_TIPS[group]]
+    if code in SEE_A_DOCTOR:
+        sections.append(DOCTOR_TIP)
+    if (group, band) in BAND_TIPS:
+        sections.append(BAND_TIPS[group, band])
+    if gender in GENDER_TIPS and band in ("adult", "senior"):
+        sections.append(GENDER_TIPS[gender])
+    if activity is not None:
+        sections.append(ACTIVITY_TIPS[activity.split()[0]])
+    sections.append(GENERAL_TIPS)
+    return "\n\n".join(sections)
+
+
+TIP_TABLE = {
+    (code, band, gender, activity): _build(code, band, gender, activity)
+    for code in CATEGORY_GROUPS
+    for band in engine.AGE_BANDS
+    for gender in engine.GENDERS + (None,)
+    for activity in engine.ACTIVITY_LEVELS + (None,)
+}
+
+
+def personalized_tips(category, age, gender=None, activity=None):
+    """Tips text for a category label; unknown gender/activity fall back to the general advice"""
+    if gender not in engine.GENDERS: gender = None
+    if activity not in engine.ACTIVITY_LEVELS: activity = None
+    return TIP_TABLE[engine.CATEGORY_CODES[category], engine.AGE_BANDS[engine.age_band(age)], gender, activity]
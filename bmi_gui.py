@@ -0,0 +1,1356 @@
+"""The wxPython window.  Start it with "BMI Project.py".
+
+This is a module of its own, not the script itself, so that worker
+processes started with the spawn method (the PDF report's pool), which
+run the main script again as __mp_main__, never import wx.
+"""
+import importlib.util
+from functools import lru_cache
+import wx
+import wx.grid
+from datetime import datetime
+import threading
+
+from bmi import engine, profiling, sync
+from bmi.chart import ChartRenderer, LRUCache
+from bmi.export import ExportCancelled, export_csv
+from bmi.history import HistoryStore, entry_key
+from bmi.importer import ImportCancelled, ImportStats, iter_batches
+from bmi.index import CATEGORY_FILTERS, PERIOD_FILTERS
+from bmi.journal import HistoryJournal, describe
+from bmi.report import write_pdf_report
+from bmi.storage import HistoryLog
+from bmi.tiers import HistoryTiers, merge_cold
+from bmi.tips import personalized_tips
+
+# matplotlib is by far the slowest import; only the chart worker loads it, on the first draw
+MATPLOTLIB_AVAILABLE = importlib.util.find_spec("matplotlib") is not None
+
+# Colours indexed by engine.color_band(): under, normal, over, obese
+BMI_COLORS = (wx.Colour(0, 0, 255), wx.Colour(0, 128, 0), wx.Colour(255, 165, 0), wx.Colour(255, 0, 0))
+GRID_CATEGORY_COLORS = (wx.Colour(135, 206, 250), wx.Colour(144, 238, 144), wx.Colour(255, 165, 0), wx.Colour(255, 0, 0))
+# The person selector lists at most this many names; the search box narrows it down
+PERSON_LIST_LIMIT = 1000
+TIPS_PLACEHOLDER = "Enter your information to see personalized health tips."
+METRICS_PLACEHOLDER = "BMI Prime: --    Body Fat (est.): --\nBMR: --    TDEE: --"
+# Live preview waits this long after the last keystroke or spin click
+PREVIEW_DELAY_MS = 250
+# Rendered charts kept per (filters, data version, size), so flipping between people is instant
+CHART_CACHE_SIZE = 12
+# The chart is re-rendered once resizing pauses for this long
+CHART_RESIZE_DELAY_MS = 150
+
+
+@lru_cache(maxsize=512)
+def score_form(height, weight, age, gender, activity, metric):
+    """Validate and score the form's values (cm/kg, or total inches/lbs).
+
+    Returns (height_cm, weight_kg, result, labels) with the texts for the
+    BMI, category, ideal weight and body metrics fields.  Memoized, because
+    the live preview asks again on every keystroke; callers must not
+    modify it.
+    """
+    if metric:
+        engine.validate_metric(height, weight)
+        height_cm, weight_kg = height, weight
+    else:
+        engine.validate_imperial(height, weight)
+        # Convert to Metric for consistent history storage and calculation
+        height_cm, weight_kg = engine.imperial_to_metric(height, weight)
+    result = engine.score(height_cm, weight_kg, age, gender, activity)
+    
+    category_text = f"Category: {result['category']}"
+    if result['percentile'] is not None:
+        category_text += f" (BMI-for-age percentile {result['percentile']:.0f})"
+    # Display ideal weight in user's preferred unit
+    if metric:
+        ideal_text = f"Ideal Weight Range: {result['ideal_min_kg']:.1f} - {result['ideal_max_kg']:.1f} kg"
+    else:
+        ideal_min_lbs = result['ideal_min_kg'] * engine.LBS_PER_KG
+        ideal_max_lbs = result['ideal_max_kg'] * engine.LBS_PER_KG
+        ideal_text = f"Ideal Weight Range: {ideal_min_lbs:.1f} - {ideal_max_lbs:.1f} lbs"
+    metrics_text = (f"BMI Prime: {result['bmi_prime']:.2f}    Body Fat (est.): {result['body_fat']:.1f}%\n"
+                    f"BMR: {result['bmr']:.0f} kcal/day    TDEE: ")
+    metrics_text += "select activity level" if result['tdee'] is None else f"{result['tdee']:.0f} kcal/day"
+    return height_cm, weight_kg, result, (f"{result['bmi']:.1f}", category_text, ideal_text, metrics_text)
+
+class HistoryTable(wx.grid.GridTableBase):
+    """Virtual grid table over the calculation history.
+
+    The grid only asks for the cells it is drawing, so appending an entry
+    costs the same no matter how long the history is.  `view` holds the
+    store rows a filter selected (None shows every row).
+    """
+    COLUMNS = ("Date", "Name", "Age", "Gender", "Activity", "BMI", "Category", "BMI Prime", "Body Fat %", "BMR", "TDEE")
+    COLUMN_WIDTHS = (120, 140, 45, 70, 130, 50, 160, 65, 70, 50, 50)
+    CATEGORY_COL = 6
+
+    def __init__(self, history):
+        super().__init__()
+        self.history = history
+        self.view = None
+        self.rows = 0  # Row count the grid currently knows about
+        self.metrics_row = (None, None)  # ((history version, store row), its metrics): the grid asks cell by cell
+        
+        self.default_attr = wx.grid.GridCellAttr()
+        self.default_attr.SetReadOnly(True)
+        # One cached attribute per colour band for the Category column
+        self.category_attrs = []
+        for band, colour in enumerate(GRID_CATEGORY_COLORS):
+            attr = wx.grid.GridCellAttr()
+            attr.SetReadOnly(True)
+            attr.SetBackgroundColour(colour)
+            attr.SetTextColour(wx.BLACK if band < 3 else wx.WHITE)
+            self.category_attrs.append(attr)
+
+    def GetNumberRows(self):
+        return self.rows
+
+    def GetNumberCols(self):
+        return len(self.COLUMNS)
+
+    def GetColLabelValue(self, col):
+        return self.COLUMNS[col]
+
+    def IsEmptyCell(self, row, col):
+        return False
+
+    def store_row(self, row):
+        return row if self.view is None else int(self.view[row])
+
+    def GetValue(self, row, col):
+        history = self.history
+        row = self.store_row(row)
+        if col == 0: return history.value(row, 'date')
+        elif col == 1: return history.value(row, 'name')
+        elif col == 2: return str(history.value(row, 'age'))
+        elif col == 3: return history.value(row, 'gender')
+        elif col == 4: return history.value(row, 'activity').split('(')[0].strip()
+        elif col == 5: return str(history.value(row, 'bmi'))
+        elif col == 6: return history.value(row, 'category')
+        key = (history.version, row)
+        if self.metrics_row[0] != key:
+            self.metrics_row = (key, history.metrics(row))
+        metrics = self.metrics_row[1]
+        if col == 7: return f"{metrics['bmi_prime']:.2f}"
+        elif col == 8: return f"{metrics['body_fat']:.1f}"
+        elif col == 9: return f"{metrics['bmr']:.0f}"
+        else: return "" if metrics['tdee'] is None else f"{metrics['tdee']:.0f}"
+
+    def SetValue(self, row, col, value):
+        pass  # History is read-only from the grid
+
+    def GetAttr(self, row, col, kind):
+        if col == self.CATEGORY_COL:
+            attr = self.category_attrs[engine.color_band(self.history.value(self.store_row(row), 'bmi'))]
+        else:
+            attr = self.default_attr
+        attr.IncRef()
+        return attr
+
+    def sync(self):
+        """Tell the grid about rows appended or removed since the last sync"""
+        count = len(self.history) if self.view is None else len(self.view)
+        if count > self.rows:
+            msg = wx.grid.GridTableMessage(self, wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED, count - self.rows)
+        elif count < self.rows:
+            msg = wx.grid.GridTableMessage(self, wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, count, self.rows - count)
+        else:
+            return
+        self.rows = count
+        self.GetView().ProcessTableMessage(msg)
+
+class ChartPanel(wx.Panel):
+    """Shows chart bitmaps rendered off the GUI thread"""
+
+    def __init__(self, parent, on_resize):
+        super().__init__(parent)
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.bitmap = None
+        self.on_resize = on_resize
+        self.resize_call = None
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+
+    def show(self, bitmap):
+        self.bitmap = bitmap
+        self.Refresh(eraseBackground=False)
+
+    def on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(wx.WHITE_BRUSH)
+        dc.Clear()
+        if self.bitmap is not None:
+            dc.DrawBitmap(self.bitmap, 0, 0)
+        else:
+            width, height = self.GetClientSize()
+            text_width, text_height = dc.GetTextExtent("Drawing chart...")
+            dc.DrawText("Drawing chart...", (width - text_width) // 2, (height - text_height) // 2)
+
+    def on_size(self, event):
+        # Keep showing the old bitmap while the size settles, then ask for one that fits
+        self.Refresh(eraseBackground=False)
+        if self.resize_call is not None and self.resize_call.IsRunning():
+            self.resize_call.Restart(CHART_RESIZE_DELAY_MS)
+        else:
+            self.resize_call = wx.CallLater(CHART_RESIZE_DELAY_MS, self.on_resize)
+        event.Skip()
+
+class StatsDashboard(wx.Frame):
+    """Cohort statistics, read from the history's incremental rollups.
+
+    Refreshing only folds in the records added since the last refresh,
+    so it stays instant however long the history is.
+    """
+
+    def __init__(self, parent, history):
+        super().__init__(parent, title="Cohort Statistics", size=(760, 520))
+        self.history = history
+        panel = wx.Panel(self)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        self.summary = wx.StaticText(panel, label="")
+        self.summary.SetFont(wx.Font(11, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        sizer.Add(self.summary, 0, wx.ALL, 10)
+        
+        notebook = wx.Notebook(panel)
+        self.category_list = self.make_list(notebook, (("Category", 200), ("Records", 90), ("Share", 70), ("People (latest)", 110)))
+        self.group_list = self.make_list(notebook, (("Group", 220), ("Records", 90), ("Mean BMI", 80), ("Median BMI", 90), ("Std Dev", 70)))
+        self.transition_list = self.make_list(notebook, (("From", 200), ("To", 200), ("Changes", 90)))
+        notebook.AddPage(self.category_list, "Categories")
+        notebook.AddPage(self.group_list, "By Group")
+        notebook.AddPage(self.transition_list, "Category Changes")
+        sizer.Add(notebook, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        
+        refresh_btn = wx.Button(panel, label="Refresh")
+        refresh_btn.Bind(wx.EVT_BUTTON, lambda event: self.refresh())
+        sizer.Add(refresh_btn, 0, wx.ALIGN_RIGHT | wx.ALL, 10)
+        panel.SetSizer(sizer)
+        self.refresh()
+
+    def make_list(self, parent, columns):
+        list_ctrl = wx.ListCtrl(parent, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for col, (title, width) in enumerate(columns):
+            list_ctrl.InsertColumn(col, title, width=width)
+        return list_ctrl
+
+    def fill(self, list_ctrl, rows):
+        list_ctrl.DeleteAllItems()
+        for row in rows:
+            index = list_ctrl.InsertItem(list_ctrl.GetItemCount(), row[0])
+            for col, value in enumerate(row[1:], 1):
+                list_ctrl.SetItem(index, col, value)
+
+    def refresh(self):
+        rollups = self.history.rollups
+        rollups.update()
+        overall = rollups.overall
+        if not overall.count:
+            self.summary.SetLabel("No records yet")
+        else:
+            self.summary.SetLabel(f"{overall.count:,} records, {len(self.history.names):,} people   |   "
+                                  f"BMI mean {overall.mean:.1f}, median {overall.median:.1f}, std dev {overall.std:.1f}")
+        
+        people = dict(rollups.current_category_rows())
+        self.fill(self.category_list, [
+            (label, f"{count:,}", f"{100 * count / overall.count:.1f}%", f"{people.get(label, 0):,}")
+            for label, count in rollups.category_rows()
+        ])
+        groups = []
+        for dimension, title in (('gender', "Gender"), ('activity', "Activity"), ('age_band', "Age")):
+            for label, rollup in rollups.group_rows(dimension):
+                groups.append((f"{title}: {label.split('(')[0].strip()}", f"{rollup.count:,}",
+                               f"{rollup.mean:.1f}", f"{rollup.median:.1f}", f"{rollup.std:.1f}"))
+        self.fill(self.group_list, groups)
+        self.fill(self.transition_list, [(a, b, f"{count:,}") for a, b, count in rollups.transition_rows()])
+
+class DiagnosticsWindow(wx.Frame):
+    """Timing spans and event-loop stalls recorded by bmi.profiling"""
+    COLUMNS = (("Span", 200), ("Kind", 80), ("Count", 60), ("Mean ms", 75), ("p50 ms", 70), ("p95 ms", 70), ("Max ms", 75))
+
+    def __init__(self, parent):
+        super().__init__(parent, title="Diagnostics", size=(720, 460))
+        self.calculator = parent
+        panel = wx.Panel(self)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        self.record_box = wx.CheckBox(panel, label="Record timings (small overhead while on)")
+        self.record_box.SetValue(profiling.RECORDER.enabled)
+        self.record_box.Bind(wx.EVT_CHECKBOX, lambda event: self.calculator.set_profiling(event.IsChecked()))
+        sizer.Add(self.record_box, 0, wx.ALL, 10)
+        self.stall_text = wx.StaticText(panel, label="")
+        sizer.Add(self.stall_text, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        
+        self.span_list = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for col, (title, width) in enumerate(self.COLUMNS):
+            self.span_list.InsertColumn(col, title, width=width)
+        sizer.Add(self.span_list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        
+        button_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        for label, handler in (("Refresh", lambda event: self.refresh()), ("Clear", self.on_clear),
+                               ("Export Chrome Trace...", self.on_export_trace)):
+            button = wx.Button(panel, label=label)
+            button.Bind(wx.EVT_BUTTON, handler)
+            button_sizer.Add(button, 0, wx.LEFT, 5)
+        sizer.Add(button_sizer, 0, wx.ALIGN_RIGHT | wx.ALL, 10)
+        panel.SetSizer(sizer)
+        
+        self.refresh_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda event: self.refresh(), self.refresh_timer)
+        self.refresh_timer.Start(1000)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        self.refresh()
+
+    def refresh(self):
+        watchdog = self.calculator.watchdog
+        self.stall_text.SetLabel(watchdog.summary() if profiling.RECORDER.enabled or watchdog.probes else
+                                 "Recording is off; tick the box above (or start with BMI_PROFILE=1)")
+        self.span_list.DeleteAllItems()
+        for name, kind, count, mean, p50, p95, longest in profiling.RECORDER.summary():
+            index = self.span_list.InsertItem(self.span_list.GetItemCount(), name)
+            for col, value in enumerate((kind, f"{count:,}", f"{mean:.1f}", f"{p50:.1f}", f"{p95:.1f}", f"{longest:.1f}"), 1):
+                self.span_list.SetItem(index, col, value)
+
+    def on_clear(self, event):
+        profiling.RECORDER.clear()
+        self.calculator.watchdog.reset()
+        self.refresh()
+
+    def on_export_trace(self, event):
+        with wx.FileDialog(self, "Save Chrome trace", defaultFile="bmi-trace.json", wildcard="Trace files (*.json)|*.json",
+                           style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dialog:
+            if dialog.ShowModal() == wx.ID_CANCEL: return
+            path = dialog.GetPath()
+        try:
+            profiling.RECORDER.write_chrome_trace(path)
+        except OSError as e:
+            wx.MessageBox(str(e), "Export Error", wx.OK | wx.ICON_ERROR)
+            return
+        wx.MessageBox("Open the file in chrome://tracing or ui.perfetto.dev.", "Trace Saved", wx.OK | wx.ICON_INFORMATION)
+
+    def on_close(self, event):
+        self.refresh_timer.Stop()
+        event.Skip()
+
+class RecordDialog(wx.Dialog):
+    """Correct one history record, in the units it is stored in (cm, kg); `result` holds it re-scored"""
+
+    def __init__(self, parent, entry):
+        super().__init__(parent, title="Edit Record")
+        self.entry = entry
+        self.result = None
+        self.name_ctrl = wx.TextCtrl(self, value=entry['name'])
+        self.age_ctrl = wx.SpinCtrl(self, min=engine.MIN_AGE, max=engine.MAX_AGE, initial=entry['age'])
+        self.gender_choice = wx.Choice(self, choices=list(engine.GENDERS))
+        self.gender_choice.SetStringSelection(entry['gender'])
+        self.activity_choice = wx.Choice(self, choices=list(engine.ACTIVITY_LEVELS))
+        self.activity_choice.SetStringSelection(entry['activity'])
+        self.height_ctrl = wx.SpinCtrlDouble(self, min=engine.MIN_HEIGHT_CM, max=300, initial=entry['height'], inc=0.1)
+        self.weight_ctrl = wx.SpinCtrlDouble(self, min=engine.MIN_WEIGHT_KG, max=500, initial=entry['weight'], inc=0.1)
+        self.height_ctrl.SetDigits(1)
+        self.weight_ctrl.SetDigits(1)
+        
+        fields = wx.FlexGridSizer(cols=2, vgap=5, hgap=10)
+        fields.AddGrowableCol(1)
+        for label, ctrl in (("Name:", self.name_ctrl), ("Age:", self.age_ctrl), ("Gender:", self.gender_choice),
+                            ("Activity Level:", self.activity_choice), ("Height (cm):", self.height_ctrl),
+                            ("Weight (kg):", self.weight_ctrl)):
+            fields.Add(wx.StaticText(self, label=label), 0, wx.ALIGN_CENTER_VERTICAL)
+            fields.Add(ctrl, 1, wx.EXPAND)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(wx.StaticText(self, label=f"Recorded {entry['date']}; BMI and category are recalculated."), 0, wx.ALL, 10)
+        sizer.Add(fields, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.CreateStdDialogButtonSizer(wx.OK | wx.CANCEL), 0, wx.EXPAND | wx.ALL, 10)
+        self.SetSizerAndFit(sizer)
+        self.Bind(wx.EVT_BUTTON, self.on_ok, id=wx.ID_OK)
+
+    def on_ok(self, event):
+        try:
+            self.result = self.corrected()
+        except ValueError as e:
+            wx.MessageBox(str(e), "Input Error", wx.OK | wx.ICON_ERROR, self)
+            return
+        event.Skip()
+
+    def corrected(self):
+        name = self.name_ctrl.GetValue().strip()
+        gender = self.gender_choice.GetStringSelection()
+        activity = self.activity_choice.GetStringSelection()
+        if not name:
+            raise ValueError("Please enter a name.")
+        if not gender or not activity:
+            raise ValueError("Please select a gender and an activity level.")
+        age = self.age_ctrl.GetValue()
+        height, weight = self.height_ctrl.GetValue(), self.weight_ctrl.GetValue()
+        engine.validate_metric(height, weight)
+        result = engine.score(height, weight, age, gender, activity)
+        return {
+            'ts': self.entry['ts'],  # Still the time it was measured
+            'name': name,
+            'age': age,
+            'gender': gender,
+            'activity': activity,
+            'bmi': round(result['bmi'], 1),
+            'category': result['category'],
+            'height': round(height, 1),
+            'weight': round(weight, 1),
+        }
+
+class BMICalculator(wx.Frame):
+    def __init__(self):
+        super().__init__(None, title="BMI Health Assistant", size=(1280, 720))
+        self.SetMinSize(wx.Size(1024, 576))
+        
+        self.dark_mode = False
+        self.history = HistoryStore()
+        # Long sessions keep only recently active people in memory; the rest wait on disk
+        self.history_tiers = HistoryTiers(self.history)
+        self.is_metric = True  # Track current unit system
+        
+        # Persistent history; loaded in the background so launch stays fast
+        self.history_log = HistoryLog()
+        self.history_loading = False
+        self.load_generation = 0
+        self.pending_entries = []  # Calculated while the saved history was loading
+        self.pending_withdrawals = []  # Deleted on other stations while the saved history was loading
+        
+        # Records shared with the other stations, when a sync folder is configured
+        self.replicator = None
+        sync_dir = sync.directory_from_environment()
+        if sync_dir:
+            self.replicator = sync.Replicator(sync.ReplicationLog(sync_dir),
+                                              lambda entries: wx.CallAfter(self.on_remote_entries, entries),
+                                              lambda error: wx.CallAfter(self.on_sync_failed, error),
+                                              withdraw=lambda entries: wx.CallAfter(self.on_remote_withdrawals, entries))
+        # Deletes and edits, for undo/redo; written through to the history file and the other stations
+        self.journal = HistoryJournal(self.history, self.history_log, self.history_tiers,
+                                      replicator=self.replicator)
+        
+        self.stats_window = None
+        self.diagnostics_window = None
+        self.watchdog = profiling.StallWatchdog(wx.CallAfter)
+        self.preview_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_preview_timer, self.preview_timer)
+        
+        self.SetIcon(self.create_icon())
+        self.init_ui()
+        self.apply_theme()
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        if profiling.enabled_from_environment():
+            self.set_profiling(True)
+        self.start_history_load()
+        if self.replicator is not None:
+            self.replicator.start()
+        
+    def create_icon(self):
+        icon = wx.Icon()
+        icon.CopyFromBitmap(self.create_bitmap_icon())
+        return icon
+    
+    def create_bitmap_icon(self):
+        bmp = wx.Bitmap(32, 32)
+        dc = wx.MemoryDC(bmp)
+        dc.SetBackground(wx.Brush(wx.Colour(70, 130, 180)))
+        dc.Clear()
+        dc.SetBrush(wx.Brush(wx.Colour(255, 255, 255)))
+        dc.SetPen(wx.Pen(wx.Colour(255, 255, 255), 2))
+        dc.DrawLine(16, 8, 16, 24)
+        dc.DrawLine(8, 24, 24, 24)
+        dc.DrawLine(8, 24, 12, 28)
+        dc.DrawLine(24, 24, 20, 28)
+        dc.SelectObject(wx.NullBitmap)
+        return bmp
+    
+    def init_ui(self):
+        menubar = wx.MenuBar()
+        
+        file_menu = wx.Menu()
+        import_csv = file_menu.Append(wx.ID_OPEN, "&Import from CSV...\tCtrl+I", "Import records from a CSV file")
+        file_menu.AppendSeparator()
+        export_csv = file_menu.Append(wx.ID_SAVE, "&Export to CSV\tCtrl+S", "Export history to CSV")
+        export_pdf = file_menu.Append(wx.ID_SAVEAS, "&Export to PDF\tCtrl+P", "Export history to PDF")
+        file_menu.AppendSeparator()
+        exit_item = file_menu.Append(wx.ID_EXIT, "&Exit\tCtrl+Q", "Exit application")
+        
+        edit_menu = wx.Menu()
+        undo_item = edit_menu.Append(wx.ID_UNDO, "&Undo\tCtrl+Z", "Undo the last delete or edit")
+        redo_item = edit_menu.Append(wx.ID_REDO, "&Redo\tCtrl+Y", "Redo what was undone")
+        edit_menu.AppendSeparator()
+        edit_record_item = edit_menu.Append(wx.ID_EDIT, "&Edit Record...\tCtrl+E", "Correct the selected history record")
+        delete_record_item = edit_menu.Append(wx.ID_DELETE, "&Delete Records", "Delete the selected history records")
+        
+        view_menu = wx.Menu()
+        self.dark_mode_item = view_menu.Append(wx.ID_ANY, "&Dark Mode\tCtrl+D", "Toggle dark mode", kind=wx.ITEM_CHECK)
+        stats_item = view_menu.Append(wx.ID_ANY, "Cohort &Statistics...\tCtrl+T", "Show statistics for the whole history")
+        
+        help_menu = wx.Menu()
+        tips_item = help_menu.Append(wx.ID_HELP, "&Health Tips", "Show detailed health tips")
+        diagnostics_item = help_menu.Append(wx.ID_ANY, "&Diagnostics...", "Timings and responsiveness")
+        about_item = help_menu.Append(wx.ID_ABOUT, "&About", "About BMI Calculator")
+        
+        menubar.Append(file_menu, "&File")
+        menubar.Append(edit_menu, "&Edit")
+        menubar.Append(view_menu, "&View")
+        menubar.Append(help_menu, "&Help")
+        self.SetMenuBar(menubar)
+        
+        self.Bind(wx.EVT_MENU, self.on_import_csv, import_csv)
+        self.Bind(wx.EVT_MENU, self.on_export_csv, export_csv)
+        self.Bind(wx.EVT_MENU, self.on_export_pdf, export_pdf)
+        self.Bind(wx.EVT_MENU, self.on_exit, exit_item)
+        self.Bind(wx.EVT_MENU, self.toggle_dark_mode, self.dark_mode_item)
+        self.Bind(wx.EVT_MENU, self.on_show_stats, stats_item)
+        self.Bind(wx.EVT_MENU, self.show_health_tips, tips_item)
+        self.Bind(wx.EVT_MENU, self.on_show_diagnostics, diagnostics_item)
+        self.Bind(wx.EVT_MENU, self.on_about, about_item)
+        self.Bind(wx.EVT_MENU, self.on_undo, undo_item)
+        self.Bind(wx.EVT_MENU, self.on_redo, redo_item)
+        self.Bind(wx.EVT_MENU, self.on_edit_record, edit_record_item)
+        self.Bind(wx.EVT_MENU, self.on_delete_records, delete_record_item)
+        self.Bind(wx.EVT_UPDATE_UI, self.on_update_undo, undo_item)
+        self.Bind(wx.EVT_UPDATE_UI, self.on_update_redo, redo_item)
+        self.Bind(wx.EVT_UPDATE_UI, self.on_update_record_items, edit_record_item)
+        self.Bind(wx.EVT_UPDATE_UI, self.on_update_record_items, delete_record_item)
+        
+        main_panel = wx.Panel(self)
+        main_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        
+        # --- LEFT PANEL ---
+        left_panel = wx.Panel(main_panel)
+        left_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        input_box = wx.StaticBox(left_panel, label="Personal Information")
+        input_sizer = wx.StaticBoxSizer(input_box, wx.VERTICAL)
+        
+        # Unit Selection
+        unit_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        unit_sizer.Add(wx.StaticText(left_panel, label="Units:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.unit_choice = wx.RadioBox(left_panel, choices=["Metric (kg/cm)", "Imperial (lbs/ft/in)"], 
+                                      style=wx.RA_SPECIFY_ROWS)
+        self.unit_choice.Bind(wx.EVT_RADIOBOX, self.on_unit_change)
+        unit_sizer.Add(self.unit_choice, 1, wx.EXPAND | wx.ALL, 5)
+        input_sizer.Add(unit_sizer, 0, wx.EXPAND)
+
+        # Name
+        name_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        name_sizer.Add(wx.StaticText(left_panel, label="Full Name:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.name_ctrl = wx.TextCtrl(left_panel, style=wx.TE_PROCESS_ENTER)
+        name_sizer.Add(self.name_ctrl, 1, wx.EXPAND | wx.ALL, 5)
+        input_sizer.Add(name_sizer, 0, wx.EXPAND)
+        
+        # Age and Gender
+        age_gender_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        age_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        age_sizer.Add(wx.StaticText(left_panel, label="Age:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.age_ctrl = wx.SpinCtrl(left_panel, min=1, max=120)
+        self.age_ctrl.SetValue("")
+        age_sizer.Add(self.age_ctrl, 1, wx.EXPAND | wx.ALL, 5)
+        age_gender_sizer.Add(age_sizer, 1, wx.EXPAND)
+        
+        gender_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        gender_sizer.Add(wx.StaticText(left_panel, label="Gender:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.gender_choice = wx.Choice(left_panel, choices=["Select Gender"] + list(engine.GENDERS))
+        self.gender_choice.SetSelection(0)
+        gender_sizer.Add(self.gender_choice, 1, wx.EXPAND | wx.ALL, 5)
+        age_gender_sizer.Add(gender_sizer, 1, wx.EXPAND)
+        input_sizer.Add(age_gender_sizer, 0, wx.EXPAND)
+        
+        # Activity
+        activity_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        activity_sizer.Add(wx.StaticText(left_panel, label="Activity Level:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.activity_choice = wx.Choice(left_panel, choices=["Select Activity Level"] + list(engine.ACTIVITY_LEVELS))
+        self.activity_choice.SetSelection(0)
+        activity_sizer.Add(self.activity_choice, 1, wx.EXPAND | wx.ALL, 5)
+        input_sizer.Add(activity_sizer, 0, wx.EXPAND)
+        
+        # --- HEIGHT INPUT (Metric vs Imperial) ---
+        height_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.height_label = wx.StaticText(left_panel, label="Height (cm):")
+        height_sizer.Add(self.height_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        
+        # Metric Height Control
+        self.height_cm_ctrl = wx.SpinCtrlDouble(left_panel, min=50, max=250, inc=0.1)
+        self.height_cm_ctrl.SetDigits(1)
+        self.height_cm_ctrl.SetValue("")
+        height_sizer.Add(self.height_cm_ctrl, 1, wx.EXPAND | wx.ALL, 5)
+
+        # Imperial Height Controls (Feet & Inches) - Hidden by default
+        self.height_ft_ctrl = wx.SpinCtrl(left_panel, min=1, max=8)
+        self.height_ft_ctrl.SetValue("")
+        self.height_ft_label = wx.StaticText(left_panel, label="ft")
+        
+        self.height_in_ctrl = wx.SpinCtrlDouble(left_panel, min=0, max=11.9, inc=0.5)
+        self.height_in_ctrl.SetDigits(1)
+        self.height_in_ctrl.SetValue("")
+        self.height_in_label = wx.StaticText(left_panel, label="in")
+
+        height_sizer.Add(self.height_ft_ctrl, 1, wx.EXPAND | wx.ALL, 5)
+        height_sizer.Add(self.height_ft_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        height_sizer.Add(self.height_in_ctrl, 1, wx.EXPAND | wx.ALL, 5)
+        height_sizer.Add(self.height_in_label, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        
+        input_sizer.Add(height_sizer, 0, wx.EXPAND)
+        
+        # --- WEIGHT INPUT ---
+        weight_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.weight_label = wx.StaticText(left_panel, label="Weight (kg):")
+        weight_sizer.Add(self.weight_label, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.weight_ctrl = wx.SpinCtrlDouble(left_panel, min=10, max=300, inc=0.1)
+        self.weight_ctrl.SetDigits(1)
+        self.weight_ctrl.SetValue("")
+        weight_sizer.Add(self.weight_ctrl, 1, wx.EXPAND | wx.ALL, 5)
+        input_sizer.Add(weight_sizer, 0, wx.EXPAND)
+        
+        # Live preview: every edit (re)starts the debounce timer
+        for ctrl in (self.age_ctrl, self.height_ft_ctrl):
+            ctrl.Bind(wx.EVT_SPINCTRL, self.on_measurement_changed)
+        for ctrl in (self.height_cm_ctrl, self.height_in_ctrl, self.weight_ctrl):
+            ctrl.Bind(wx.EVT_SPINCTRLDOUBLE, self.on_measurement_changed)
+        for ctrl in (self.age_ctrl, self.height_cm_ctrl, self.height_ft_ctrl, self.height_in_ctrl, self.weight_ctrl):
+            ctrl.Bind(wx.EVT_TEXT, self.on_measurement_changed)
+        self.gender_choice.Bind(wx.EVT_CHOICE, self.on_measurement_changed)
+        self.activity_choice.Bind(wx.EVT_CHOICE, self.on_measurement_changed)
+        
+        left_sizer.Add(input_sizer, 0, wx.EXPAND | wx.ALL, 10)
+        
+        # Buttons
+        button_panel = wx.Panel(left_panel)
+        button_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.calculate_btn = wx.Button(button_panel, label="Calculate BMI")
+        self.calculate_btn.Bind(wx.EVT_BUTTON, self.on_calculate)
+        button_sizer.Add(self.calculate_btn, 1, wx.EXPAND | wx.RIGHT, 5)
+        self.reset_btn = wx.Button(button_panel, label="Reset All")
+        self.reset_btn.Bind(wx.EVT_BUTTON, self.on_reset)
+        button_sizer.Add(self.reset_btn, 1, wx.EXPAND)
+        button_panel.SetSizer(button_sizer)
+        left_sizer.Add(button_panel, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        
+        # Results
+        results_box = wx.StaticBox(left_panel, label="BMI Results")
+        results_sizer = wx.StaticBoxSizer(results_box, wx.VERTICAL)
+        results_grid = wx.GridBagSizer(5, 5)
+        self.bmi_result = wx.StaticText(left_panel, label="--")
+        self.bmi_result.SetFont(wx.Font(28, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD))
+        results_grid.Add(self.bmi_result, pos=(0, 0), span=(1, 2), flag=wx.ALIGN_CENTER | wx.ALL, border=5)
+        self.category_result = wx.StaticText(left_panel, label="Category: --")
+        self.category_result.SetFont(wx.Font(14, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        results_grid.Add(self.category_result, pos=(1, 0), span=(1, 2), flag=wx.ALIGN_CENTER | wx.ALL, border=5)
+        self.ideal_weight_label = wx.StaticText(left_panel, label="Ideal Weight Range: --")
+        self.ideal_weight_label.SetFont(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        results_grid.Add(self.ideal_weight_label, pos=(2, 0), span=(1, 2), flag=wx.ALIGN_CENTER | wx.ALL, border=5)
+        self.metrics_label = wx.StaticText(left_panel, label=METRICS_PLACEHOLDER, style=wx.ALIGN_CENTRE_HORIZONTAL)
+        self.metrics_label.SetFont(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        results_grid.Add(self.metrics_label, pos=(3, 0), span=(1, 2), flag=wx.ALIGN_CENTER | wx.ALL, border=5)
+        results_sizer.Add(results_grid, 0, wx.ALIGN_CENTER | wx.ALL, 10)
+        left_sizer.Add(results_sizer, 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        
+        # Tips
+        tips_box = wx.StaticBox(left_panel, label="Health Tips & Recommendations")
+        tips_sizer = wx.StaticBoxSizer(tips_box, wx.VERTICAL)
+        # One persistent, self-scrolling text view; update_tips_display only swaps its text
+        self.tips_text = wx.TextCtrl(left_panel, value=TIPS_PLACEHOLDER, size=(-1, 250),
+                                     style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_RICH | wx.BORDER_NONE)
+        tips_sizer.Add(self.tips_text, 1, wx.EXPAND | wx.ALL, 5)
+        left_sizer.Add(tips_sizer, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        left_panel.SetSizer(left_sizer)
+        
+        # --- RIGHT PANEL (Charts/History) ---
+        right_panel = wx.Panel(main_panel)
+        right_sizer = wx.BoxSizer(wx.VERTICAL)
+        
+        person_box = wx.StaticBox(right_panel, label="Filter History and Chart")
+        person_sizer = wx.StaticBoxSizer(person_box, wx.VERTICAL)
+        person_row = wx.BoxSizer(wx.HORIZONTAL)
+        person_row.Add(wx.StaticText(right_panel, label="Person:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.person_search = wx.SearchCtrl(right_panel, size=(160, -1))
+        self.person_search.SetDescriptiveText("Find name...")
+        self.person_search.Bind(wx.EVT_TEXT, self.on_person_search)
+        person_row.Add(self.person_search, 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.person_choice = wx.Choice(right_panel, choices=["All Persons"])
+        self.person_choice.SetSelection(0)
+        self.person_choice.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        person_row.Add(self.person_choice, 1, wx.EXPAND | wx.ALL, 5)
+        person_sizer.Add(person_row, 0, wx.EXPAND)
+        
+        filter_row = wx.BoxSizer(wx.HORIZONTAL)
+        filter_row.Add(wx.StaticText(right_panel, label="Category:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.category_filter = wx.Choice(right_panel, choices=list(CATEGORY_FILTERS))
+        self.category_filter.SetSelection(0)
+        self.category_filter.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        filter_row.Add(self.category_filter, 1, wx.EXPAND | wx.ALL, 5)
+        filter_row.Add(wx.StaticText(right_panel, label="Period:"), 0, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
+        self.period_filter = wx.Choice(right_panel, choices=list(PERIOD_FILTERS))
+        self.period_filter.SetSelection(0)
+        self.period_filter.Bind(wx.EVT_CHOICE, self.on_filter_changed)
+        filter_row.Add(self.period_filter, 1, wx.EXPAND | wx.ALL, 5)
+        person_sizer.Add(filter_row, 0, wx.EXPAND)
+        right_sizer.Add(person_sizer, 0, wx.EXPAND | wx.ALL, 10)
+        self.person_list_key = None
+        
+        self.chart_panel = None
+        if MATPLOTLIB_AVAILABLE:
+            # Charts are drawn by a worker thread and shown here as bitmaps
+            chart_box = wx.StaticBox(right_panel, label="Personal BMI Trend")
+            chart_sizer = wx.StaticBoxSizer(chart_box, wx.VERTICAL)
+            self.chart_panel = ChartPanel(right_panel, self.update_chart)
+            chart_sizer.Add(self.chart_panel, 1, wx.EXPAND | wx.ALL, 5)
+            right_sizer.Add(chart_sizer, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+            self.chart_renderer = ChartRenderer(lambda *image: wx.CallAfter(self.on_chart_rendered, *image),
+                                                lambda key, error: wx.CallAfter(self.on_chart_failed, key, error))
+            self.chart_cache = LRUCache(CHART_CACHE_SIZE)
+            self.chart_key = None
+        else:
+            no_chart_label = wx.StaticText(right_panel, label="Install matplotlib for charts")
+            right_sizer.Add(no_chart_label, 0, wx.ALIGN_CENTER | wx.ALL, 20)
+        
+        history_box = wx.StaticBox(right_panel, label="Calculation History")
+        history_sizer = wx.StaticBoxSizer(history_box, wx.VERTICAL)
+        self.history_grid = wx.grid.Grid(right_panel)
+        self.history_table = HistoryTable(self.history)
+        self.history_grid.SetTable(self.history_table, True)
+        self.history_grid.EnableEditing(False)
+        self.history_grid.SetSelectionMode(wx.grid.Grid.SelectRows)
+        self.history_grid.Bind(wx.grid.EVT_GRID_CELL_RIGHT_CLICK, self.on_grid_right_click)
+        self.history_grid.Bind(wx.grid.EVT_GRID_CELL_LEFT_DCLICK, self.on_edit_record)
+        self.history_grid.Bind(wx.EVT_KEY_DOWN, self.on_grid_key)
+        for col, width in enumerate(HistoryTable.COLUMN_WIDTHS):
+            self.history_grid.SetColSize(col, width)
+        history_sizer.Add(self.history_grid, 1, wx.EXPAND | wx.ALL, 5)
+        
+        history_btn_panel = wx.Panel(right_panel)
+        history_btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        clear_btn = wx.Button(history_btn_panel, label="Clear History")
+        clear_btn.Bind(wx.EVT_BUTTON, self.on_clear_history)
+        history_btn_sizer.Add(clear_btn, 0, wx.RIGHT, 5)
+        export_btn = wx.Button(history_btn_panel, label="Export History")
+        export_btn.Bind(wx.EVT_BUTTON, self.on_export_csv)
+        history_btn_sizer.Add(export_btn, 0)
+        history_btn_panel.SetSizer(history_btn_sizer)
+        history_sizer.Add(history_btn_panel, 0, wx.ALIGN_RIGHT | wx.ALL, 5)
+        
+        right_sizer.Add(history_sizer, 1, wx.EXPAND | wx.ALL, 10)
+        right_panel.SetSizer(right_sizer)
+        
+        main_sizer.Add(left_panel, 4, wx.EXPAND | wx.ALL, 5)
+        main_sizer.Add(right_panel, 6, wx.EXPAND | wx.ALL, 5)
+        main_panel.SetSizer(main_sizer)
+        
+        self.CreateStatusBar()
+        self.SetStatusText("Enter your personal information and click Calculate BMI")
+        
+        # Initialize visibility based on default metric selection
+        self.update_unit_ui()
+
+    def on_unit_change(self, event):
+        """Handle unit system switch"""
+        self.is_metric = (self.unit_choice.GetSelection() == 0)
+        self.update_unit_ui()
+        self.Layout()
+        self.preview_timer.StartOnce(PREVIEW_DELAY_MS)
+        
+    def update_unit_ui(self):
+        """Show/Hide controls based on selected unit system"""
+        if self.is_metric:
+            # Show Metric controls
+            self.height_label.SetLabel("Height (cm):")
+            self.height_cm_ctrl.Show()
+            self.height_ft_ctrl.Hide()
+            self.height_ft_label.Hide()
+            self.height_in_ctrl.Hide()
+            self.height_in_label.Hide()
+            
+            self.weight_label.SetLabel("Weight (kg):")
+            self.weight_ctrl.SetRange(10, 300)
+        else:
+            # Show Imperial controls
+            self.height_label.SetLabel("Height:")
+            self.height_cm_ctrl.Hide()
+            self.height_ft_ctrl.Show()
+            self.height_ft_label.Show()
+            self.height_in_ctrl.Show()
+            self.height_in_label.Show()
+            
+            self.weight_label.SetLabel("Weight (lbs):")
+            self.weight_ctrl.SetRange(20, 660) # Approx 300kg in lbs
+            
+    @profiling.timed()
+    def on_calculate(self, event):
+        """Calculate BMI and update results"""
+        try:
+            # Get input values
+            name = self.name_ctrl.GetValue().strip()
+            age_str = self.age_ctrl.GetValue()
+            gender = self.gender_choice.GetStringSelection()
+            activity = self.activity_choice.GetStringSelection()
+            
+            # --- VALIDATION ---
+            if not name:
+                self.name_ctrl.SetFocus()
+                raise ValueError("Please enter your name.")
+            if not age_str:
+                self.age_ctrl.SetFocus()
+                raise ValueError("Please enter your age.")
+            if gender == "Select Gender":
+                self.gender_choice.SetFocus()
+                raise ValueError("Please select your gender.")
+            if activity == "Select Activity Level":
+                self.activity_choice.SetFocus()
+                raise ValueError("Please select your activity level.")
+
+            # --- CONVERSION AND CALCULATION ---
+            # BMI, category and ideal weight range (Metric) come from the shared engine
+            age = int(age_str)
+            height, weight = self.form_measurements()
+            height_cm, weight_kg, result, labels = score_form(height, weight, age, gender, activity, self.is_metric)
+            bmi = result['bmi']
+            category = result['category']
+            
+            # Update results UI
+            self.preview_timer.Stop()
+            self.show_result(labels, bmi)
+            
+            # Generate personalized tips
+            tips = self.get_personalized_tips(bmi, category, age, gender, activity, weight_kg, height_cm)
+            self.update_tips_display(tips)
+            
+            # Add to history (Storing as Metric for consistency in database/charts)
+            history_entry = {
+                'ts': int(datetime.now().timestamp()),
+                'name': name,
+                'age': age,
+                'gender': gender,
+                'activity': activity,
+                'bmi': round(bmi, 1),
+                'category': category,
+                'height': round(height_cm, 1),      # stored as cm
+                'weight': round(weight_kg, 1)       # stored as kg
+            }
+            
+            self.history_log.append(history_entry)
+            if self.replicator is not None:
+                self.replicator.publish([history_entry])
+            if self.history_loading:
+                # Keep history in date order: add it once the saved entries are in
+                self.pending_entries.append(history_entry)
+            else:
+                self.history.append(history_entry)
+                self.refresh_history_views()
+            
+            self.SetStatusText(f"BMI calculated: {bmi:.1f} ({category}) for {name}")
+            
+        except ValueError as e:
+            wx.MessageBox(str(e), "Input Error", wx.OK | wx.ICON_ERROR)
+        except Exception as e:
+            wx.MessageBox(f"Error calculating BMI: {str(e)}", "Error", wx.OK | wx.ICON_ERROR)
+
+    def form_measurements(self):
+        """Height and weight as entered: cm/kg, or total inches/lbs"""
+        if self.is_metric:
+            return self.height_cm_ctrl.GetValue(), self.weight_ctrl.GetValue()
+        return self.height_ft_ctrl.GetValue() * 12 + self.height_in_ctrl.GetValue(), self.weight_ctrl.GetValue()
+
+    def show_result(self, labels, bmi=None):
+        """Fill the result fields; labels=None blanks them"""
+        bmi_text, category_text, ideal_text, metrics_text = labels or (
+            "--", "Category: --", "Ideal Weight Range: --", METRICS_PLACEHOLDER)
+        self.bmi_result.SetLabel(bmi_text)
+        if bmi is not None:
+            self.bmi_result.SetForegroundColour(self.get_bmi_color(bmi))
+        self.category_result.SetLabel(category_text)
+        self.ideal_weight_label.SetLabel(ideal_text)
+        self.metrics_label.SetLabel(metrics_text)
+
+    def on_measurement_changed(self, event):
+        # Restarting the one-shot timer on every edit previews once typing pauses
+        self.preview_timer.StartOnce(PREVIEW_DELAY_MS)
+        event.Skip()
+
+    def on_preview_timer(self, event):
+        """Live preview: only the result fields, nothing is saved"""
+        age = self.age_ctrl.GetValue()
+        gender = self.gender_choice.GetStringSelection()
+        activity = self.activity_choice.GetStringSelection()
+        try:
+            if not age: raise ValueError("no age yet")
+            height, weight = self.form_measurements()
+            _, _, result, labels = score_form(height, weight, int(age), gender if gender in engine.GENDERS else None,
+                                              activity if activity in engine.ACTIVITY_LEVELS else None, self.is_metric)
+        except ValueError:
+            self.show_result(None)
+            return
+        self.show_result(labels, result['bmi'])
+
+    def start_history_load(self):
+        """Read the saved history on a worker thread, one chunk at a time"""
+        self.history_loading = True
+        self.load_generation += 1
+        generation = self.load_generation
+        self.SetStatusText("Loading saved history...")
+        # Calculations made while loading are saved past this point and added from pending_entries
+        stop = self.history_log.size()
+        
+        def worker():
+            try:
+                for chunk in self.history_log.iter_chunks(stop=stop):
+                    wx.CallAfter(self.on_history_chunk, generation, chunk)
+                wx.CallAfter(self.on_history_loaded, generation, None)
+            except Exception as e:
+                wx.CallAfter(self.on_history_loaded, generation, e)
+                return
+            # One-off rewrite of an old-format file, so later loads skip the date parsing
+            if self.history_log.needs_upgrade():
+                try:
+                    self.history_log.upgrade()
+                except OSError:
+                    pass  # Old records stay readable as they are
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_history_chunk(self, generation, chunk):
+        if generation != self.load_generation or not self: return
+        self.history.extend(chunk)
+        self.history_tiers.enforce()
+        self.update_history_grid()
+
+    def on_history_loaded(self, generation, error):
+        if generation != self.load_generation or not self: return
+        self.history_loading = False
+        self.history.extend(self.history_log.cancel_removed(self.pending_entries))
+        self.pending_entries.clear()
+        # Only now: loading sets pending_removals from the file
+        self.journal.withdraw(self.pending_withdrawals)
+        self.pending_withdrawals.clear()
+        self.refresh_history_views()
+        if error is not None:
+            wx.MessageBox(f"Could not load saved history: {error}", "History", wx.OK | wx.ICON_WARNING)
+        self.SetStatusText(f"Loaded {len(self.history_tiers)} saved calculations")
+
+    def on_remote_entries(self, entries):
+        """Records made on other stations: only the new rows go into the history and views"""
+        if not self: return
+        entries = self.history_log.cancel_removed(entries)  # Deleted here earlier
+        if not entries: return
+        if self.history_loading:
+            self.pending_entries.extend(entries)
+            return
+        self.history.extend(entries)
+        self.refresh_history_views()
+        self.SetStatusText(f"Received {len(entries)} calculation(s) from other stations")
+
+    def on_remote_withdrawals(self, entries):
+        """Records deleted (or replaced by an edit) on other stations"""
+        if not self: return
+        if self.history_loading:
+            self.pending_withdrawals.extend(entries)
+            return
+        removed = self.journal.withdraw(entries)
+        if not removed: return
+        self.refresh_history_views()
+        self.SetStatusText(f"{removed} calculation(s) removed on other stations")
+
+    def on_sync_failed(self, error):
+        if not self: return
+        self.SetStatusText(f"Sync failed, will retry: {error}")
+
+    def refresh_history_views(self):
+        """Bring everything that shows the history up to date after it changed"""
+        self.history_tiers.enforce()
+        self.update_person_list()
+        self.update_history_grid()
+        self.update_chart()
+        if self.stats_window:
+            self.stats_window.refresh()
+
+    def on_show_stats(self, event):
+        if self.stats_window:
+            self.stats_window.refresh()
+            self.stats_window.Raise()
+            return
+        self.stats_window = StatsDashboard(self, self.history)
+        self.stats_window.Show()
+
+    def get_bmi_color(self, bmi):
+        return BMI_COLORS[engine.color_band(bmi)]
+
+    def get_bmi_category(self, bmi, age, gender=None):
+        return engine.get_bmi_category(bmi, age, gender)
+
+    def get_personalized_tips(self, bmi, category, age, gender, activity, weight, height):
+        return personalized_tips(category, age, gender, activity)
+
+    @profiling.timed()
+    def update_tips_display(self, tips):
+        if tips == self.tips_text.GetValue(): return
+        self.tips_text.ChangeValue(tips)
+        self.tips_text.ShowPosition(0)
+
+    def update_person_list(self):
+        """Refill the person selector if names were added or the search text changed"""
+        index = self.history.index
+        prefix = self.person_search.GetValue().strip()
+        names = index.names_with_prefix(prefix)
+        key = (index.names_version, prefix)
+        if key == self.person_list_key: return
+        self.person_list_key = key
+        selected = self.person_choice.GetStringSelection()
+        self.person_choice.SetItems(["All Persons"] + names[:PERSON_LIST_LIMIT])
+        if not self.person_choice.SetStringSelection(selected):
+            self.person_choice.SetSelection(0)
+
+    def on_person_search(self, event):
+        selected = self.person_choice.GetStringSelection()
+        self.update_person_list()
+        if self.person_choice.GetStringSelection() != selected:
+            self.on_filter_changed(event)
+
+    def on_filter_changed(self, event):
+        person = self.selected_person()
+        try:
+            if self.history_tiers.select(person):
+                self.refresh_history_views()  # Their older records were paged back in
+                return
+        except OSError as e:
+            self.SetStatusText(f"Could not read older records for {person}: {e}")
+        self.update_history_grid()
+        self.update_chart()
+
+    def selected_person(self):
+        """Name picked in the selector, or None for everyone"""
+        person = self.person_choice.GetStringSelection()
+        return None if person in ("", "All Persons") else person
+
+    @profiling.timed()
+    def update_history_grid(self):
+        """Apply the filters, sync the virtual grid and scroll to the newest row"""
+        category = self.category_filter.GetStringSelection()
+        period = self.period_filter.GetStringSelection()
+        person = self.selected_person()
+        index = self.history.index
+        if person is None and CATEGORY_FILTERS[category] is None and PERIOD_FILTERS[period] is None:
+            index.update()
+            # Records from other stations can be older than the newest one here; deleted rows are skipped
+            view = None if index.time_sorted and not self.history.deleted_count else index.query()
+        else:
+            view = index.query_preset(person, category, period)
+        filtered = view is not None or self.history_table.view is not None
+        self.history_table.view = view
+        self.history_table.sync()
+        if filtered:
+            self.history_grid.ForceRefresh()  # The same row count can still mean different rows
+        rows = self.history_table.GetNumberRows()
+        if rows > 0:
+            self.history_grid.MakeCellVisible(rows - 1, 0)
+
+    @profiling.timed()
+    def update_chart(self):
+        """Show the chart for the current filters; anything not cached is rendered on the chart worker"""
+        if self.chart_panel is None: return
+        width, height = self.chart_panel.GetClientSize()
+        if width < 50 or height < 50: return  # Not laid out yet
+        rows = self.history_table.view  # Same filtered rows as the grid
+        person = self.selected_person()
+        category = self.category_filter.GetStringSelection()
+        period = self.period_filter.GetStringSelection()
+        # The row count catches records ageing out of a period filter
+        key = (person, category, period, self.history.version, None if rows is None else len(rows), width, height)
+        self.chart_key = key
+        bitmap = self.chart_cache.get(key)
+        if bitmap is not None:
+            self.chart_panel.show(bitmap)
+            return
+        
+        timestamps = self.history.column('ts')
+        bmis = self.history.column('bmi')
+        if rows is not None:
+            timestamps, bmis = timestamps[rows], bmis[rows]
+        else:
+            timestamps, bmis = timestamps.copy(), bmis.copy()  # The worker must not see later edits
+        title = f"BMI Trend - {person or 'All Persons'}"
+        if person is None and self.history_tiers.cold_rows:
+            title += " (recently active)"
+        if CATEGORY_FILTERS[category] is not None:
+            title += f", {category}"
+        if PERIOD_FILTERS[period] is not None:
+            title += f", {period}"
+        self.chart_renderer.submit(key, timestamps, bmis, title, width, height)
+
+    def on_chart_rendered(self, key, width, height, rgba):
+        if not self: return  # Closed while the chart was drawing
+        bitmap = wx.Bitmap.FromBufferRGBA(width, height, rgba)
+        self.chart_cache.put(key, bitmap)
+        if key == self.chart_key:
+            self.chart_panel.show(bitmap)
+
+    def on_chart_failed(self, key, error):
+        if not self or key != self.chart_key: return
+        self.SetStatusText(f"Could not draw the chart: {error}")
+
+    def on_reset(self, event):
+        self.name_ctrl.Clear()
+        self.age_ctrl.SetValue("")
+        self.gender_choice.SetSelection(0)
+        self.activity_choice.SetSelection(0)
+        self.height_cm_ctrl.SetValue("")
+        self.height_ft_ctrl.SetValue("")
+        self.height_in_ctrl.SetValue("")
+        self.weight_ctrl.SetValue("")
+        self.preview_timer.Stop()
+        self.show_result(None)
+        self.update_tips_display(TIPS_PLACEHOLDER)
+
+    def on_import_csv(self, event):
+        if self.history_loading:
+            wx.MessageBox("Please wait until the saved history has finished loading.", "Import", wx.OK | wx.ICON_INFORMATION)
+            return
+        wildcard = "CSV files (*.csv;*.csv.gz)|*.csv;*.csv.gz|All files (*.*)|*.*"
+        with wx.FileDialog(self, "Import CSV file", wildcard=wildcard, style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as dialog:
+            if dialog.ShowModal() == wx.ID_CANCEL: return
+            path = dialog.GetPath()
+        stats = ImportStats()
+        
+        def job(progress):
+            # Parse and score everything first so a cancelled import leaves no trace
+            batches = list(iter_batches(path, stats, progress=progress))
+            for batch in batches:
+                self.history_log.append_columns(batch)
+                if self.replicator is not None:
+                    self.replicator.publish_columns(batch)
+            return batches
+        
+        def on_success(batches):
+            # One bulk insert and a single UI refresh for the whole file
+            for batch in batches:
+                self.history.extend_columns(batch)
+            self.refresh_history_views()
+            self.SetStatusText(stats.summary())
+            details = "".join(f"\nLine {line}: {reason}" for line, reason in stats.errors[:10])
+            if stats.rejected > len(stats.errors[:10]):
+                details += "\n..."
+            wx.MessageBox(stats.summary() + details, "Import", wx.OK | wx.ICON_INFORMATION)
+        
+        self.run_background("Importing CSV", job, unit="bytes", on_success=on_success, error_title="Import Error")
+
+    def on_export_csv(self, event):
+        if not self.history_tiers:
+            wx.MessageBox("No data to export.", "Export", wx.OK | wx.ICON_WARNING)
+            return
+        wildcard = "CSV files (*.csv)|*.csv|Compressed CSV files (*.csv.gz)|*.csv.gz"
+        with wx.FileDialog(self, "Save CSV file", wildcard=wildcard, style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dialog:
+            if dialog.ShowModal() == wx.ID_CANCEL: return
+            path = dialog.GetPath()
+            if dialog.GetFilterIndex() == 1 and not path.endswith('.gz'):
+                path += '.gz'
+        snapshot, cold = self.history.snapshot(), self.history_tiers.cold_parts()
+        self.run_background("Exporting CSV", lambda progress: export_csv(merge_cold(snapshot, cold), path, progress=progress))
+
+    def run_background(self, title, job, unit="rows", on_success=None, error_title="Export Error"):
+        """Run job(progress) on a worker thread behind a cancellable progress dialog.
+        
+        on_success(result) runs on the GUI thread once the job has finished.
+        """
+        dialog = wx.ProgressDialog(title, "Preparing...", maximum=1000, parent=self,
+                                   style=wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME)
+        cancelled = threading.Event()
+        
+        def on_progress(done, total):
+            if not dialog or cancelled.is_set(): return
+            keep_going, _ = dialog.Update(min(999, int(1000 * done / max(total, 1))), f"{done:,} of {total:,} {unit}")
+            if not keep_going:
+                cancelled.set()
+        
+        def on_finished(result, error):
+            dialog.Destroy()
+            if isinstance(error, (ExportCancelled, ImportCancelled)):
+                self.SetStatusText(f"{title} cancelled")
+            elif error is not None:
+                wx.MessageBox(str(error), error_title, wx.OK | wx.ICON_ERROR)
+            elif on_success is not None:
+                on_success(result)
+            else:
+                wx.MessageBox("Export Successful", "Success", wx.OK | wx.ICON_INFORMATION)
+        
+        def progress(done, total):
+            wx.CallAfter(on_progress, done, total)
+            return not cancelled.is_set()
+        
+        def worker():
+            result = error = None
+            try:
+                with profiling.span(title, "background"):
+                    result = job(progress)
+            except Exception as e:
+                error = e
+            wx.CallAfter(on_finished, result, error)
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_export_pdf(self, event):
+        if not MATPLOTLIB_AVAILABLE:
+            wx.MessageBox("Install matplotlib to export PDF reports.", "Export", wx.OK | wx.ICON_WARNING)
+            return
+        if not self.history_tiers:
+            wx.MessageBox("No data to export.", "Export", wx.OK | wx.ICON_WARNING)
+            return
+        with wx.FileDialog(self, "Save PDF report", wildcard="PDF files (*.pdf)|*.pdf", style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT) as dialog:
+            if dialog.ShowModal() == wx.ID_CANCEL: return
+            path = dialog.GetPath()
+        snapshot, cold = self.history.snapshot(), self.history_tiers.cold_parts()
+        self.run_background("Exporting PDF report", lambda progress: write_pdf_report(merge_cold(snapshot, cold), path, progress=progress), unit="pages")
+
+    def on_clear_history(self, event):
+        if wx.MessageBox("Clear history?", "Confirm", wx.YES_NO) == wx.YES:
+            self.load_generation += 1  # Drop chunks from an unfinished load
+            self.history_loading = False
+            self.pending_entries.clear()
+            self.pending_withdrawals.clear()
+            self.history_log.clear()
+            self.history.clear()
+            self.history_tiers.clear()
+            self.journal.clear()
+            self.refresh_history_views()
+
+    def selected_history_entries(self):
+        """Records in the grid's selected rows (or the cursor's row), as entry dicts"""
+        grid = self.history_grid
+        count = self.history_table.GetNumberRows()
+        rows = grid.GetSelectedRows() or [grid.GetGridCursorRow()]
+        return [self.history.entry(self.history_table.store_row(row)) for row in rows if 0 <= row < count]
+
+    def on_grid_right_click(self, event):
+        row = event.GetRow()
+        if row not in self.history_grid.GetSelectedRows():
+            self.history_grid.SetGridCursor(row, event.GetCol())
+            self.history_grid.SelectRow(row)
+        menu = wx.Menu()
+        menu.Append(wx.ID_EDIT, "&Edit Record...")
+        menu.Append(wx.ID_DELETE, "&Delete Records")
+        menu.Enable(wx.ID_EDIT, len(self.history_grid.GetSelectedRows()) <= 1)
+        self.PopupMenu(menu)
+        menu.Destroy()
+
+    def on_grid_key(self, event):
+        if event.GetKeyCode() in (wx.WXK_DELETE, wx.WXK_NUMPAD_DELETE):
+            self.on_delete_records(event)
+        else:
+            event.Skip()
+
+    def on_update_record_items(self, event):
+        event.Enable(not self.history_loading and self.history_table.GetNumberRows() > 0)
+
+    def on_update_undo(self, event):
+        can_undo = not self.history_loading and self.journal.can_undo
+        event.Enable(can_undo)
+        event.SetText(f"&Undo {describe(self.journal.undo_stack[-1])}\tCtrl+Z" if can_undo else "&Undo\tCtrl+Z")
+
+    def on_update_redo(self, event):
+        can_redo = not self.history_loading and self.journal.can_redo
+        event.Enable(can_redo)
+        event.SetText(f"&Redo {describe(self.journal.redo_stack[-1])}\tCtrl+Y" if can_redo else "&Redo\tCtrl+Y")
+
+    def on_edit_record(self, event):
+        # Not while loading: the loader is still reading the file the change is written to
+        if self.history_loading: return
+        entries = self.selected_history_entries()
+        if not entries: return
+        entry = entries[0]
+        with RecordDialog(self, entry) as dialog:
+            if dialog.ShowModal() != wx.ID_OK: return
+            corrected = dialog.result
+        if entry_key(corrected) == entry_key(entry): return
+        self.change_history(lambda: self.journal.edit(entry, corrected), "Edit",
+                            f"Updated the record for {corrected['name']}")
+
+    def on_delete_records(self, event):
+        if self.history_loading: return
+        entries = self.selected_history_entries()
+        if not entries: return
+        self.change_history(lambda: self.journal.delete(entries), "Delete",
+                            f"Deleted {len(entries)} record(s); Ctrl+Z brings them back")
+
+    def on_undo(self, event):
+        if self.history_loading or not self.journal.can_undo: return
+        self.change_history(lambda: f"Undid: {describe(self.journal.undo())}", "Undo")
+
+    def on_redo(self, event):
+        if self.history_loading or not self.journal.can_redo: return
+        self.change_history(lambda: f"Redid: {describe(self.journal.redo())}", "Redo")
+
+    def change_history(self, change, title, status=None):
+        """Run a journal operation, then refresh the views; `change` may return the status text"""
+        try:
+            status = change() or status
+        except LookupError as e:
+            wx.MessageBox(str(e), title, wx.OK | wx.ICON_WARNING)
+            return
+        except OSError as e:
+            wx.MessageBox(f"Could not apply the change: {e}", title, wx.OK | wx.ICON_ERROR)
+            return
+        self.history_grid.ClearSelection()
+        self.refresh_history_views()
+        if status:
+            self.SetStatusText(status)
+
+    def show_health_tips(self, event):
+        wx.MessageBox("Detailed health tips are available in the main window after calculation.", "Health Tips")
+
+    def toggle_dark_mode(self, event):
+        self.dark_mode = not self.dark_mode
+        self.apply_theme()
+
+    def apply_theme(self):
+        if self.dark_mode:
+            bg_color = wx.Colour(75, 75, 75)
+            fg_color = wx.Colour(250, 250, 250)
+        else:
+            bg_color = wx.SystemSettings.GetColour(wx.SYS_COLOUR_WINDOW)
+            fg_color = wx.SystemSettings.GetColour(wx.SYS_COLOUR_WINDOWTEXT)
+        self.SetBackgroundColour(bg_color)
+        self.SetForegroundColour(fg_color)
+        self.Refresh()
+
+    def set_profiling(self, enabled):
+        """Turn timing spans and the stall watchdog on or off"""
+        profiling.RECORDER.enabled = enabled
+        if enabled:
+            self.watchdog.start()
+        else:
+            self.watchdog.stop()
+        if self.diagnostics_window:
+            self.diagnostics_window.record_box.SetValue(enabled)
+
+    def on_show_diagnostics(self, event):
+        if self.diagnostics_window:
+            self.diagnostics_window.Raise()
+            return
+        self.diagnostics_window = DiagnosticsWindow(self)
+        self.diagnostics_window.Show()
+
+    def on_about(self, event):
+        """Show about dialog"""
+        import wx.adv
+        info = wx.adv.AboutDialogInfo()
+        info.SetName("BMI Health Assistant")
+        info.SetVersion("2.0")
+        info.SetDescription("A comprehensive BMI calculator with metric/imperial unit support,\npersonalized health tips, activity tracking, and individual trend analysis.")
+        info.SetCopyright("@ 2025")
+        info.SetWebSite("https://github.com/karthikkr-237/PYTHON-JACKFRUIT-PROBLEM/blob/main/README.md")
+        wx.adv.AboutBox(info)
+
+    def on_exit(self, event):
+        self.Close()
+
+    def on_close(self, event):
+        self.preview_timer.Stop()
+        self.watchdog.stop()
+        if self.chart_panel is not None:
+            self.chart_renderer.close()
+        self.history_log.close()
+        self.history_tiers.close()
+        if self.replicator is not None:
+            self.replicator.close()
+        event.Skip()
+
+def main():
+    app = wx.App(False)
+    frame = BMICalculator()
+    frame.Show()
+    app.MainLoop()
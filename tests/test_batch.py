@@ -0,0 +1,71 @@
+import pytest
+
+from bmi import batch
+from bmi.batch import score_file, shard_ranges
+from bmi.importer import CsvImportError
+
+
+def test_shards_end_on_line_boundaries():
+    data = b"head\n" + b"".join(b"row %d\n" % i for i in range(100))
+    ranges = shard_ranges(data, 5, 7)
+    assert ranges[0][0] == 5 and ranges[-1][1] == len(data)
+    assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+    assert all(data[stop - 1:stop] == b"\n" for _, stop in ranges)
+    # More shards than lines still covers everything once
+    assert shard_ranges(b"h\na\nb\n", 2, 10) == [(2, 4), (4, 6)]
+
+
+def write_input(tmp_path):
+    rows = []
+    for i in range(600):
+        if i % 97 == 5:
+            rows.append(f"P{i},{20 + i % 50},F,Sedentary,170,2\n")  # weight out of range
+        else:
+            rows.append(f"P{i % 13},{5 + i % 70},{'MF'[i % 2]},Moderately,{150 + i % 40},{45 + i % 50},"
+                        f"2024-01-{1 + i % 28:02d} 10:00\n")
+    path = tmp_path / "in.csv"
+    path.write_text("name,age,gender,activity,height_cm,weight_kg,date\n" + "".join(rows))
+    return str(path)
+
+
+def test_many_shards_match_one(tmp_path, monkeypatch):
+    path = write_input(tmp_path)
+    single = score_file(path, str(tmp_path / "one.csv"), workers=1)
+    monkeypatch.setattr(batch, 'MIN_SHARD_BYTES', 1000)
+    progress = []
+    sharded = score_file(path, str(tmp_path / "many.csv"), workers=3,
+                         progress=lambda done, total: progress.append(total))
+    assert progress[0] > 1
+    assert (tmp_path / "one.csv").read_bytes() == (tmp_path / "many.csv").read_bytes()
+    assert (sharded.rows, sharded.imported, sharded.rejected) == (single.rows, single.imported, single.rejected)
+    # Line numbers are those of the whole file, whichever shard the row was in
+    assert [line for line, _ in sharded.errors] == [line for line, _ in single.errors] == \
+        [i + 2 for i in range(600) if i % 97 == 5]
+    assert sharded.bmi_mean == pytest.approx(single.bmi_mean)
+    assert sharded.bmi_std == pytest.approx(single.bmi_std)
+    assert sharded.categories == single.categories
+    assert not list(tmp_path.glob("*.part*"))
+
+
+def test_output_has_the_export_layout(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text("name,age,gender,activity,height_cm,weight_kg,date\nAnn,34,F,Sedentary,165,61.5,2024-03-01 09:15\n")
+    stats = score_file(str(path), str(tmp_path / "out.csv"), workers=1)
+    assert stats.imported == 1
+    lines = (tmp_path / "out.csv").read_text().splitlines()
+    assert lines[0] == "date,name,age,gender,activity,height_cm,weight_kg,bmi,category," \
+                       "bmi_prime,body_fat_pct,bmr_kcal,tdee_kcal"
+    assert lines[1] == "2024-03-01 09:15,Ann,34,Female,Sedentary (little or no exercise),165.0,61.5,22.6,Normal Weight," \
+                       "0.90,29.5,1315,1578"
+
+
+def test_unsplittable_input(tmp_path):
+    with pytest.raises(CsvImportError, match="decompress"):
+        score_file(str(tmp_path / "in.csv.gz"), str(tmp_path / "out.csv"))
+    (tmp_path / "empty.csv").write_bytes(b"")
+    with pytest.raises(CsvImportError, match="empty"):
+        score_file(str(tmp_path / "empty.csv"), str(tmp_path / "out.csv"))
+    (tmp_path / "bad.csv").write_text("name,age\nAnn,3\n")
+    with pytest.raises(CsvImportError, match="Missing"):
+        score_file(str(tmp_path / "bad.csv"), str(tmp_path / "out.csv"))
+    assert not (tmp_path / "out.csv").exists()
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from bmi.chart import ChartRenderer, LRUCache, downsample_minmax
+
+
+def test_short_series_is_not_downsampled():
+    x = np.arange(10.0)
+    y = x * 2
+    out_x, out_y = downsample_minmax(x, y, 5)
+    assert out_x is x and out_y is y
+
+
+def test_downsampling_keeps_spikes_and_ends():
+    x = np.arange(1001.0)
+    y = np.full(1001, 25.0)
+    y[317] = 60.0
+    y[682] = 12.0
+    out_x, out_y = downsample_minmax(x, y, 50)
+    assert len(out_x) <= 2 * 50 + 4
+    assert {0.0, 317.0, 682.0, 1000.0} <= set(out_x.tolist())
+    assert out_y.max() == 60.0 and out_y.min() == 12.0
+    assert np.all(np.diff(out_x) > 0)
+
+
+def test_lru_cache_drops_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert list(cache.items) == ["a", "c"]
+
+
+def test_renderer_draws_the_newest_request():
+    pytest.importorskip("matplotlib")
+    delivered = []
+    renderer = ChartRenderer(lambda key, width, height, rgba: delivered.append((key, width, height, len(rgba))))
+    started = threading.Event()
+    release = threading.Event()
+    render = renderer.render
+
+    def slow_render(*args):
+        started.set()
+        release.wait(5)
+        return render(*args)
+
+    renderer.render = slow_render
+    ts = np.arange(0, 50 * 86400, 86400, dtype=np.int64) + 1700000000
+    renderer.submit("first", ts, np.linspace(20, 30, 50), "Ann", 300, 200)
+    assert started.wait(5)
+    # While the first one draws, later submits replace each other
+    for i in range(10):
+        renderer.submit(f"update {i}", ts, np.linspace(20, 30, 50), "Ann", 320, 240)
+    release.set()
+    deadline = time.monotonic() + 10
+    while len(delivered) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    renderer.close()
+    assert delivered == [("first", 300, 200, 300 * 200 * 4), ("update 9", 320, 240, 320 * 240 * 4)]
+
+
+def test_a_failed_render_is_reported_and_the_next_one_draws(capsys):
+    pytest.importorskip("matplotlib")
+    delivered, failures = [], []
+    done = threading.Event()
+    renderer = ChartRenderer(lambda key, width, height, rgba: (delivered.append(key), done.set()),
+                             lambda key, error: failures.append((key, type(error))))
+    ts = np.arange(0, 5 * 86400, 86400, dtype=np.int64) + 1700000000
+    # Mismatched lengths can't be plotted
+    renderer.submit("broken", ts, np.linspace(20, 30, 3), "Ann", 300, 200)
+    deadline = time.monotonic() + 10
+    while not failures and time.monotonic() < deadline:
+        time.sleep(0.01)
+    renderer.submit("fixed", ts, np.linspace(20, 30, 5), "Ann", 300, 200)
+    assert done.wait(10)
+    renderer.close()
+    assert failures == [("broken", ValueError)]
+    assert delivered == ["fixed"]
+    assert capsys.readouterr().err == ""
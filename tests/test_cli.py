@@ -0,0 +1,93 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bmi.cli import main
+
+CSV = """name,age,gender,activity,height_cm,weight_kg,date
+Ann,34,F,Sedentary,165,61.5,2024-03-01 09:15
+Ann,35,F,Sedentary,165,70.0,2024-09-01 09:15
+Ben,52,M,Sedentary,181,97.2,2024-03-02 10:00
+"""
+
+
+@pytest.fixture
+def history(tmp_path, capsys):
+    """A history file holding CSV, imported through the command line"""
+    source = tmp_path / "people.csv"
+    source.write_text(CSV, encoding='utf-8')
+    path = str(tmp_path / "history.txt")
+    assert main(['import', str(source), '--history', path]) == 0
+    capsys.readouterr()
+    return path
+
+
+def test_compute_metric(capsys):
+    assert main(['compute', '--height', '180', '--weight', '81', '--age', '40']) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "BMI: 25.0", "Category: Overweight", "Ideal Weight Range: 59.9 - 80.7 kg", "BMI Prime: 1.00",
+        "Body Fat (estimate): 28.4%", "BMR: 1657 kcal/day"]
+    assert main(['compute', '--height', '180', '--weight', '81', '--age', '40', '--gender', 'male',
+                 '--activity', 'Moderately']) == 0
+    out = capsys.readouterr().out
+    assert "BMR: 1740 kcal/day" in out
+    assert "TDEE: 2697 kcal/day" in out
+
+
+def test_compute_imperial(capsys):
+    assert main(['compute', '--units', 'imperial', '--height', '70', '--weight', '154', '--age', '40']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "BMI: 22.1"
+    assert lines[2].endswith(" lbs")
+
+
+def test_compute_rejects_what_the_form_rejects(capsys):
+    assert main(['compute', '--height', '40', '--weight', '70', '--age', '30']) == 2
+    assert capsys.readouterr().err == "error: Height must be at least 50cm\n"
+
+
+def test_stats(history, capsys):
+    assert main(['stats', '--history', history]) == 0
+    out = capsys.readouterr().out
+    assert "Records: 3" in out
+    assert "People: 2" in out
+    assert "From 2024-03-01 09:15 to 2024-09-01 09:15" in out
+    assert main(['stats', '--person', 'Ann', '--history', history]) == 0
+    out = capsys.readouterr().out
+    assert "Records: 2" in out and "People" not in out
+    assert "BMI: mean 24.2, min 22.6, max 25.7" in out
+
+
+def test_export_csv(history, tmp_path, capsys):
+    output = str(tmp_path / "out.csv")
+    assert main(['export', output, '--history', history]) == 0
+    assert capsys.readouterr().out == f"Wrote 3 rows to {output}\n"
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert [row[1] for row in rows[1:]] == ["Ann", "Ann", "Ben"]
+
+
+def test_export_of_nothing(tmp_path, capsys):
+    assert main(['export', str(tmp_path / "out.csv"), '--history', str(tmp_path / "none.txt")]) == 1
+    assert "No data" in capsys.readouterr().err
+
+
+def test_age_outside_the_form_range_is_a_usage_error(capsys):
+    for bad in ('0', '150', 'old'):
+        with pytest.raises(SystemExit) as exit:
+            main(['compute', '--height', '170', '--weight', '65', '--age', bad])
+        assert exit.value.code == 2
+        assert "must be a whole number from 1 to 120" in capsys.readouterr().err
+
+
+def test_launcher_pdf_export_in_spawned_workers(history, tmp_path):
+    # The report's pool spawns workers that run the launcher again; they must not reach wx
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "BMI Project.py")
+    output = tmp_path / "report.pdf"
+    result = subprocess.run([sys.executable, script, 'export', str(output), '--history', history],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert output.read_bytes().startswith(b"%PDF")
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from bmi import engine
+
+
+def test_bmi_and_ideal_range():
+    assert engine.compute_bmi(180, 81) == pytest.approx(25.0)
+    low, high = engine.ideal_weight_range(200)
+    assert (low, high) == pytest.approx((74.0, 99.6))
+
+
+def test_imperial_conversion():
+    height, weight = engine.imperial_to_metric(70, 154)
+    assert height == pytest.approx(177.8)
+    assert weight == pytest.approx(69.853168)
+
+
+@pytest.mark.parametrize('bmi, age, label', [
+    (15.9, 30, "Severely Underweight"),
+    (16.0, 30, "Underweight"),
+    (18.5, 30, "Normal Weight"),
+    (24.99, 30, "Normal Weight"),
+    (25.0, 30, "Overweight"),
+    (30.0, 30, "Obesity Class I"),
+    (35.0, 30, "Obesity Class II"),
+    (40.0, 18, "Obesity Class III"),
+])
+def test_adult_categories(bmi, age, label):
+    assert engine.get_bmi_category(bmi, age) == label
+
+
+def test_metric_validation():
+    engine.validate_metric(50, 10)
+    with pytest.raises(ValueError, match="50cm"):
+        engine.validate_metric(49.9, 70)
+    with pytest.raises(ValueError, match="10kg"):
+        engine.validate_metric(170, 9.9)
+
+
+def test_imperial_validation():
+    engine.validate_imperial(20, 20)
+    with pytest.raises(ValueError, match="Height"):
+        engine.validate_imperial(19, 150)
+    with pytest.raises(ValueError, match="20lbs"):
+        engine.validate_imperial(65, 19)
+
+
+def test_batch_matches_scalar():
+    rng = np.random.default_rng(7)
+    heights = rng.uniform(50, 210, 500)
+    weights = rng.uniform(10, 200, 500)
+    ages = rng.integers(2, 90, 500)
+    genders = rng.choice(engine.GENDERS, 500)
+    # Values right on the thresholds, where rounding differences would show
+    heights[:6] = 100.0
+    weights[:6] = engine.ADULT_THRESHOLDS
+    batch = engine.score_batch(heights, weights, ages, engine.gender_codes(genders))
+    for i in range(len(heights)):
+        one = engine.score(heights[i], weights[i], ages[i], genders[i])
+        assert batch['bmi'][i] == one['bmi']
+        assert batch['category_code'][i] == one['category_code']
+        assert batch['ideal_min_kg'][i] == one['ideal_min_kg']
+        assert batch['ideal_max_kg'][i] == one['ideal_max_kg']
+        if one['percentile'] is None:
+            assert np.isnan(batch['percentile'][i])
+        else:
+            assert batch['percentile'][i] == pytest.approx(one['percentile'])
+
+
+def test_color_bands_match_scalar():
+    values = [10, 18.4, 18.5, 24.9, 25, 29.9, 30, 50]
+    assert engine.color_bands(values).tolist() == [engine.color_band(value) for value in values]
+    assert engine.color_bands(values).tolist() == [0, 0, 1, 1, 2, 2, 3, 3]
+
+
+def test_non_finite_inputs_are_rejected():
+    for bad in (math.nan, math.inf, -math.inf):
+        with pytest.raises(ValueError, match="numbers"):
+            engine.validate_metric(bad, 70)
+        with pytest.raises(ValueError, match="numbers"):
+            engine.validate_imperial(65, bad)
@@ -0,0 +1,95 @@
+import csv
+import gzip
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from bmi import engine
+from bmi.export import ExportCancelled, export_csv
+from bmi.history import HistoryStore, format_dates, format_minute, parse_dates
+
+START = int(datetime(2024, 5, 6, 7, 8).timestamp())
+
+
+def make_snapshot(rows):
+    store = HistoryStore()
+    for i in range(rows):
+        store.append({'ts': START + 60 * i, 'name': f"P{i % 3}", 'age': 20 + i % 50, 'gender': "Female",
+                      'activity': "Sedentary (little or no exercise)", 'height': 160.0 + i % 7,
+                      'weight': 55.25 + i % 11, 'bmi': 21.4, 'category': "Normal Weight"})
+    return store.snapshot()
+
+
+def read_rows(f):
+    return list(csv.reader(f))
+
+
+def test_csv_layout(tmp_path):
+    path = str(tmp_path / "out.csv")
+    assert export_csv(make_snapshot(3), path) == 3
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = read_rows(f)
+    assert rows[0] == ['date', 'name', 'age', 'gender', 'activity', 'height_cm', 'weight_kg', 'bmi', 'category',
+                       'bmi_prime', 'body_fat_pct', 'bmr_kcal', 'tdee_kcal']
+    # BMR 10 * 55.2 + 6.25 * 160 - 5 * 20 - 161 = 1291, TDEE 1291 * 1.2 (sedentary)
+    assert rows[1] == ["2024-05-06 07:08", "P0", "20", "Female", "Sedentary (little or no exercise)",
+                       "160.0", "55.2", "21.4", "Normal Weight", "0.86", "25.1", "1291", "1549"]
+    assert rows[3][:3] == ["2024-05-06 07:10", "P2", "22"]
+
+
+def test_estimates_match_the_engine(tmp_path):
+    path = str(tmp_path / "out.csv")
+    export_csv(make_snapshot(1), path)
+    with open(path, newline='', encoding='utf-8') as f:
+        row = dict(zip(*read_rows(f)))
+    # The stored BMI is rounded to 21.4; the estimates use the BMI of 160 cm and 55.2 kg itself
+    result = engine.score(160.0, 55.2, 20, "Female", engine.ACTIVITY_LEVELS[0])
+    assert row['bmi_prime'] == f"{result['bmi_prime']:.2f}"
+    assert row['body_fat_pct'] == f"{result['body_fat']:.1f}"
+    assert row['bmr_kcal'] == f"{result['bmr']:.0f}"
+
+
+def test_gzip_output_in_chunks(tmp_path):
+    path = str(tmp_path / "out.csv.gz")
+    calls = []
+    assert export_csv(make_snapshot(25), path, progress=lambda done, total: calls.append((done, total)),
+                      chunk_rows=10) == 25
+    assert calls == [(10, 25), (20, 25), (25, 25)]
+    with gzip.open(path, 'rt', newline='', encoding='utf-8') as f:
+        rows = read_rows(f)
+    assert len(rows) == 26
+    assert rows[-1][1] == "P0"
+
+
+def test_cancel_removes_the_partial_file(tmp_path):
+    path = tmp_path / "out.csv"
+    with pytest.raises(ExportCancelled):
+        export_csv(make_snapshot(25), str(path), progress=lambda done, total: done < 10, chunk_rows=10)
+    assert not path.exists()
+
+
+def test_snapshot_is_independent_of_the_store():
+    store = HistoryStore()
+    store.append({'ts': START, 'name': "A", 'age': 30, 'gender': "Male", 'activity': "Sedentary (little or no exercise)",
+                  'height': 170.0, 'weight': 70.0, 'bmi': 24.2, 'category': "Normal Weight"})
+    snap = store.snapshot()
+    store.append(store.entry(0))
+    assert len(snap['ts']) == 1
+    assert snap['vocab']['name'] == ("A",)
+
+
+def test_parse_dates_inverts_format_dates():
+    ts = np.arange(START, START + 366 * 86400, 86400 * 5 + 1260)
+    assert parse_dates(format_dates(ts)).tolist() == ts.tolist()
+    assert format_minute(START // 60) == "2024-05-06 07:08"
+    with pytest.raises(ValueError):
+        parse_dates(["2024-05-06 07:08", "soon"])
+
+
+def test_format_dates_matches_strftime():
+    # Across a year, so daylight saving changes are included where the local zone has them
+    ts = np.arange(START, START + 366 * 86400, 86400 * 7 + 3599)
+    expected = [datetime.fromtimestamp(int(value)).strftime("%Y-%m-%d %H:%M") for value in ts]
+    assert format_dates(ts).tolist() == expected
+    assert format_dates([]).tolist() == []
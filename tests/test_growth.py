@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from bmi import engine, growth
+
+
+def test_cutoffs_sit_on_their_percentiles():
+    for age, gender in [(2, "Male"), (10, "Female"), (17, "Male")]:
+        limits = growth.cutoffs(age, gender)
+        assert [round(growth.percentile(bmi, age, gender), 3) for bmi in limits] == [5, 85, 95]
+
+
+def test_boys_and_girls_differ_and_other_is_between():
+    boys, girls, other = (growth.cutoffs(10, gender) for gender in ("Male", "Female", "Other"))
+    assert boys != girls
+    for b, g, o in zip(boys, girls, other):
+        assert min(b, g) < o < max(b, g)
+    # Anything that is not Male or Female uses the same middle table
+    assert growth.cutoffs(10, None) == growth.cutoffs(10, "Unknown") == other
+
+
+def test_ages_outside_the_table_are_clamped():
+    assert growth.cutoffs(1, "Male") == growth.cutoffs(0, "Male")
+    assert growth.age_in_months(1) == 18
+    assert growth.cutoffs(30, "Female") == growth.cutoffs(25, "Female")
+    # Age 19 (234 months) and 20+ (clamped to 240) are both in range, and close
+    assert growth.cutoffs(19, "Female") != growth.cutoffs(30, "Female")
+
+
+def test_category_offsets_count_cutoffs_reached():
+    low, over, obese = growth.cutoffs(8, "Female")
+    bmi = [low - 0.01, low, over - 0.01, over, obese - 0.01, obese]
+    assert growth.category_offsets(bmi, [8] * 6, [1] * 6).tolist() == [0, 1, 1, 2, 2, 3]
+
+
+def test_percentiles_match_the_scalar_lookup():
+    rng = np.random.default_rng(3)
+    bmi = rng.uniform(12, 35, 200)
+    ages = rng.integers(2, 18, 200)
+    sexes = rng.integers(0, 3, 200)
+    batch = growth.percentiles(bmi, ages, sexes)
+    for i in range(200):
+        assert batch[i] == pytest.approx(growth.percentile(bmi[i], ages[i], engine.GENDERS[sexes[i]]))
+    assert ((batch > 0) & (batch < 100)).all()
+
+
+def test_children_are_not_compared_against_raw_percentiles():
+    # A BMI of 17 at age 10 used to be "Healthy" only because 5 <= 17 < 85
+    assert engine.get_bmi_category(13.5, 10, "Male") == "Underweight (Child)"
+    # Girls' cut-offs are higher at this age
+    assert engine.get_bmi_category(20, 10, "Male") == "Overweight (Child)"
+    assert engine.get_bmi_category(20, 10, "Female") == "Healthy Weight (Child)"
+    assert engine.score(170, 70, 30)['percentile'] is None
+    assert engine.score(140, 33, 10, "Male")['percentile'] == pytest.approx(48.9, abs=0.1)
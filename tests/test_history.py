@@ -0,0 +1,80 @@
+import numpy as np
+
+from bmi import engine
+from bmi.history import COLUMNS, HistoryStore
+
+SEDENTARY, ACTIVE = "Sedentary (little or no exercise)", "Very Active (hard exercise 6-7 days/week)"
+
+
+def record(ts, name, weight, category="Normal Weight", activity=SEDENTARY):
+    return {'ts': ts, 'name': name, 'age': 40, 'gender': "Male", 'activity': activity, 'height': 180.0,
+            'weight': weight, 'bmi': round(weight / 3.24, 1), 'category': category}
+
+
+def filled_store(capacity=1024):
+    store = HistoryStore(capacity=capacity)
+    store.extend([record(1000, "Ann", 70.0), record(1060, "Ben", 95.0, "Overweight", ACTIVE),
+                  record(1120, "Ann", 71.5)])
+    return store
+
+
+def test_columns_are_typed():
+    store = filled_store()
+    for name, dtype in COLUMNS.items():
+        assert store.column(name).dtype == dtype
+        assert len(store.column(name)) == 3
+
+
+def test_strings_are_dictionary_encoded():
+    store = filled_store()
+    assert store.person_names() == ["Ann", "Ben"]
+    assert store.column('name').tolist() == [0, 1, 0]
+    assert store.activities.values == [SEDENTARY, ACTIVE]
+    # Categories use the engine's codes, so vectorized results can be stored as they are
+    assert store.column('category').tolist() == [engine.CATEGORY_CODES["Normal Weight"],
+                                                 engine.CATEGORY_CODES["Overweight"],
+                                                 engine.CATEGORY_CODES["Normal Weight"]]
+
+
+def test_person_rows():
+    store = filled_store()
+    assert store.rows_for("Ann").tolist() == [0, 2]
+    assert store.rows_for("Ben").tolist() == [1]
+    assert store.rows_for("Nobody").tolist() == []
+
+
+def test_entry_round_trip():
+    store = filled_store()
+    entry = store.entry(1)
+    assert entry['date'] == store.value(1, 'date')
+    del entry['date']
+    assert entry == record(1060, "Ben", 95.0, "Overweight", ACTIVE)
+    assert [entry['weight'] for entry in store.iter_entries([2, 0])] == [71.5, 70.0]
+
+
+def test_growing_keeps_rows():
+    store = HistoryStore(capacity=2)
+    store.extend(record(1000 + i, "Ann", 60.0 + i) for i in range(50))
+    assert len(store) == 50
+    assert np.allclose(store.column('weight'), 60.0 + np.arange(50))
+    assert store.rows_for("Ann").tolist() == list(range(50))
+
+
+def test_clear():
+    store = filled_store()
+    store.clear()
+    assert len(store) == 0
+    assert store.person_names() == []
+    store.append(record(2000, "Cy", 80.0))
+    assert store.rows_for("Cy").tolist() == [0]
+
+
+def test_extend_columns_matches_append():
+    entries = [record(1000, "Ann", 70.0), record(1060, "Ben", 95.0, "Overweight", ACTIVE), record(1120, "Ann", 71.5)]
+    one_by_one = HistoryStore()
+    one_by_one.extend(entries)
+    bulk = HistoryStore()
+    bulk.extend_columns({field: [entry[field] for entry in entries] for field in entries[0]})
+    for name in COLUMNS:
+        assert bulk.column(name).tolist() == one_by_one.column(name).tolist()
+    assert bulk.rows_for("Ann").tolist() == [0, 2]
@@ -0,0 +1,147 @@
+import gzip
+from datetime import datetime
+
+import pytest
+
+from bmi import engine
+from bmi.history import HistoryStore
+from bmi.importer import CsvImportError, ImportCancelled, ImportStats, import_csv, iter_batches, main
+from bmi.storage import HistoryLog
+
+
+def write_csv(tmp_path, text, name="people.csv"):
+    path = tmp_path / name
+    if name.endswith(".gz"):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def load(path):
+    store = HistoryStore()
+    for chunk in HistoryLog(path).iter_chunks():
+        store.extend(chunk)
+    return store
+
+
+METRIC = """Name,Age,Sex,Activity Level,Height,Weight,Date,BMI
+Ann,34,F,sedentary,165,61.5,2024-03-01 09:15,99
+Ben,52,male,Very active,181,97.2,2024-03-02 10:00,
+,40,M,Sedentary,170,70,2024-03-02 10:00,
+Cy,abc,M,Sedentary,170,70,2024-03-02 10:00,
+Di,30,X,Sedentary,170,70,2024-03-02 10:00,
+Ed,30,M,Couch,170,70,2024-03-02 10:00,
+Flo,30,F,Sedentary,40,70,2024-03-02 10:00,
+Gus,30,M,Sedentary,170,70,yesterday,
+"""
+
+
+def test_metric_rows_are_validated_and_scored(tmp_path):
+    stats = ImportStats()
+    batches = list(iter_batches(write_csv(tmp_path, METRIC), stats))
+    assert (stats.rows, stats.imported, stats.rejected) == (8, 2, 6)
+    assert [reason for _, reason in stats.errors] == [
+        "missing name", "invalid age", "unknown gender", "unknown activity level", "height/weight out of range",
+        "invalid date"]
+    assert [line for line, _ in stats.errors] == [4, 5, 6, 7, 8, 9]
+    batch, = batches
+    assert batch['name'] == ["Ann", "Ben"]
+    assert batch['gender'] == ["Female", "Male"]
+    assert batch['activity'] == [engine.ACTIVITY_LEVELS[0], engine.ACTIVITY_LEVELS[3]]
+    # The file's BMI column is recomputed, not trusted
+    assert batch['bmi'].tolist() == [22.6, 29.7]
+    assert batch['category'] == ["Normal Weight", "Overweight"]
+    assert batch['ts'].tolist() == [int(datetime(2024, 3, 1, 9, 15).timestamp()),
+                                    int(datetime(2024, 3, 2, 10, 0).timestamp())]
+
+
+def test_imperial_with_feet_and_inches(tmp_path):
+    text = "name,age,gender,activity,height_ft,height_in,weight_lbs\nAnn,34,Female,Lightly,5,5,135.6\nBo,9,M,Extra,4,,60\n"
+    stats = ImportStats()
+    batch, = iter_batches(write_csv(tmp_path, text), stats)
+    assert batch['height'].tolist() == [165.1, 121.9]
+    assert batch['weight'].tolist() == [61.5, 27.2]
+    assert batch['category'][1].endswith("(Child)")
+
+
+def test_missing_columns(tmp_path):
+    with pytest.raises(CsvImportError, match="gender"):
+        list(iter_batches(write_csv(tmp_path, "name,age,activity,height_cm,weight_kg\n"), ImportStats()))
+    with pytest.raises(CsvImportError, match="height_cm/weight_kg"):
+        list(iter_batches(write_csv(tmp_path, "name,age,gender,activity,height_cm\n"), ImportStats()))
+    with pytest.raises(CsvImportError, match="empty"):
+        list(iter_batches(write_csv(tmp_path, ""), ImportStats()))
+
+
+def test_gzip_import_into_the_history_file(tmp_path):
+    rows = "".join(f"P{i % 7},{20 + i % 60},F,Moderately,{150 + i % 40},{50 + i % 30}\n" for i in range(250))
+    path = write_csv(tmp_path, "name,age,gender,activity,height_cm,weight_kg\n" + rows, "big.csv.gz")
+    history = str(tmp_path / "history.txt")
+    log = HistoryLog(history)
+    stats = import_csv(path, log, batch_rows=100)
+    log.close()
+    assert stats.imported == 250
+    store = load(history)
+    assert len(store) == 250
+    assert len(store.person_names()) == 7
+    assert store.entry(3)['height'] == 153.0
+
+
+def test_cancel_stops_between_batches(tmp_path):
+    rows = "".join(f"P{i},30,M,Sedentary,170,70\n" for i in range(50))
+    path = write_csv(tmp_path, "name,age,gender,activity,height_cm,weight_kg\n" + rows)
+    batches = []
+    with pytest.raises(ImportCancelled):
+        for batch in iter_batches(path, ImportStats(), batch_rows=10, progress=lambda done, total: False):
+            batches.append(batch)
+    assert len(batches) == 1
+
+
+def test_command_line(tmp_path, capsys):
+    good = write_csv(tmp_path, METRIC, "good.csv")
+    bad = write_csv(tmp_path, "name\nAnn\n", "bad.csv")
+    history = str(tmp_path / "history.txt")
+    assert main([bad, good, str(tmp_path / "missing.csv"), '--history', history]) == 1
+    out, err = capsys.readouterr()
+    assert "good.csv: Imported 2 of 8 rows (6 rejected)" in out
+    assert "bad.csv: Missing column(s)" in err
+    assert "line 4: missing name" in err
+    assert "missing.csv" in err
+    assert load(history).person_names() == ["Ann", "Ben"]
+
+
+def test_undecodable_and_broken_files_are_reported_and_skipped(tmp_path, capsys):
+    latin1 = str(tmp_path / "latin1.csv")
+    with open(latin1, 'wb') as f:
+        f.write(b"name,age,gender,activity,height_cm,weight_kg\nRen\xe9e,34,F,Sedentary,165,61.5\n")
+    # The quote swallows every line after it, until the field is over the csv module's size limit
+    quote = write_csv(tmp_path, "name,age,gender,activity,height_cm,weight_kg\nAnn,34,F,Sedentary,165,61.5\n"
+                      "\"Ben,40,M,Sedentary,170,70\n" + "Cy,50,M,Sedentary,180,80\n" * 6000, "quote.csv")
+    good = write_csv(tmp_path, METRIC, "good.csv")
+    history = str(tmp_path / "history.txt")
+    with pytest.raises(CsvImportError, match="UTF-8"):
+        list(iter_batches(latin1, ImportStats()))
+    assert main([latin1, quote, good, '--history', history]) == 1
+    out, err = capsys.readouterr()
+    assert "latin1.csv: Not UTF-8 text (save it as CSV UTF-8)" in err
+    assert "quote.csv: Line 3: field larger than field limit (131072)\n" in err
+    assert "good.csv: Imported 2 of 8 rows (6 rejected)" in out
+    assert len(load(history)) == 2
+    # Batches before the broken line are kept
+    log = HistoryLog(str(tmp_path / "partial.txt"))
+    with pytest.raises(CsvImportError):
+        import_csv(quote, log, batch_rows=1)
+    log.close()
+    assert load(log.path).person_names() == ["Ann"]
+
+
+def test_blank_dates_get_the_import_time(tmp_path):
+    text = "name,age,gender,activity,height_cm,weight_kg,date\nAnn,34,F,Sedentary,165,61.5,\nBen,40,M,Sedentary,170,70,2024-03-02 10:00\n"
+    stats = ImportStats()
+    before = int(datetime.now().timestamp())
+    batch, = iter_batches(write_csv(tmp_path, text), stats)
+    assert stats.imported == 2
+    assert batch['ts'][0] >= before
+    assert batch['ts'][1] == int(datetime(2024, 3, 2, 10, 0).timestamp())
@@ -0,0 +1,94 @@
+import numpy as np
+
+from bmi import engine
+from bmi.history import HistoryStore
+from bmi.index import HistoryIndex
+
+NAMES = ["ann", "Anna", "Ben", "bob", "Cy"]
+
+
+def add_rows(store, rng, count):
+    for _ in range(count):
+        bmi = float(rng.uniform(15, 45))
+        age = int(rng.integers(5, 80))
+        store.append({'ts': int(rng.integers(0, 10000)), 'name': NAMES[rng.integers(len(NAMES))], 'age': age,
+                      'gender': "Female", 'activity': engine.ACTIVITY_LEVELS[0], 'height': 170.0,
+                      'weight': round(bmi * 2.89, 1), 'bmi': bmi,
+                      'category': engine.get_bmi_category(bmi, age, "Female")})
+
+
+def expected(store, name=None, categories=None, since=None, until=None):
+    ts, names, codes = store.column('ts'), store.column('name'), store.column('category')
+    keep = np.ones(len(store), dtype=bool)
+    if name is not None:
+        keep &= names == store.names.codes[name]
+    if categories is not None:
+        keep &= np.isin(codes, categories)
+    if since is not None:
+        keep &= ts >= since
+    if until is not None:
+        keep &= ts < until
+    rows = np.flatnonzero(keep)
+    return rows[np.argsort(ts[rows], kind='stable')].tolist()
+
+
+def test_queries_match_a_full_scan_on_unsorted_rows():
+    rng = np.random.default_rng(11)
+    store = HistoryStore()
+    index = HistoryIndex(store)
+    add_rows(store, rng, 300)
+    for name in (None, "Ben", "Cy"):
+        for categories in (None, (2, 8), (4, 5, 6, 10)):
+            for since, until in ((None, None), (2500, None), (1000, 7000)):
+                assert index.query(name, categories, since, until).tolist() == \
+                    expected(store, name, categories, since, until)
+    # Rows appended later are picked up by the next query
+    add_rows(store, rng, 50)
+    assert index.query("ann", (3, 9), 500).tolist() == expected(store, "ann", (3, 9), 500)
+    assert index.query().tolist() == expected(store)
+
+
+def test_rows_in_time_order_need_no_sort():
+    store = HistoryStore()
+    index = HistoryIndex(store)
+    for i, bmi in enumerate([20.0, 27.0, 31.0, 22.0]):
+        store.append({'ts': 100 * i, 'name': "Ann", 'age': 40, 'gender': "Female",
+                      'activity': engine.ACTIVITY_LEVELS[0], 'height': 170.0, 'weight': 60.0, 'bmi': bmi,
+                      'category': engine.get_bmi_category(bmi, 40)})
+    assert index.query(since=100, until=300).tolist() == [1, 2]
+    assert index.query(categories=(2,)).tolist() == [0, 3]
+    assert index.time_sorted and index.time_order is None
+    assert index.query("Nobody").tolist() == []
+
+
+def test_names_are_sorted_case_insensitively():
+    store = HistoryStore()
+    index = HistoryIndex(store)
+    add_rows(store, np.random.default_rng(1), 100)
+    assert index.names() == ["ann", "Anna", "Ben", "bob", "Cy"]
+    assert index.names_with_prefix("AN") == ["ann", "Anna"]
+    assert index.names_with_prefix("b") == ["Ben", "bob"]
+    assert index.names_with_prefix("z") == []
+
+
+def test_clearing_the_store_resets_the_index():
+    store = HistoryStore()
+    index = HistoryIndex(store)
+    add_rows(store, np.random.default_rng(2), 20)
+    assert len(index.query()) == 20
+    store.clear()
+    add_rows(store, np.random.default_rng(3), 3)
+    assert len(index.query()) == 3
+
+
+def test_presets_count_back_from_now():
+    store = HistoryStore()
+    index = HistoryIndex(store)
+    now = 100 * 86400
+    for days_ago in (400, 60, 20, 3):
+        store.append({'ts': now - days_ago * 86400, 'name': "Ann", 'age': 40, 'gender': "Female",
+                      'activity': engine.ACTIVITY_LEVELS[0], 'height': 170.0, 'weight': 60.0, 'bmi': 20.8,
+                      'category': "Normal Weight"})
+    assert len(index.query_preset(period_filter="Last 30 Days", now=now)) == 2
+    assert len(index.query_preset(period_filter="Last Year", now=now)) == 3
+    assert len(index.query_preset("Ann", "Overweight", now=now)) == 0
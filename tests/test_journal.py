@@ -0,0 +1,205 @@
+import os
+import queue
+import time
+
+import pytest
+
+from bmi import engine
+from bmi.history import HistoryStore, entry_key
+from bmi.journal import HistoryJournal, describe
+from bmi.storage import HistoryLog
+from bmi.sync import ReplicationLog, Replicator
+
+T0 = 1717000000
+
+
+def entry(minutes, name, bmi):
+    return {'ts': T0 + 60 * minutes, 'name': name, 'age': 40, 'gender': "Female",
+            'activity': engine.ACTIVITY_LEVELS[1], 'height': 170.0, 'weight': round(bmi * 2.89, 1), 'bmi': bmi,
+            'category': engine.get_bmi_category(bmi, 40)}
+
+
+ANN = [entry(0, "Ann", 22.0), entry(1, "Ann", 26.0), entry(2, "Ann", 31.0)]
+BEN = entry(1, "Ben", 24.0)
+
+
+def setup(tmp_path, entries):
+    path = str(tmp_path / "history.txt")
+    log = HistoryLog(path)
+    log.append_many(entries)
+    store = HistoryStore()
+    store.extend(entries)
+    return store, log, HistoryJournal(store, log)
+
+
+def reload(log):
+    log.close()
+    return [e for chunk in HistoryLog(log.path).iter_chunks() for e in chunk]
+
+
+def live(store):
+    return [store.entry(row) for row in store.index.query()]
+
+
+def keys(entries):
+    return sorted(entry_key(e) for e in entries)
+
+
+def test_delete_edit_undo_redo_survive_a_reload(tmp_path):
+    store, log, journal = setup(tmp_path, ANN + [BEN])
+    journal.delete([ANN[1], BEN])
+    assert keys(live(store)) == keys([ANN[0], ANN[2]])
+    corrected = dict(ANN[2], weight=80.0, bmi=27.7, category="Overweight")
+    journal.edit(ANN[2], corrected)
+    assert keys(live(store)) == keys([ANN[0], corrected])
+    journal.undo()
+    assert keys(live(store)) == keys([ANN[0], ANN[2]])
+    journal.undo()
+    assert keys(live(store)) == keys(ANN + [BEN])
+    journal.redo()
+    assert journal.can_redo
+    assert keys(reload(log)) == keys(live(store)) == keys([ANN[0], ANN[2]])
+
+
+def test_withdrawals_are_appended_not_rewritten(tmp_path):
+    store, log, journal = setup(tmp_path, ANN)
+    with open(log.path, encoding='utf-8') as f:
+        before = f.read()
+    journal.delete([ANN[0]])
+    log.close()
+    with open(log.path, encoding='utf-8') as f:
+        text = f.read()
+    assert text.startswith(before)
+    assert text[len(before):].startswith("-\t")
+
+
+def test_identical_records_are_withdrawn_one_at_a_time(tmp_path):
+    store, log, journal = setup(tmp_path, [ANN[0], ANN[0], ANN[1]])
+    journal.delete([ANN[0]])
+    assert keys(live(store)) == keys([ANN[0], ANN[1]])
+    journal.delete([ANN[0]])
+    assert keys(reload(log)) == keys([ANN[1]])
+
+
+def test_a_missing_record_changes_nothing(tmp_path):
+    store, log, journal = setup(tmp_path, ANN)
+    log.sync()
+    size = os.path.getsize(log.path)
+    with pytest.raises(LookupError, match="Ann"):
+        journal.delete([ANN[0], entry(9, "Ann", 20.0)])
+    assert os.path.getsize(log.path) == size
+    assert len(live(store)) == 3
+    assert not journal.can_undo
+
+
+def test_rollups_and_index_match_a_rebuilt_store(tmp_path):
+    entries = [entry(i, "Ann" if i % 3 else "Ben", 18.0 + (i * 7) % 20) for i in range(30)]
+    store, log, journal = setup(tmp_path, entries)
+    store.rollups.update()
+    journal.delete(entries[4:10])
+    journal.edit(entries[12], dict(entries[12], bmi=35.5, category="Obesity Class II"))
+    journal.undo()
+    journal.edit(entries[20], dict(entries[20], ts=entries[2]['ts'] + 30, bmi=29.0, category="Overweight"))
+    rebuilt = HistoryStore()
+    rebuilt.extend(sorted(live(store), key=lambda e: e['ts']))
+    for view in (store, rebuilt):
+        view.rollups.update()
+    assert store.rollups.overall.count == rebuilt.rollups.overall.count == 24
+    assert store.rollups.overall.mean == pytest.approx(rebuilt.rollups.overall.mean)
+    assert store.rollups.overall.variance == pytest.approx(rebuilt.rollups.overall.variance)
+    assert store.rollups.category_rows() == rebuilt.rollups.category_rows()
+    assert sorted(store.rollups.transition_rows()) == sorted(rebuilt.rollups.transition_rows())
+    assert store.rollups.current_category_rows() == rebuilt.rollups.current_category_rows()
+    assert len(store.index.query("Ann", (3, 9))) == len(rebuilt.index.query("Ann", (3, 9)))
+    assert len(store.snapshot()['ts']) == 24
+
+
+def test_undo_limit_and_descriptions(tmp_path):
+    store, log, journal = setup(tmp_path, ANN)
+    journal.limit = 2
+    for record in ANN:
+        journal.delete([record])
+    assert len(journal.undo_stack) == 2
+    assert describe(journal.undo_stack[-1]) == "Delete of 1 record"
+    assert describe([(False, ANN[0]), (True, ANN[1])]) == "Edit of Ann's record"
+    assert describe([(False, ANN[0]), (False, ANN[1])]) == "Delete of 2 records"
+
+
+def test_withdrawals_without_a_record_wait_for_one(tmp_path):
+    path = str(tmp_path / "history.txt")
+    log = HistoryLog(path)
+    log.append_changes([(False, BEN), (True, ANN[0])])
+    log.close()
+    reloaded = HistoryLog(path)
+    assert [e for chunk in reloaded.iter_chunks() for e in chunk] == [ANN[0]]
+    assert reloaded.pending_removals == {entry_key(BEN): 1}
+    # e.g. Ben's record arriving later from another station
+    assert reloaded.cancel_removed([BEN, BEN, ANN[1]]) == [BEN, ANN[1]]
+    assert not reloaded.pending_removals
+
+
+class Station:
+    """A GUI without the window: remote changes are applied on the test's thread, as wx.CallAfter would"""
+
+    def __init__(self, tmp_path, name):
+        self.inbox = queue.Queue()
+        self.store = HistoryStore()
+        self.log = HistoryLog(str(tmp_path / f"{name}.txt"))
+        self.replicator = Replicator(ReplicationLog(str(tmp_path), name),
+                                     lambda entries: self.inbox.put((True, entries)), interval=0.01,
+                                     withdraw=lambda entries: self.inbox.put((False, entries)))
+        self.journal = HistoryJournal(self.store, self.log, replicator=self.replicator)
+        self.replicator.start()
+
+    def calculate(self, e):
+        self.log.append(e)
+        self.store.append(e)
+        self.replicator.publish([e])
+
+    def receive(self):
+        while not self.inbox.empty():
+            added, entries = self.inbox.get()
+            if added:
+                self.store.extend(self.log.cancel_removed(entries))
+            else:
+                self.journal.withdraw(entries)
+
+
+def converge(stations, expected):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        for station in stations:
+            station.receive()
+        if all(keys(live(station.store)) == keys(expected) for station in stations):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_two_stations_converge_after_an_edit_a_delete_and_an_undo(tmp_path):
+    a, b = Station(tmp_path, "a"), Station(tmp_path, "b")
+    try:
+        a.calculate(ANN[0])
+        a.calculate(ANN[1])
+        b.calculate(BEN)
+        assert converge([a, b], [ANN[0], ANN[1], BEN])
+        corrected = dict(ANN[1], weight=70.0, bmi=24.2, category="Normal Weight")
+        b.journal.edit(ANN[1], corrected)  # a record made on the other station
+        a.journal.delete([BEN])
+        assert converge([a, b], [ANN[0], corrected])
+        b.journal.undo()
+        assert converge([a, b], [ANN[0], ANN[1]])
+        a.journal.undo()
+        assert converge([a, b], [ANN[0], ANN[1], BEN])
+    finally:
+        a.replicator.close(timeout=5)
+        b.replicator.close(timeout=5)
+
+
+def test_a_withdrawal_from_another_station_can_arrive_before_its_record(tmp_path):
+    store, log, journal = setup(tmp_path, [ANN[0]])
+    assert journal.withdraw([ANN[0], BEN]) == 1
+    assert not journal.can_undo
+    assert log.pending_removals == {entry_key(BEN): 1}
+    assert log.cancel_removed([BEN]) == []
+    assert keys(live(store)) == []
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pytest
+
+from bmi import engine, metrics
+
+
+def test_mifflin_st_jeor_and_activity_factors():
+    man = metrics.derive(180, 81, 40, 25.0, gender=0, activity=2)
+    assert man['bmr'] == 10 * 81 + 6.25 * 180 - 5 * 40 + 5
+    assert man['tdee'] == pytest.approx(man['bmr'] * 1.55)
+    woman = metrics.derive(180, 81, 40, 25.0, gender=1)
+    assert man['bmr'] - woman['bmr'] == 166
+    # Other sits halfway between
+    assert metrics.derive(180, 81, 40, 25.0)['bmr'] == pytest.approx(man['bmr'] - 83)
+    assert woman['tdee'] is None
+    assert metrics.derive(180, 81, 40, 25.0, activity=-1)['tdee'] is None
+
+
+def test_body_fat_uses_the_childrens_equation_under_18():
+    assert metrics.derive(180, 81, 40, 25.0, gender=0)['body_fat'] == pytest.approx(1.2 * 25 + 0.23 * 40 - 10.8 - 5.4)
+    assert metrics.derive(150, 45, 12, 20.0, gender=1)['body_fat'] == pytest.approx(1.51 * 20 - 0.70 * 12 + 1.4)
+    # The children's equation goes negative at extreme values; it is clamped at zero
+    assert metrics.derive(170, 26, 17, 9.0, gender=0)['body_fat'] == 0.0
+    assert metrics.derive_batch([170], [26], [17], [9.0], [0])['body_fat'].tolist() == [0.0]
+    assert metrics.derive(180, 81, 40, 27.5)['bmi_prime'] == 1.1
+
+
+def test_batch_matches_single_records():
+    rng = np.random.default_rng(9)
+    n = 400
+    height, weight = rng.uniform(100, 200, n), rng.uniform(20, 150, n)
+    age = rng.integers(2, 90, n)
+    bmi = engine.compute_bmi(height, weight)
+    gender = rng.integers(0, 3, n)
+    activity = rng.integers(-1, len(engine.ACTIVITY_LEVELS), n)
+    batch = metrics.derive_batch(height, weight, age, bmi, gender, activity)
+    for i in range(n):
+        one = metrics.derive(height[i], weight[i], age[i], bmi[i], int(gender[i]), int(activity[i]))
+        for key in ('bmr', 'body_fat', 'bmi_prime'):
+            assert batch[key][i] == pytest.approx(one[key])
+        if one['tdee'] is None:
+            assert math.isnan(batch['tdee'][i])
+        else:
+            assert batch['tdee'][i] == pytest.approx(one['tdee'])
+    assert np.isnan(metrics.derive_batch(height, weight, age, bmi)['tdee']).all()
+
+
+def test_engine_returns_the_estimates():
+    result = engine.score(180, 81, 40, "Male", engine.ACTIVITY_LEVELS[2])
+    assert result['bmr'] == 1740
+    assert result['tdee'] == pytest.approx(1740 * 1.55)
+    batch = engine.score_batch([180], [81], [40], engine.gender_codes(["Male"]),
+                               engine.activity_codes([engine.ACTIVITY_LEVELS[2]]))
+    for key in metrics.METRICS:
+        assert batch[key][0] == pytest.approx(result[key])
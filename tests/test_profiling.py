@@ -0,0 +1,55 @@
+import threading
+import time
+
+from bmi import profiling
+from bmi.profiling import Recorder, StallWatchdog, span, timed
+
+
+def test_spans_are_recorded_only_while_enabled(monkeypatch):
+    recorder = Recorder(max_spans=3)
+    monkeypatch.setattr(profiling, 'RECORDER', recorder)
+
+    @timed("work")
+    def work(x):
+        return x * 2
+
+    assert work(2) == 4
+    assert not recorder.spans
+    recorder.enabled = True
+    assert work(3) == 6
+    with span("block", "io"):
+        pass
+    assert [(name, category) for name, category, *_ in recorder.spans] == [("work", "span"), ("block", "io")]
+    for _ in range(5):
+        work(1)
+    assert len(recorder.spans) == 3
+
+
+def test_summary_and_trace():
+    recorder = Recorder()
+    for ms in (1, 2, 3, 4):
+        recorder.add("load", 0, ms * 1_000_000)
+    recorder.add("draw", 0, 20_000_000, "chart")
+    rows = recorder.summary()
+    assert rows[0][:3] == ("draw", "chart", 1)
+    assert rows[1][:4] == ("load", "span", 4, 2.5)
+    assert rows[1][4:] == (3.0, 4.0, 4.0)
+    events = recorder.chrome_trace()['traceEvents']
+    assert [event['ph'] for event in events] == ["X"] * 5 + ["M"]
+    assert events[4]['dur'] == 20000
+    assert events[-1]['args'] == {'name': "GUI thread"}
+
+
+def test_watchdog_counts_a_slow_loop_once():
+    recorder = Recorder()
+    watchdog = StallWatchdog(lambda callback: threading.Timer(0.08, callback).start(), recorder,
+                             interval=0.01, threshold=0.05)
+    watchdog.start()
+    time.sleep(0.3)
+    watchdog.stop()
+    assert 1 <= watchdog.probes <= 5
+    assert watchdog.stalls == watchdog.probes
+    assert recorder.spans[0][:2] == ("event loop stall", "stall")
+    assert watchdog.summary().startswith("Event loop: latency p50")
+    watchdog.reset()
+    assert watchdog.summary() == "Event loop: no measurements yet"
@@ -0,0 +1,97 @@
+import re
+import zlib
+
+import numpy as np
+import pytest
+
+from bmi.export import ExportCancelled
+from bmi.history import HistoryStore
+from bmi.report import PdfStream, group_by_person, page_count, summary_rows, write_pdf_report
+
+DAY = 86400
+
+
+def make_snapshot(people, records_each):
+    store = HistoryStore()
+    for i in range(records_each):
+        for p in range(people):
+            bmi = 20.0 + p + i * 0.5
+            store.append({'ts': 1700000000 + i * DAY + p, 'name': f"Person {p:02d}", 'age': 40, 'gender': "Male",
+                          'activity': "Sedentary (little or no exercise)", 'height': 180.0,
+                          'weight': round(bmi * 3.24, 1), 'bmi': bmi,
+                          'category': "Normal Weight" if bmi < 25 else "Overweight"})
+    return store.snapshot()
+
+
+def test_pdf_stream_structure(tmp_path):
+    path = tmp_path / "page.pdf"
+    pdf = PdfStream(str(path))
+    pdf.add_image_page(2, 1, zlib.compress(bytes([255, 0, 0, 0, 0, 255])))
+    pdf.add_image_page(2, 1, zlib.compress(bytes(6)))
+    pdf.close()
+    data = path.read_bytes()
+    assert data.startswith(b"%PDF-1.4")
+    assert data.rstrip().endswith(b"%%EOF")
+    assert b"/Count 2" in data
+    # startxref points at the cross-reference table
+    offset = int(re.search(rb"startxref\n(\d+)", data).group(1))
+    assert data[offset:offset + 4] == b"xref"
+    # Every object offset in the table is where that object starts
+    entries = re.findall(rb"(\d{10}) 00000 n", data)
+    for number, entry in enumerate(entries, 1):
+        assert data[int(entry):].startswith(b"%d 0 obj" % number)
+
+
+def test_groups_and_summary():
+    snap = make_snapshot(people=2, records_each=3)
+    groups = group_by_person(snap)
+    assert [name for name, _ in groups] == ["Person 00", "Person 01"]
+    rows = summary_rows(snap, groups)
+    assert rows[0][:2] == ("Person 00", "3")
+    assert rows[0][4:] == ("21.0", "+1.0", "Normal Weight")
+    assert rows[1][4:] == ("22.0", "+1.0", "Normal Weight")
+
+
+def test_rows_are_in_time_order_per_person():
+    store = HistoryStore()
+    for ts, bmi in ((3 * DAY, 27.0), (1 * DAY, 21.0), (2 * DAY, 24.0)):
+        store.append({'ts': 1700000000 + ts, 'name': "Ann", 'age': 40, 'gender': "Female",
+                      'activity': "Sedentary (little or no exercise)", 'height': 170.0, 'weight': round(bmi * 2.89, 1),
+                      'bmi': bmi, 'category': "Overweight" if bmi >= 25 else "Normal Weight"})
+    snap = store.snapshot()
+    groups = group_by_person(snap)
+    assert snap['ts'][groups[0][1]].tolist() == sorted(snap['ts'].tolist())
+    # Last record and change follow time, not the order rows were added in
+    assert summary_rows(snap, groups)[0][4:] == ("27.0", "+6.0", "Overweight")
+
+
+def test_page_count():
+    # 1 table page, 1 distribution page, 2 trend pages for 7 people at 6 per page
+    assert page_count(make_snapshot(people=7, records_each=1)) == 4
+    assert page_count(make_snapshot(people=41, records_each=1)) == 2 + 1 + 7
+
+
+def test_report_pages(tmp_path):
+    path = tmp_path / "report.pdf"
+    snap = make_snapshot(people=7, records_each=4)
+    progress = []
+    pages = write_pdf_report(snap, str(path), progress=lambda done, total: progress.append((done, total)), workers=2)
+    assert pages == page_count(snap) == 4
+    assert progress[-1] == (4, 4)
+    data = path.read_bytes()
+    assert b"/Count 4" in data
+    assert len(re.findall(rb"/Subtype /Image", data)) == 4
+
+
+def test_cancelled_report_is_removed(tmp_path):
+    path = tmp_path / "report.pdf"
+    with pytest.raises(ExportCancelled):
+        write_pdf_report(make_snapshot(people=7, records_each=2), str(path), progress=lambda done, total: False,
+                         workers=1)
+    assert not path.exists()
+
+
+def test_empty_history_still_has_a_summary_page(tmp_path):
+    snap = make_snapshot(people=0, records_each=0)
+    assert np.size(snap['ts']) == 0
+    assert write_pdf_report(snap, str(tmp_path / "empty.pdf"), workers=1) == page_count(snap) == 2
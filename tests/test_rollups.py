@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from bmi import engine
+from bmi.history import HistoryStore
+from bmi.rollups import QuantileSketch, Rollup
+
+LEVELS = engine.ACTIVITY_LEVELS
+
+
+def entry(ts, name, bmi, age=40, gender="Female", activity=LEVELS[0]):
+    return {'ts': ts, 'name': name, 'age': age, 'gender': gender, 'activity': activity, 'height': 170.0,
+            'weight': round(bmi * 2.89, 1), 'bmi': bmi, 'category': engine.get_bmi_category(bmi, age, gender)}
+
+
+def test_rollup_matches_numpy_one_by_one_and_in_batches():
+    values = np.random.default_rng(5).normal(26, 5, 5000)
+    single, batched = Rollup(), Rollup()
+    for value in values[:300]:
+        single.add(value)
+    single.add_many(values[300:])
+    for part in np.array_split(values, 7):
+        batched.add_many(part)
+    for rollup in (single, batched):
+        assert rollup.count == 5000
+        assert rollup.mean == pytest.approx(values.mean())
+        assert rollup.variance == pytest.approx(values.var(ddof=1))
+        assert rollup.median == pytest.approx(np.median(values), abs=0.1)
+
+
+def test_sketch_stays_small_and_keeps_the_extremes():
+    values = np.random.default_rng(6).exponential(3, 200000)
+    sketch = QuantileSketch()
+    sketch.add_many(values)
+    assert len(sketch) == 200000
+    assert len(sketch.means) <= sketch.compression
+    assert sketch.quantile(0) == values.min()
+    assert sketch.quantile(1) == values.max()
+    assert sketch.quantile(0.9) == pytest.approx(np.quantile(values, 0.9), rel=0.01)
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_groups_and_categories():
+    store = HistoryStore()
+    store.extend([entry(0, "Ann", 22.0), entry(60, "Bo", 31.0, gender="Male", activity=LEVELS[3]),
+                  entry(120, "Cy", 17.0, age=70)])
+    rollups = store.rollups
+    assert [(label, rollup.count) for label, rollup in rollups.group_rows('gender')] == [("Female", 2), ("Male", 1)]
+    assert [label for label, _ in rollups.group_rows('age_band')] == ["adult", "senior"]
+    assert dict(rollups.group_rows('activity'))[LEVELS[3]].mean == 31.0
+    assert rollups.category_rows() == [("Underweight", 1), ("Normal Weight", 1), ("Obesity Class I", 1)]
+    # A single appended row takes the one-at-a-time path and gives the same totals
+    store.append(entry(180, "Ann", 26.0))
+    rollups.update()
+    assert rollups.overall.count == 4
+    assert rollups.overall.mean == pytest.approx((22 + 31 + 17 + 26) / 4)
+
+
+def test_transitions_follow_each_person_in_time_order():
+    store = HistoryStore()
+    rollups = store.rollups
+    store.extend([entry(100, "Ann", 22.0), entry(200, "Ann", 26.0), entry(100, "Bo", 31.0)])
+    store.append(entry(300, "Ann", 24.0))
+    rollups.update()
+    # Older than Ann's latest record: counted, but not as a change
+    store.append(entry(50, "Ann", 35.0))
+    assert sorted(rollups.transition_rows()) == [("Normal Weight", "Overweight", 1),
+                                                 ("Overweight", "Normal Weight", 1)]
+    assert rollups.current_category_rows() == [("Normal Weight", 1), ("Obesity Class I", 1)]
+    rollups.update()
+    assert rollups.overall.count == 5
+
+
+def test_clear_resets():
+    store = HistoryStore()
+    store.extend([entry(0, "Ann", 22.0), entry(60, "Ann", 27.0)])
+    assert store.rollups.transition_rows()
+    store.clear()
+    store.append(entry(0, "Bo", 20.0))
+    store.rollups.update()
+    assert store.rollups.overall.count == 1
+    assert store.rollups.transition_rows() == []
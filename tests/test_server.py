@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from bmi import engine, server
+from bmi.server import ScoringServer, parse_record, score_records
+
+
+def test_parse_record_converts_and_validates():
+    height, weight = engine.imperial_to_metric(70, 154)
+    assert parse_record({'height': 70, 'weight': 154, 'age': 30, 'units': 'imperial'}) == \
+        (height, weight, 30, None, None, True)
+    for record, message in [
+        ([], "JSON object"),
+        ({'height': 170, 'age': 30}, "Missing field: weight"),
+        ({'height': "tall", 'weight': 70, 'age': 30}, "numbers"),
+        ({'height': 170, 'weight': 70, 'age': 30.5}, "whole number"),
+        ({'height': 170, 'weight': 70, 'age': 30, 'units': 'stone'}, "units"),
+        ({'height': 40, 'weight': 70, 'age': 30}, "Height must be at least 50cm"),
+        ({'height': 170, 'weight': 70, 'age': 30, 'gender': "M"}, "gender"),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            parse_record(record)
+
+
+def test_only_finite_json_numbers_are_accepted():
+    for height in ("170", True, float('nan'), float('inf'), 10 ** 400):
+        with pytest.raises(ValueError, match="numbers"):
+            parse_record({'height': height, 'weight': 70, 'age': 30})
+    assert parse_record({'height': 170, 'weight': 70.5, 'age': 30})[:2] == (170.0, 70.5)
+
+
+def test_results_match_the_engine():
+    records = [parse_record({'height': 180, 'weight': 81, 'age': 40, 'gender': "Male"}),
+               parse_record({'height': 55, 'weight': 70, 'age': 10, 'units': 'imperial'})]
+    adult, child = score_records(records)
+    assert adult['bmi'] == 25.0 and adult['category'] == "Overweight"
+    assert adult['percentile'] is None
+    assert (adult['ideal_min'], adult['ideal_max'], adult['ideal_unit']) == (59.9, 80.7, "kg")
+    expected = engine.score(*engine.imperial_to_metric(55, 70), 10)
+    assert child['category'] == expected['category']
+    assert child['percentile'] == round(expected['percentile'], 1)
+    assert child['ideal_unit'] == "lbs"
+
+
+async def request(port, method, path, payload=None, raw=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = raw if raw is not None else (json.dumps(payload).encode() if payload is not None else b"")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode() + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+    data = json.loads(await reader.readexactly(length))
+    writer.close()
+    return int(head.split(b" ")[1]), data
+
+
+def serve(test, **options):
+    async def main():
+        server = ScoringServer(port=0, **options)
+        await server.start()
+        try:
+            return await test(server)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_endpoints():
+    async def test(server):
+        port = server.port
+        status, result = await request(port, "POST", "/score", {'height': 170, 'weight': 65, 'age': 30})
+        assert status == 200 and result['bmi'] == 22.5
+        status, result = await request(port, "POST", "/score/batch",
+                                       {'records': [{'height': 170, 'weight': 65, 'age': 30}, {'height': 170}]})
+        assert status == 200
+        assert result['results'][0]['category'] == "Normal Weight"
+        assert result['results'][1] == {'error': "Missing field: weight"}
+        assert (await request(port, "POST", "/score", {'height': 170, 'weight': 5, 'age': 30}))[0] == 400
+        assert (await request(port, "POST", "/score", raw=b"{nope"))[1] == {'error': "Body is not valid JSON"}
+        assert (await request(port, "GET", "/score"))[0] == 405
+        assert (await request(port, "POST", "/health"))[0] == 405
+        assert (await request(port, "GET", "/nothing"))[0] == 404
+        status, health = await request(port, "GET", "/health")
+        assert status == 200 and health['records_scored'] == 2
+    serve(test)
+
+
+def test_oversized_requests_are_refused(monkeypatch):
+    monkeypatch.setattr(server, 'MAX_BATCH_RECORDS', 3)
+
+    async def test(server):
+        status, result = await request(server.port, "POST", "/score/batch", {'records': [{}] * 4})
+        assert status == 413
+        status, _ = await request(server.port, "POST", "/score/batch",
+                                  {'records': [{'height': 170, 'weight': 65, 'age': 30}] * 3})
+        # More valid records than max_pending
+        assert status == 503
+        return server.rejected
+    assert serve(test, max_pending=2) == 1
+
+
+def test_concurrent_requests_share_a_batch():
+    async def test(server):
+        records = [{'height': 150 + i, 'weight': 60, 'age': 30} for i in range(20)]
+        answers = await asyncio.gather(*(request(server.port, "POST", "/score", record) for record in records))
+        assert [result['bmi'] for _, result in answers] == [round(60 / ((150 + i) / 100) ** 2, 1) for i in range(20)]
+        assert server.batcher.scored == 20
+        return server.batcher.batches
+    assert serve(test) < 20
+
+
+def test_negative_content_length_is_refused():
+    async def test(server):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(b"POST /score HTTP/1.1\r\nContent-Length: -5\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        return response
+    response = serve(test)
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Bad Content-Length" in response
@@ -0,0 +1,227 @@
+import os
+import threading
+from datetime import datetime
+
+from bmi import storage
+from bmi.storage import HEADER, HistoryLog, format_record, format_removal, parse_record
+
+ALICE = {'ts': int(datetime(2024, 3, 1, 9, 15).timestamp()), 'name': "Alice", 'age': 34, 'gender': "Female",
+         'activity': "Sedentary (little or no exercise)", 'height': 165.0, 'weight': 61.5, 'bmi': 22.6,
+         'category': "Normal Weight"}
+BOB = {'ts': int(datetime(2024, 3, 1, 9, 40).timestamp()), 'name': "Bob", 'age': 52, 'gender': "Male",
+       'activity': "Very Active (hard exercise 6-7 days/week)", 'height': 181.0, 'weight': 97.2, 'bmi': 29.7,
+       'category': "Overweight"}
+
+
+def read_all(path):
+    return [entry for chunk in HistoryLog(path).iter_chunks() for entry in chunk]
+
+
+def test_record_round_trip():
+    assert parse_record(format_record(ALICE)) == ALICE
+
+
+def test_time_is_written_as_epoch_seconds():
+    entry = dict(ALICE, ts=ALICE['ts'] + 37)
+    assert format_record(entry).startswith(f"{ALICE['ts'] + 37}\tAlice\t")
+    assert parse_record(format_record(entry))['ts'] == entry['ts']
+
+
+def v1_line(entry, date=None):
+    """A record as format v1 wrote it, with a local date instead of epoch seconds"""
+    stamp = date or datetime.fromtimestamp(entry['ts']).strftime("%Y-%m-%d %H:%M")
+    return stamp + format_record(entry)[len(str(entry['ts'])):]
+
+
+def write_v1(path, lines):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("# bmi_history v1\tdate\tname\tage\tgender\tactivity\theight\tweight\tbmi\tcategory\n")
+        f.writelines(lines)
+
+
+def test_v1_records_are_still_read(tmp_path):
+    path = str(tmp_path / "history.txt")
+    write_v1(path, [v1_line(ALICE), v1_line(BOB)])
+    assert parse_record(v1_line(ALICE)) == ALICE
+    assert read_all(path) == [ALICE, BOB]
+
+
+def test_upgrade_rewrites_v1_once(tmp_path):
+    path = str(tmp_path / "history.txt")
+    write_v1(path, [v1_line(ALICE), v1_line(BOB)[:20] + "\n", v1_line(BOB)])
+    log = HistoryLog(path)
+    assert log.needs_upgrade()
+    assert log.upgrade() == 2
+    assert not log.needs_upgrade()
+    # The log keeps appending to the new file
+    log.append(ALICE)
+    log.close()
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == HEADER + format_record(ALICE) + format_record(BOB) + format_record(ALICE)
+    assert not os.path.exists(path + ".upgrade")
+
+
+def test_upgrade_skips_a_damaged_date(tmp_path):
+    path = str(tmp_path / "history.txt")
+    write_v1(path, [v1_line(ALICE), v1_line(BOB, date="2024-13-45 99:99"), v1_line(BOB)])
+    log = HistoryLog(path)
+    assert log.upgrade() == 2
+    assert read_all(path) == [ALICE, BOB]
+
+
+def test_new_and_missing_files_need_no_upgrade(tmp_path):
+    path = str(tmp_path / "history.txt")
+    assert not HistoryLog(path).needs_upgrade()
+    log = HistoryLog(path)
+    log.append(ALICE)
+    log.close()
+    assert not log.needs_upgrade()
+
+
+def test_framing_characters_are_cleaned():
+    line = format_record(dict(ALICE, name="Al\tice\nSmith"))
+    assert line.count("\n") == 1
+    assert parse_record(line)['name'] == "Al ice Smith"
+
+
+def test_damaged_lines_are_rejected():
+    line = format_record(ALICE)
+    assert parse_record(line[:-1]) is None
+    assert parse_record(HEADER) is None
+    assert parse_record(line.replace("34", "thirty-four")) is None
+    assert parse_record("only\ttwo\n") is None
+
+
+def test_append_and_reload(tmp_path):
+    path = str(tmp_path / "history.txt")
+    log = HistoryLog(path)
+    log.append(ALICE)
+    log.append_many([BOB, ALICE])
+    log.close()
+    with open(path, encoding='utf-8') as f:
+        assert f.readline() == HEADER
+    assert read_all(path) == [ALICE, BOB, ALICE]
+
+
+def test_chunks_are_bounded(tmp_path):
+    path = str(tmp_path / "history.txt")
+    log = HistoryLog(path)
+    log.append_many([dict(ALICE, age=age) for age in range(20, 45)])
+    log.close()
+    sizes = [len(chunk) for chunk in HistoryLog(path).iter_chunks(chunk_size=10)]
+    assert sizes == [10, 10, 5]
+
+
+def test_missing_file_loads_nothing(tmp_path):
+    assert read_all(str(tmp_path / "none.txt")) == []
+
+
+def test_torn_record_is_skipped_and_terminated(tmp_path):
+    path = str(tmp_path / "history.txt")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER + format_record(ALICE) + format_record(BOB)[:25])
+    log = HistoryLog(path)
+    log.append(BOB)
+    log.close()
+    assert read_all(path) == [ALICE, BOB]
+
+
+def test_fsync_is_batched(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("bmi.storage.os.fsync", synced.append)
+    log = HistoryLog(str(tmp_path / "history.txt"), sync_every=3, sync_interval=60)
+    log.append(ALICE)
+    log.append(BOB)
+    assert synced == []
+    log.append(ALICE)
+    assert len(synced) == 1
+    log.append(BOB)
+    log.close()
+    assert len(synced) == 2
+
+
+def test_clear_keeps_only_the_header(tmp_path):
+    path = str(tmp_path / "history.txt")
+    log = HistoryLog(path)
+    log.append_many([ALICE, BOB])
+    log.clear()
+    log.append(BOB)
+    log.close()
+    assert read_all(path) == [BOB]
+
+
+def test_append_columns_matches_append_many(tmp_path):
+    rows, columns = str(tmp_path / "rows.txt"), str(tmp_path / "columns.txt")
+    HistoryLog(rows).append_many([ALICE, BOB])
+    HistoryLog(columns).append_columns({field: [ALICE[field], BOB[field]] for field in ALICE})
+    with open(rows, encoding='utf-8') as a, open(columns, encoding='utf-8') as b:
+        assert a.read() == b.read()
+
+
+def test_reading_stops_at_a_size_snapshot(tmp_path):
+    path = str(tmp_path / "history.txt")
+    log = HistoryLog(path)
+    assert log.size() == 0
+    log.append(ALICE)
+    log.sync()
+    stop = log.size()
+    # Written while the first part loads: neither the record nor the withdrawal counts yet
+    log.append(BOB)
+    log.append_changes([(False, ALICE)])
+    log.sync()
+    assert [entry for chunk in log.iter_chunks(stop=stop) for entry in chunk] == [ALICE]
+    assert not log.pending_removals
+    assert read_all(path) == [BOB]
+    log.close()
+
+
+def test_upgrade_keeps_withdrawals_next_to_a_damaged_date(tmp_path):
+    path = str(tmp_path / "history.txt")
+    write_v1(path, [v1_line(ALICE), v1_line(BOB), v1_line(ALICE, date="2024-13-45 99:99"), format_removal(BOB)])
+    log = HistoryLog(path)
+    log.upgrade()
+    log.close()
+    assert read_all(path) == [ALICE]
+
+
+def test_appends_go_on_during_an_upgrade(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.txt")
+    write_v1(path, [v1_line(ALICE)])
+    log = HistoryLog(path)
+    upgrade_lines = storage._upgrade_lines
+    appended = []
+
+    def copy_block(lines):
+        # Another thread appends while the bulk of the file is being copied
+        if not appended:
+            appended.append(True)
+            writer = threading.Thread(target=log.append, args=(BOB,))
+            writer.start()
+            writer.join(2)
+            assert not writer.is_alive(), "append waited for the whole upgrade"
+        return upgrade_lines(lines)
+
+    monkeypatch.setattr(storage, '_upgrade_lines', copy_block)
+    assert log.upgrade() == 2
+    log.append(ALICE)
+    log.close()
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == HEADER + format_record(ALICE) + format_record(BOB) + format_record(ALICE)
+
+
+def test_upgrade_after_a_clear_keeps_the_empty_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.txt")
+    write_v1(path, [v1_line(ALICE)])
+    log = HistoryLog(path)
+    upgrade_lines = storage._upgrade_lines
+
+    def clear_first(lines):
+        log.clear()
+        monkeypatch.setattr(storage, '_upgrade_lines', upgrade_lines)
+        return upgrade_lines(lines)
+
+    monkeypatch.setattr(storage, '_upgrade_lines', clear_first)
+    assert log.upgrade() == 0
+    log.close()
+    assert read_all(path) == []
+    assert not os.path.exists(path + ".upgrade")
@@ -0,0 +1,186 @@
+import os
+import shutil
+import threading
+import time
+
+from bmi.storage import format_record, format_removal
+from bmi.sync import HEADER, ReplicationLog, Replicator
+
+
+def entry(ts, name="Ann", bmi=22.0):
+    return {'ts': ts, 'name': name, 'age': 40, 'gender': "Female", 'activity': "Sedentary (little or no exercise)",
+            'height': 170.0, 'weight': round(bmi * 2.89, 1), 'bmi': bmi, 'category': "Normal Weight"}
+
+
+def test_records_are_pulled_once(tmp_path):
+    a, b = ReplicationLog(str(tmp_path), "a"), ReplicationLog(str(tmp_path), "b")
+    a.write([format_record(entry(1)), format_record(entry(2))])
+    assert b.stations() == ["a"]
+    assert [e['ts'] for _, e in b.pull()] == [1, 2]
+    assert b.pull() == []
+    a.write([format_record(entry(3))])
+    assert [e['ts'] for _, e in b.pull()] == [3]
+    # A station never reads its own log
+    assert a.pull() == []
+    with open(a.path, encoding='utf-8') as f:
+        assert f.readline() == HEADER
+
+
+def test_withdrawals_are_pulled_as_steps(tmp_path):
+    a, b = ReplicationLog(str(tmp_path), "a"), ReplicationLog(str(tmp_path), "b")
+    a.write([format_record(entry(1)), format_removal(entry(1)), format_record(entry(1, bmi=23.0))])
+    assert b.pull() == [(True, entry(1)), (False, entry(1)), (True, entry(1, bmi=23.0))]
+
+
+def test_replicator_hands_over_additions_and_withdrawals_in_order(tmp_path):
+    calls = []
+    done = threading.Event()
+    ReplicationLog(str(tmp_path), "b").write([format_record(entry(1)), format_record(entry(2)),
+                                              format_removal(entry(1)), format_record(entry(1))])
+    replicator = Replicator(ReplicationLog(str(tmp_path), "a"), lambda entries: calls.append(("add", entries)),
+                            interval=0.01, withdraw=lambda entries: (calls.append(("withdraw", entries)), done.set()))
+    replicator.publish_changes([(False, entry(3)), (True, entry(4))])
+    replicator.start()
+    assert done.wait(5)
+    replicator.close(timeout=5)
+    assert calls == [("add", [entry(1), entry(2)]), ("withdraw", [entry(1)]), ("add", [entry(1)])]
+    with open(tmp_path / "a.log", encoding='utf-8') as f:
+        assert f.readlines()[1:] == ["1\t" + format_removal(entry(3)), "2\t" + format_record(entry(4))]
+
+
+def test_pull_is_limited(tmp_path):
+    a, b = ReplicationLog(str(tmp_path), "a"), ReplicationLog(str(tmp_path), "b")
+    a.write([format_record(entry(ts)) for ts in range(25)])
+    assert [len(b.pull(limit=10)) for _ in range(4)] == [10, 10, 5, 0]
+
+
+def test_numbering_continues_after_a_restart(tmp_path):
+    ReplicationLog(str(tmp_path), "a").write([format_record(entry(1)), format_record(entry(2))])
+    ReplicationLog(str(tmp_path), "a").write([format_record(entry(3))])
+    with open(tmp_path / "a.log", encoding='utf-8') as f:
+        assert [line.split("\t", 1)[0] for line in f.readlines()[1:]] == ["1", "2", "3"]
+
+
+def test_a_shorter_copy_is_read_again_without_duplicates(tmp_path):
+    a, b = ReplicationLog(str(tmp_path), "a"), ReplicationLog(str(tmp_path), "b")
+    a.write([format_record(entry(ts)) for ts in range(1, 4)])
+    backup = str(tmp_path / "backup")
+    shutil.copy(a.path, backup)
+    a.write([format_record(entry(ts)) for ts in range(4, 8)])
+    assert len(b.pull()) == 7
+    # The share is restored from the backup and the station writes on from there
+    shutil.copy(backup, a.path)
+    restored = ReplicationLog(str(tmp_path), "a")
+    restored.write([format_record(entry(100))])
+    # Its number (4) was already applied, so it is skipped rather than applied twice
+    assert b.pull() == []
+
+
+def test_a_record_still_being_written_waits(tmp_path):
+    a, b = ReplicationLog(str(tmp_path), "a"), ReplicationLog(str(tmp_path), "b")
+    a.write([format_record(entry(1))])
+    with open(a.path, 'a', encoding='utf-8') as f:
+        f.write("2\t" + format_record(entry(2))[:15])
+    assert [e['ts'] for _, e in b.pull()] == [1]
+    # A crash left it torn; the next write terminates it and numbers on from the last whole record
+    a = ReplicationLog(str(tmp_path), "a")
+    a.write([format_record(entry(3))])
+    assert [e['ts'] for _, e in b.pull()] == [3]
+
+
+def test_replicator_delivers_and_reports_an_outage_once(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    delivered, failures = [], []
+    arrived = threading.Event()
+
+    def deliver(entries):
+        delivered.extend(entries)
+        arrived.set()
+
+    ReplicationLog(str(shared), "b").write([format_record(entry(5, "Bo"))])
+    replicator = Replicator(ReplicationLog(str(shared), "a"), deliver, failures.append, interval=0.01)
+    replicator.start()
+    assert arrived.wait(5)
+    assert [e['name'] for e in delivered] == ["Bo"]
+    # The folder goes away: records stay queued and the failure is reported once
+    os.rename(shared, tmp_path / "gone")
+    replicator.publish([entry(6)])
+    deadline = time.monotonic() + 5
+    while replicator.error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert len(failures) == 1
+    os.rename(tmp_path / "gone", shared)
+    replicator.close(timeout=5)
+    assert replicator.error is None
+    with open(shared / "a.log", encoding='utf-8') as f:
+        assert f.read().endswith("\t" + format_record(entry(6)))
+
+
+class UnreadableShare(ReplicationLog):
+    """Writes work; reading the other stations' logs fails"""
+
+    def pull(self, limit=None):
+        raise PermissionError("other logs unreadable")
+
+
+def test_a_failed_pull_does_not_write_records_again(tmp_path):
+    failures = []
+    replicator = Replicator(UnreadableShare(str(tmp_path), "a"), lambda entries: None, failures.append,
+                            interval=0.01)
+    replicator.publish([entry(1)])
+    replicator.start()
+    time.sleep(0.1)
+    replicator.close(timeout=5)
+    with open(tmp_path / "a.log", encoding='utf-8') as f:
+        assert len(f.readlines()) == 2  # the header and the record, once
+    assert [type(error) for error in failures] == [PermissionError]
+
+
+class FlakyShare(ReplicationLog):
+    """Writes or pulls fail, with something other than an OSError, while their name is in `faults`"""
+
+    def __init__(self, directory, station):
+        super().__init__(directory, station)
+        self.faults = set()
+
+    def write(self, lines):
+        if lines and 'write' in self.faults:
+            raise ValueError("bad write")
+        super().write(lines)
+
+    def pull(self, limit=None):
+        if 'pull' in self.faults:
+            raise RuntimeError("bad pull")
+        return super().pull()
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_unexpected_errors_keep_the_records_and_are_reported(tmp_path, capsys):
+    failures = []
+    log = FlakyShare(str(tmp_path), "a")
+    log.faults.add('write')
+    replicator = Replicator(log, lambda entries: None, failures.append, interval=0.01)
+    replicator.publish([entry(1)])
+    replicator.start()
+    try:
+        assert wait_for(lambda: replicator.error is not None)
+        log.faults = {'pull'}
+        assert wait_for(lambda: os.path.exists(log.path))
+        log.faults = set()
+        assert wait_for(lambda: replicator.error is None)
+        log.faults = {'pull'}
+        assert wait_for(lambda: len(failures) == 2)
+    finally:
+        replicator.close(timeout=5)
+    with open(log.path, encoding='utf-8') as f:
+        assert f.readlines()[1:] == ["1\t" + format_record(entry(1))]
+    assert [str(error) for error in failures] == ["bad write", "bad pull"]
+    assert capsys.readouterr().err == ""
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pytest
+
+from bmi.history import HistoryStore
+from bmi.tiers import HistoryTiers, merge_cold
+
+
+def entry(ts, name, bmi):
+    return {'ts': ts, 'name': name, 'age': 40, 'gender': "Male", 'activity': "Sedentary (little or no exercise)",
+            'height': 180.0, 'weight': round(bmi * 3.24, 1), 'bmi': bmi, 'category': "Normal Weight"}
+
+
+@pytest.fixture
+def tiers():
+    store = HistoryStore()
+    # Ann, Ben, Cy and Di with 10 rows each, interleaved; Di's are the most recent
+    store.extend(entry(i, "ABCD"[i % 4] * 3, 20.0 + i / 10) for i in range(40))
+    tiers = HistoryTiers(store, hot_rows=32)
+    yield tiers
+    tiers.close()
+
+
+def test_least_recently_used_people_go_cold(tiers):
+    store = tiers.store
+    assert tiers.enforce() == 20  # down to 75% of 32 rows takes two people
+    assert store.person_names() == ["AAA", "BBB", "CCC", "DDD"]
+    assert len(store) == 20 and len(tiers) == 40
+    assert store.rows_for("AAA").tolist() == [] and store.rows_for("BBB").tolist() == []
+    assert len(store.index.query("CCC")) == 10
+    # Cohort statistics keep counting the cold rows
+    assert store.rollups.overall.count == 40
+    assert tiers.enforce() == 0
+
+
+def test_selecting_a_person_pages_them_in(tiers):
+    store = tiers.store
+    tiers.enforce()
+    assert tiers.select("BBB") == 10
+    assert len(store) == 30 and len(tiers) == 40
+    assert sorted(store.column('ts')[store.rows_for("BBB")].tolist()) == list(range(1, 40, 4))
+    assert store.entry(store.rows_for("BBB")[0])['name'] == "BBB"
+    assert store.rollups.overall.count == 40
+    # The selected person is pinned: the next eviction takes everyone else, newer rows included
+    store.extend(entry(100 + i, "EEE", 25.0) for i in range(30))
+    assert tiers.enforce() == 50
+    assert len(store.rows_for("BBB")) == 10
+    assert tiers.select("BBB") == 0
+
+
+def test_merge_cold_adds_every_cold_row(tiers):
+    store = tiers.store
+    tiers.enforce()
+    tiers.select("AAA")
+    snapshot = merge_cold(store.snapshot(), tiers.cold_parts())
+    assert len(snapshot['ts']) == 40
+    assert sorted(snapshot['ts'].tolist()) == list(range(40))
+    # Ann was paged back in, so her rows come from the store and not from the segment as well
+    assert np.count_nonzero(snapshot['name'] == store.names.codes["AAA"]) == 10
+
+
+def test_clear_removes_the_segments(tiers):
+    tiers.enforce()
+    directory = tiers.directory
+    tiers.segments[0].pending.result()
+    assert os.listdir(directory)
+    tiers.store.clear()
+    tiers.clear()
+    assert not os.path.exists(directory)
+    assert len(tiers) == 0
+
+
+def test_deleted_rows_are_not_counted_or_spilled(tiers):
+    store = tiers.store
+    store.delete(int(store.rows_for("AAA")[0]))
+    assert len(tiers) == 39
+    tiers.enforce()
+    assert len(tiers) == 39
+    tiers.select("AAA")
+    assert len(store.rows_for("AAA")) == 9
@@ -0,0 +1,33 @@
+from bmi import engine, tips
+
+
+def test_age_bands():
+    ages = (2, 12, 13, 17, 18, 64, 65, 90)
+    assert [engine.AGE_BANDS[engine.age_band(age)] for age in ages] == \
+        ["child", "child", "teen", "teen", "adult", "adult", "senior", "senior"]
+    assert engine.age_bands(ages).tolist() == [engine.age_band(age) for age in ages]
+
+
+def test_every_category_has_tips():
+    # Obesity classes and "Healthy Weight (Child)" used to get no category section
+    for label in engine.CATEGORIES:
+        text = tips.personalized_tips(label, 30 if "Child" not in label else 10)
+        assert text.startswith(tips.GROUP_TIPS[tips.CATEGORY_GROUPS[engine.CATEGORY_CODES[label]]])
+        assert text.endswith(tips.GENERAL_TIPS)
+
+
+def test_sections_follow_the_person():
+    text = tips.personalized_tips("Obesity Class II", 70, "Female", engine.ACTIVITY_LEVELS[0])
+    assert tips.DOCTOR_TIP in text
+    assert "For Seniors" in text
+    assert tips.GENDER_TIPS["Female"] in text
+    assert tips.ACTIVITY_TIPS["Sedentary"] in text
+    child = tips.personalized_tips("Overweight (Child)", 9, "Male", engine.ACTIVITY_LEVELS[2])
+    assert "no dieting" in child
+    # Gender advice is for adults only
+    assert tips.GENDER_TIPS["Male"] not in child
+    assert tips.DOCTOR_TIP not in tips.personalized_tips("Overweight", 40)
+
+
+def test_unknown_gender_and_activity_fall_back():
+    assert tips.personalized_tips("Normal Weight", 40, "Robot", "Couch") == tips.personalized_tips("Normal Weight", 40)